@@ -0,0 +1,3 @@
+"""
+Load and performance benchmarks that run against a local fake Ragic
+"""
@@ -0,0 +1,306 @@
+"""
+A local stand-in for the Ragic API with configurable latency and errors
+
+Serves the members, attendance and hours detail sheets used by
+volunteer_hours/api/ragic.py, with the same `where` filters, paging,
+`fields` projection and `naming=EID` support, from seeded in-memory data.
+
+    python -m benchmarks.fake_ragic --port 8765 --latency-ms 50 --error-rate 0.01
+"""
+import json
+import random
+import time
+from argparse import ArgumentParser, Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Lock
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from volunteer_hours.common.enums import Http, Members, Attendance, Hours
+
+MEMBERS_ROUTE = "/lynvolunteer/lyn-temp/53"
+ATTENDANCE_ROUTE = "/lynvolunteer/lyn-temp/9"
+HOURS_ROUTE = "/lynvolunteer/lyn-temp/55"
+
+# Field IDs that are not listed in common/enums.py
+FULL_NAME = 1000001
+ATTENDANCE_EVENT_ID = 1000002
+
+# The app reads these fields by name, like the baseline did, and every other
+# field by ID, so the fake names the others after their IDs rather than
+# guessing their names in Ragic, which makes code that guesses one fail here
+NAMED_FIELDS = {
+    FULL_NAME: "Full Name",
+    Attendance.EID: "EID",
+    Attendance.OPPORTUNITY: "Opportunity",
+    ATTENDANCE_EVENT_ID: "Event ID",
+}
+FIELDS = {
+    MEMBERS_ROUTE: (Members.MEMBERSHIP_ID, FULL_NAME),
+    ATTENDANCE_ROUTE: (
+        Attendance.MEMBERSHIP_ID,
+        Attendance.FIRST_NAME,
+        Attendance.LAST_NAME,
+        Attendance.EID,
+        Attendance.OPPORTUNITY,
+        Attendance.TIMECLOCK_STATUS,
+        ATTENDANCE_EVENT_ID,
+    ),
+    HOURS_ROUTE: (
+        Hours.EID,
+        Hours.DATE,
+        Hours.EVENT_ID,
+        Hours.EVENT_NAME,
+        Hours.START_TIME,
+        Hours.NEW_MEMBERSHIP_ID,
+        Hours.END_TIME,
+        Hours.STATUS,
+    ),
+}
+FIELD_NAMES = {
+    route: {field: NAMED_FIELDS.get(field, f"Field {field}") for field in fields}
+    for route, fields in FIELDS.items()
+}
+
+
+def _compare(operator: str) -> Callable[[str, str], bool]:
+    """
+    Get the comparison behind a Ragic `where` operator
+    :param operator: one of eq, like, gt, gte, lt or lte
+    :return: a function of the record value and the condition value
+    """
+
+    def ordered(func: Callable) -> Callable[[str, str], bool]:
+        def compare(left: str, right: str) -> bool:
+            try:
+                return func(float(left), float(right))
+            except ValueError:
+                return func(left, right)
+
+        return compare
+
+    return {
+        "eq": lambda left, right: left == right,
+        "like": lambda left, right: right.lower() in left.lower(),
+        "gt": ordered(lambda left, right: left > right),
+        "gte": ordered(lambda left, right: left >= right),
+        "lt": ordered(lambda left, right: left < right),
+        "lte": ordered(lambda left, right: left <= right),
+    }[operator]
+
+
+class FakeRagic:
+    """
+    In-memory sheets keyed by route, record ID and field ID
+    """
+
+    def __init__(self, members: int, events: int, seed: int = 0):
+        self._lock = Lock()
+        self._ids = count(1)
+        self.sheets: dict[str, dict[int, dict[int, str]]] = {
+            route: {} for route in FIELD_NAMES
+        }
+        rng = random.Random(seed)
+        for number in range(members):
+            member_id = f"LYN{number:05d}"
+            self._insert(
+                MEMBERS_ROUTE,
+                {Members.MEMBERSHIP_ID: member_id, FULL_NAME: f"Volunteer {number}"},
+            )
+            for event in rng.sample(range(events), k=min(events, 2)):
+                self._insert(
+                    ATTENDANCE_ROUTE,
+                    {
+                        Attendance.MEMBERSHIP_ID: member_id,
+                        Attendance.FIRST_NAME: "Volunteer",
+                        Attendance.LAST_NAME: str(number),
+                        Attendance.EID: f"E{event:04d}",
+                        Attendance.OPPORTUNITY: f"Event {event}",
+                        Attendance.TIMECLOCK_STATUS: "Open",
+                        ATTENDANCE_EVENT_ID: str(event),
+                    },
+                )
+
+    def _insert(self, route: str, record: dict[int, str]) -> int:
+        record_id = next(self._ids)
+        self.sheets[route][record_id] = record
+        return record_id
+
+    @staticmethod
+    def _matches(record: dict[int, str], conditions: list[str]) -> bool:
+        for condition in conditions:
+            field, operator, value = condition.split(",", 2)
+            if not _compare(operator)(str(record.get(int(field), "")), value):
+                return False
+        return True
+
+    def query(self, route: str, params: dict[str, list[str]]) -> dict:
+        """
+        Filter, page and name the records of a sheet
+        :param route: the sheet's route
+        :param params: the parsed query string
+        :return: records keyed by record ID
+        """
+        names = FIELD_NAMES[route]
+        by_id = params.get("naming", [""])[0] == "EID"
+        offset = int(params.get("offset", ["0"])[0])
+        limit = int(params.get("limit", ["1000"])[0])
+        projected = {int(field) for field in params.get("fields", [])}
+        with self._lock:
+            matched = [
+                (record_id, dict(record))
+                for record_id, record in self.sheets[route].items()
+                if self._matches(record, params.get("where", []))
+            ]
+        result = {}
+        for record_id, record in matched[offset : offset + limit]:
+            result[str(record_id)] = {
+                (str(field) if by_id else names[field]): value
+                for field, value in record.items()
+                if not projected or field in projected
+            }
+        return result
+
+    def write(self, route: str, record_id: Optional[int], form: dict) -> dict:
+        """
+        Create or update a record
+        :param route: the sheet's route
+        :param record_id: the record to update, or None to create one
+        :param form: the parsed form data keyed by field ID
+        :return: a Ragic style write response
+        """
+        fields = {int(field): values[0] for field, values in form.items()}
+        with self._lock:
+            if record_id is None:
+                record_id = self._insert(route, fields)
+            elif record_id in self.sheets[route]:
+                self.sheets[route][record_id].update(fields)
+            else:
+                return {"status": "ERROR", "msg": f"No record {record_id}"}
+            record = self.sheets[route][record_id]
+            if route == HOURS_ROUTE:
+                record[Hours.STATUS] = "Completed" if record.get(Hours.END_TIME) else ""
+        return {"status": "SUCCESS", "msg": "", "ragicId": record_id}
+
+
+def make_handler(ragic: FakeRagic, options: Namespace) -> type:
+    """
+    Build a request handler bound to the fake sheets
+    :param ragic: the fake sheets to serve
+    :param options: latency and error injection settings
+    :return: a request handler class
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        """
+        Serve the Ragic routes used by the app
+        """
+
+        protocol_version = "HTTP/1.1"
+
+        def _route(self) -> tuple[Optional[str], Optional[int]]:
+            path = urlsplit(self.path).path.rstrip("/")
+            for route in FIELD_NAMES:
+                if path == route:
+                    return route, None
+                if path.startswith(route + "/"):
+                    return route, int(path[len(route) + 1 :])
+            return None, None
+
+        def _reply(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _inject(self) -> bool:
+            time.sleep(
+                random.uniform(options.latency_ms, options.latency_max_ms) / 1000
+            )
+            if random.random() < options.error_rate:
+                self._reply(503, {"status": "ERROR", "msg": "Injected failure"})
+                return True
+            return False
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """
+            Query a sheet
+            """
+            route, _ = self._route()
+            if route is None:
+                self._reply(Http.NOT_FOUND, {})
+                return
+            if not self._inject():
+                params = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+                self._reply(Http.OK, ragic.query(route, params))
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            """
+            Create or update a record
+            """
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode())
+            route, record_id = self._route()
+            if route is None:
+                self._reply(Http.NOT_FOUND, {})
+                return
+            if not self._inject():
+                self._reply(Http.OK, ragic.write(route, record_id, form))
+
+        def log_message(self, *args) -> None:
+            """
+            Keep the console quiet under load
+            """
+
+    return Handler
+
+
+def serve(options: Namespace) -> ThreadingHTTPServer:
+    """
+    Create a fake Ragic server
+    :param options: parsed command line options
+    :return: a server that has not started serving yet
+    """
+    ragic = FakeRagic(options.members, options.events, options.seed)
+    handler = make_handler(ragic, options)
+    server = ThreadingHTTPServer((options.host, options.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parser() -> ArgumentParser:
+    """
+    Build the command line options
+    :return: an argument parser
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("--host", default="127.0.0.1")
+    args.add_argument("--port", type=int, default=8765)
+    args.add_argument("--members", type=int, default=500)
+    args.add_argument("--events", type=int, default=10)
+    args.add_argument("--seed", type=int, default=0)
+    args.add_argument("--latency-ms", type=float, default=0.0)
+    args.add_argument("--latency-max-ms", type=float, default=None)
+    args.add_argument("--error-rate", type=float, default=0.0)
+    return args
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    options = parser().parse_args(argv)
+    if options.latency_max_ms is None:
+        options.latency_max_ms = options.latency_ms
+    return options
+
+
+if __name__ == "__main__":
+    OPTIONS = parse_args()
+    print(f"Fake Ragic listening on http://{OPTIONS.host}:{OPTIONS.port}")
+    serve(OPTIONS).serve_forever()
@@ -0,0 +1,133 @@
+"""
+A cold-start benchmark of importing the package's modules
+
+Imports each module in a fresh interpreter, several times over, and reports
+the median wall time. With --baseline, fails when a module got slower than
+the recorded time by more than --tolerance, so cold-start regressions show up.
+
+    python -m benchmarks.import_time --repeat 7 --output import.json
+    python -m benchmarks.import_time --baseline import.json --tolerance 0.25
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser, Namespace
+from statistics import median
+from typing import Optional
+
+MODULES = (
+    "volunteer_hours",
+    "volunteer_hours.logger.pkg_logger",
+    "volunteer_hours.api.ragic",
+    "volunteer_hours.common.member",
+    "volunteer_hours.app",
+)
+
+TIMER = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def time_import(module: str, env: dict) -> float:
+    """
+    Import a module in a fresh interpreter
+    :param module: the dotted name of the module
+    :param env: the environment of the interpreter
+    :return: how long the import took in milliseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(module=module)],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1]) * 1000
+
+
+def measure(options: Namespace) -> dict[str, float]:
+    """
+    Time the import of every module
+    :param options: parsed command line options
+    :return: the median import time of each module in milliseconds
+    """
+    with tempfile.TemporaryDirectory() as config_dir:
+        env = {
+            **os.environ,
+            "APP_ENV": "prod",
+            "RAGIC_API_KEY": "import-time",
+            "RAGIC_BASE_URL": "http://127.0.0.1:9",
+            "CONFIG_DIR": config_dir,
+            "SECRET_KEY": "import-time",
+        }
+        return {
+            module: round(
+                median(time_import(module, env) for _ in range(options.repeat)), 2
+            )
+            for module in options.modules
+        }
+
+
+def compare(results: dict[str, float], options: Namespace) -> list[str]:
+    """
+    Find the modules that got slower than the baseline
+    :param results: the measured import times
+    :param options: parsed command line options
+    :return: a description of every regression
+    """
+    with open(options.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = []
+    for module, elapsed in results.items():
+        limit = baseline.get(module)
+        if limit is not None and elapsed > limit * (1 + options.tolerance):
+            regressions.append(f"{module}: {elapsed} ms, baseline {limit} ms")
+    return regressions
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("--modules", nargs="+", default=list(MODULES))
+    args.add_argument("--repeat", type=int, default=5)
+    args.add_argument("--baseline", help="fail on regressions against this file")
+    args.add_argument("--tolerance", type=float, default=0.25)
+    args.add_argument("--max-ms", type=float, help="fail above this import time")
+    args.add_argument("--output", help="write results as JSON for comparison")
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Time the imports and check them against the limits
+    :param argv: the arguments, defaults to sys.argv
+    :return: the exit status
+    """
+    options = parse_args(argv)
+    results = measure(options)
+    for module, elapsed in results.items():
+        print(f"{elapsed:>9.2f} ms  {module}")
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            json.dump({"options": vars(options), "results": results}, output, indent=2)
+    failures = compare(results, options) if options.baseline else []
+    if options.max_ms is not None:
+        failures += [
+            f"{module}: {elapsed} ms, limit {options.max_ms} ms"
+            for module, elapsed in results.items()
+            if elapsed > options.max_ms
+        ]
+    for failure in failures:
+        print(f"Regression: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+An end-to-end load test of the kiosk flow against a fake Ragic
+
+Starts benchmarks.fake_ragic and the Flask app as subprocesses, then runs the
+scan -> /action -> /sent flow from many simulated kiosks at each concurrency
+level and reports throughput and p50/p95/p99 latencies.
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --flows 200 \
+        --latency-ms 80 --output results.json
+"""
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import count
+from threading import Lock
+from typing import Iterator, Optional
+
+import requests
+
+from volunteer_hours.api.ragic import NO_EVENT, TRY_AGAIN
+
+STEPS = ("scan", "action", "sent", "flow")
+EVENT_OPTION = re.compile(r'<option value="([^"]+)"')
+# The app reports failures to the volunteer in pages served with a 200
+FAILURES = (TRY_AGAIN, NO_EVENT)
+
+
+class FlowError(Exception):
+    """
+    Raised when the app answers a step of the flow with a failure message
+    """
+
+
+def free_port() -> int:
+    """
+    Find a free local TCP port
+    :return: a port number
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    """
+    Wait until a local server accepts connections
+    :param port: the port to wait for
+    :param timeout: how long to wait in seconds
+    :return: None
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Nothing is listening on port {port}")
+
+
+@contextmanager
+def servers(options: Namespace) -> Iterator[str]:
+    """
+    Run a fake Ragic and the app in subprocesses
+    :param options: parsed command line options
+    :return: the base URL of the app
+    """
+    ragic_port, app_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as config_dir:
+        env = {
+            **os.environ,
+            "APP_ENV": "prod",
+            "RAGIC_API_KEY": "load-test",
+            "RAGIC_BASE_URL": f"http://127.0.0.1:{ragic_port}",
+            "CONFIG_DIR": config_dir,
+            "SECRET_KEY": "load-test",
+            "FLASK_APP": "volunteer_hours.app",
+        }
+        ragic_cmd = [
+            sys.executable,
+            "-m",
+            "benchmarks.fake_ragic",
+            f"--port={ragic_port}",
+            f"--members={options.members}",
+            f"--latency-ms={options.latency_ms}",
+            f"--error-rate={options.error_rate}",
+        ]
+        app_cmd = [sys.executable, "-m", "flask", "run", f"--port={app_port}"]
+        quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        with subprocess.Popen(ragic_cmd, env=env, **quiet) as ragic:
+            try:
+                wait_for_port(ragic_port)
+                with subprocess.Popen(app_cmd, env=env, **quiet) as app:
+                    try:
+                        wait_for_port(app_port)
+                        yield f"http://127.0.0.1:{app_port}"
+                    finally:
+                        app.terminate()
+            finally:
+                ragic.terminate()
+
+
+class Recorder:
+    """
+    Collect latencies per step of the flow
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.samples: dict[str, list[float]] = {step: [] for step in STEPS}
+        self.errors = 0
+
+    def add(self, step: str, seconds: float) -> None:
+        """
+        Record how long a step took
+        :param step: the name of the step
+        :param seconds: the duration of the step
+        :return: None
+        """
+        with self._lock:
+            self.samples[step].append(seconds)
+
+    def fail(self) -> None:
+        """
+        Count a failed flow, including one the app reported as failed in a
+          page or JSON body served with a 200
+        :return: None
+        """
+        with self._lock:
+            self.errors += 1
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """
+    Get a percentile by the nearest rank method
+    :param samples: the measured values
+    :param fraction: the percentile as a fraction between 0 and 1
+    :return: the value at that percentile, or 0 with no samples
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def check_page(response: requests.Response) -> requests.Response:
+    """
+    Make sure a step of the flow succeeded
+    :param response: the app's response
+    :raises FlowError: if the page shows a failure message
+    :return: the same response
+    """
+    response.raise_for_status()
+    if any(failure in response.text for failure in FAILURES):
+        raise FlowError(f"{response.url} reported a failure")
+    return response
+
+
+def check_json(response: requests.Response) -> dict:
+    """
+    Make sure a step of the JSON flow succeeded
+    :param response: the app's response
+    :raises FlowError: if the body has an error or a failure message
+    :return: the decoded body
+    """
+    response.raise_for_status()
+    body = response.json()
+    message = str(body.get("message", ""))
+    if body.get("error") or any(failure in message for failure in FAILURES):
+        raise FlowError(f"{response.url} reported {body}")
+    return body
+
+
+def run_flow(base_url: str, member_id: str, recorder: Recorder) -> None:
+    """
+    Scan a card, pick an event and clock in or out like a kiosk would
+    :param base_url: the base URL of the app
+    :param member_id: the scanned member ID
+    :param recorder: where to record latencies
+    :return: None
+    """
+    with requests.Session() as kiosk:
+        started = time.perf_counter()
+        try:
+            kiosk.get(f"{base_url}/", timeout=60).raise_for_status()
+            before = time.perf_counter()
+            kiosk.post(
+                f"{base_url}/action", data={"member_id": member_id}, timeout=60
+            ).raise_for_status()
+            recorder.add("scan", time.perf_counter() - before)
+            before = time.perf_counter()
+            page = check_page(kiosk.get(f"{base_url}/action", timeout=60))
+            recorder.add("action", time.perf_counter() - before)
+            events = EVENT_OPTION.findall(page.text)
+            before = time.perf_counter()
+            check_page(
+                kiosk.get(
+                    f"{base_url}/sent",
+                    params={"event": events[0] if events else ""},
+                    timeout=60,
+                )
+            )
+            recorder.add("sent", time.perf_counter() - before)
+        except (requests.RequestException, ValueError, FlowError):
+            recorder.fail()
+            return
+        recorder.add("flow", time.perf_counter() - started)
+
+
+def run_api_flow(base_url: str, member_id: str, recorder: Recorder) -> None:
+    """
+    Scan a card and clock in or out through the JSON API like the kiosk page
+    :param base_url: the base URL of the app
+    :param member_id: the scanned member ID
+    :param recorder: where to record latencies
+    :return: None
+    """
+    with requests.Session() as kiosk:
+        started = time.perf_counter()
+        try:
+            profile = check_json(
+                kiosk.post(
+                    f"{base_url}/api/scan", json={"member_id": member_id}, timeout=60
+                )
+            )
+            recorder.add("scan", time.perf_counter() - started)
+            before = time.perf_counter()
+            check_json(
+                kiosk.post(
+                    f"{base_url}/api/clock",
+                    json={
+                        "event": (profile["events"] or [""])[0],
+                        "key": profile["key"],
+                    },
+                    timeout=60,
+                )
+            )
+            recorder.add("sent", time.perf_counter() - before)
+        except (requests.RequestException, ValueError, FlowError):
+            recorder.fail()
+            return
+        recorder.add("flow", time.perf_counter() - started)
+
+
+def run_level(base_url: str, concurrency: int, options: Namespace) -> dict:
+    """
+    Run a fixed number of flows at one concurrency level
+    :param base_url: the base URL of the app
+    :param concurrency: the number of simulated kiosks
+    :param options: parsed command line options
+    :return: throughput and latency percentiles in milliseconds
+    """
+    recorder = Recorder()
+    flow = run_api_flow if options.api else run_flow
+    members = count()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(options.flows):
+            member_id = f"LYN{next(members) % options.members:05d}"
+            pool.submit(flow, base_url, member_id, recorder)
+    elapsed = time.perf_counter() - started
+    result = {
+        "concurrency": concurrency,
+        "flows": options.flows,
+        "errors": recorder.errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(recorder.samples["flow"]) / elapsed, 2),
+    }
+    for step in STEPS:
+        for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            value = percentile(recorder.samples[step], fraction)
+            result[f"{step}_{name}_ms"] = round(value * 1000, 1)
+    return result
+
+
+def report(results: list[dict]) -> None:
+    """
+    Print a table of results
+    :param results: one result per concurrency level
+    :return: None
+    """
+    header = f"{'conc':>5} {'flows/s':>8} {'errors':>6} "
+    header += " ".join(f"{step + ' p50/p95/p99 ms':>26}" for step in STEPS)
+    print(header)
+    for result in results:
+        line = (
+            f"{result['concurrency']:>5} {result['throughput']:>8} "
+            f"{result['errors']:>6} "
+        )
+        line += " ".join(
+            f"{result[f'{step}_p50_ms']:>8}/{result[f'{step}_p95_ms']:>8}"
+            f"/{result[f'{step}_p99_ms']:>8}"
+            for step in STEPS
+        )
+        print(line)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args.add_argument("--flows", type=int, default=200)
+    args.add_argument("--members", type=int, default=500)
+    args.add_argument("--latency-ms", type=float, default=50.0)
+    args.add_argument("--error-rate", type=float, default=0.0)
+    args.add_argument("--api", action="store_true", help="use the JSON scan API")
+    args.add_argument("--output", help="write results as JSON for comparison")
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Run the load test at every concurrency level
+    :param argv: the arguments, defaults to sys.argv
+    :return: None
+    """
+    options = parse_args(argv)
+    with servers(options) as base_url:
+        results = [run_level(base_url, level, options) for level in options.concurrency]
+    report(results)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            json.dump({"options": vars(options), "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Micro-benchmarks of the helpers on the per-scan code path
+
+Times the clock, the Config getters, the logger, building Ragic queries and
+decoding recorded Ragic responses, and reports the median time per call.
+Runs offline: the responses are fixtures recorded from benchmarks.fake_ragic,
+not from Ragic, and kept in benchmarks/fixtures. With --baseline, fails when a
+benchmark got slower than the recorded time by more than --tolerance.
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --baseline micro.json --tolerance 0.25
+    python -m benchmarks.micro --filter clock json
+    python -m benchmarks.micro --record
+"""
+# pylint: disable=protected-access
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+from argparse import ArgumentParser, Namespace
+from contextvars import copy_context
+from pathlib import Path
+from statistics import median
+from timeit import Timer
+from typing import Any, Callable, Optional
+
+from benchmarks.fake_ragic import (
+    ATTENDANCE_ROUTE,
+    HOURS_ROUTE,
+    MEMBERS_ROUTE,
+    FakeRagic,
+)
+from volunteer_hours import Config
+from volunteer_hours.api.ragic import RagicQueries
+from volunteer_hours.common.enums import Attendance, Hours, Members
+from volunteer_hours.common.records import EventInfo, HoursDetail, MemberInfo
+from volunteer_hours.common.timenow import Clock
+from volunteer_hours.logger.pkg_logger import (
+    BoundedQueueHandler,
+    Logger,
+    LoggerLoader,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MEMBER_ID = "LYN00007"
+EVENT_ID = 4
+DATE = "2022/06/18"
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    """
+    Register a benchmark, the decorated function sets it up and returns the
+      call to time
+    :param name: the name of the benchmark
+    :return: a decorator
+    """
+
+    def register(setup: Callable[[], Callable[[], Any]]) -> Callable:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def fixture(name: str) -> bytes:
+    """
+    Read a recorded Ragic response
+    :param name: the name of the fixture
+    :return: the response body
+    """
+    return (FIXTURES / f"{name}.json").read_bytes()
+
+
+def record_fixtures() -> list[Path]:
+    """
+    Record the Ragic responses the benchmarks decode from the fake Ragic
+    :return: the fixture files written
+    """
+    ragic = FakeRagic(members=500, events=10, seed=0)
+    rng = random.Random(0)
+    for number in range(1000):
+        start = rng.randrange(8 * 60, 16 * 60)
+        form = {
+            Hours.EID: f"E{rng.randrange(10):04d}",
+            Hours.DATE: f"2022/06/{rng.randrange(1, 31):02d}",
+            Hours.EVENT_ID: str(rng.randrange(10)),
+            Hours.EVENT_NAME: f"Event {rng.randrange(10)}",
+            Hours.NEW_MEMBERSHIP_ID: f"LYN{number % 500:05d}",
+            Hours.START_TIME: f"{start // 60:02d}:{start % 60:02d}",
+            Hours.END_TIME: f"{start // 60 + 3:02d}:{start % 60:02d}",
+        }
+        ragic.write(
+            HOURS_ROUTE, None, {str(key): [value] for key, value in form.items()}
+        )
+    ragic.write(
+        HOURS_ROUTE,
+        None,
+        {
+            str(Hours.DATE): [DATE],
+            str(Hours.EVENT_ID): [str(EVENT_ID)],
+            str(Hours.NEW_MEMBERSHIP_ID): [MEMBER_ID],
+            str(Hours.START_TIME): ["09:00"],
+        },
+    )
+    queries = {
+        "members": (
+            MEMBERS_ROUTE,
+            {"where": [f"{Members.MEMBERSHIP_ID},eq,{MEMBER_ID}"]},
+        ),
+        "attendance": (
+            ATTENDANCE_ROUTE,
+            {
+                "where": [
+                    f"{Attendance.TIMECLOCK_STATUS},eq,Open",
+                    f"{Attendance.MEMBERSHIP_ID},eq,{MEMBER_ID}",
+                ]
+            },
+        ),
+        "hours_detail": (
+            HOURS_ROUTE,
+            {
+                "where": [
+                    f"{Hours.DATE},eq,{DATE}",
+                    f"{Hours.EVENT_ID},eq,{EVENT_ID}",
+                    f"{Hours.NEW_MEMBERSHIP_ID},eq,{MEMBER_ID}",
+                ],
+                "fields": [str(Hours.STATUS), str(Hours.START_TIME)],
+                "naming": ["EID"],
+            },
+        ),
+        "hours_page": (HOURS_ROUTE, {"naming": ["EID"], "limit": ["1000"]}),
+    }
+    FIXTURES.mkdir(exist_ok=True)
+    paths = []
+    for name, (route, params) in queries.items():
+        path = FIXTURES / f"{name}.json"
+        path.write_text(json.dumps(ragic.query(route, params)), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+@benchmark("clock.today")
+def clock_today() -> Callable[[], Any]:
+    """
+    Time getting today's date
+    :return: the call to time
+    """
+    return Clock().today
+
+
+@benchmark("clock.now")
+def clock_now() -> Callable[[], Any]:
+    """
+    Time getting the current time
+    :return: the call to time
+    """
+    return Clock().now
+
+
+@benchmark("clock.now.pinned")
+def clock_now_pinned() -> Callable[[], Any]:
+    """
+    Time getting the current time once pinned for a request
+    :return: the call to time
+    """
+    clock = Clock()
+    clock.pin()
+    return clock.now
+
+
+@benchmark("clock.delta_minutes")
+def clock_delta_minutes() -> Callable[[], Any]:
+    """
+    Time counting the minutes since a start time
+    :return: the call to time
+    """
+    clock = Clock()
+    return lambda: clock.delta_minutes("09:00")
+
+
+@benchmark("config.singleton")
+def config_singleton() -> Callable[[], Any]:
+    """
+    Time reaching the Config class
+    :return: the call to time
+    """
+    return Config
+
+
+@benchmark("config.setting")
+def config_setting() -> Callable[[], Any]:
+    """
+    Time a Config getter that reads the settings
+    :return: the call to time
+    """
+    return Config.ragic_base_url
+
+
+@benchmark("config.constant")
+def config_constant() -> Callable[[], Any]:
+    """
+    Time a Config getter that returns a constant
+    :return: the call to time
+    """
+    return Config.date_format
+
+
+def quiet_logger(level: int) -> None:
+    """
+    Load the logger and point the listener at a NullHandler, so that the
+      listener keeps up with a benchmark loop and each call times handing a
+      record over, rather than dropping it on a full queue or, as measure
+      sets LOG_OVERFLOW=block, waiting on the log file
+    :param level: the level to log at
+    :return: None
+    """
+    logger = LoggerLoader().load()
+    logger.setLevel(level)
+    for handler in logger.handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            handler.handlers = (logging.NullHandler(),)
+
+
+@benchmark("logger.info")
+def logger_info() -> Callable[[], Any]:
+    """
+    Time handing an info record to the listener
+    :return: the call to time
+    """
+    quiet_logger(logging.DEBUG)
+    return lambda: Logger.info("Data received from %s.", MEMBERS_ROUTE)
+
+
+@benchmark("logger.info.filtered")
+def logger_info_filtered() -> Callable[[], Any]:
+    """
+    Time an info call below the logger's level
+    :return: the call to time
+    """
+    quiet_logger(logging.WARNING)
+    return lambda: Logger.info("Data received from %s.", MEMBERS_ROUTE)
+
+
+@benchmark("ragic.member_query")
+def ragic_member_query() -> Callable[[], Any]:
+    """
+    Time building the member info query
+    :return: the call to time
+    """
+    return lambda: RagicQueries._member_query(MEMBER_ID)
+
+
+@benchmark("ragic.hours_query")
+def ragic_hours_query() -> Callable[[], Any]:
+    """
+    Time building the hours detail query
+    :return: the call to time
+    """
+    queries = RagicQueries()
+    return lambda: queries._hours_query(MEMBER_ID, EVENT_ID, DATE)
+
+
+@benchmark("ragic.flight_key")
+def ragic_flight_key() -> Callable[[], Any]:
+    """
+    Time building the single flight key of a query
+    :return: the call to time
+    """
+    params = RagicQueries()._hours_query(MEMBER_ID, EVENT_ID, DATE)
+    return lambda: RagicQueries._flight_key(HOURS_ROUTE, params)
+
+
+@benchmark("json.members")
+def json_members() -> Callable[[], Any]:
+    """
+    Time decoding a recorded member info response
+    :return: the call to time
+    """
+    body = fixture("members")
+    return lambda: MemberInfo.from_page(json.loads(body))
+
+
+@benchmark("json.attendance")
+def json_attendance() -> Callable[[], Any]:
+    """
+    Time decoding a recorded attendance response
+    :return: the call to time
+    """
+    body = fixture("attendance")
+    return lambda: EventInfo.from_page(json.loads(body))
+
+
+@benchmark("json.hours_detail")
+def json_hours_detail() -> Callable[[], Any]:
+    """
+    Time decoding a recorded hours detail response
+    :return: the call to time
+    """
+    body = fixture("hours_detail")
+    return lambda: HoursDetail.from_page(json.loads(body))
+
+
+@benchmark("json.hours_page")
+def json_hours_page() -> Callable[[], Any]:
+    """
+    Time decoding a recorded page of hours detail
+    :return: the call to time
+    """
+    body = fixture("hours_page")
+    return lambda: HoursDetail.from_page(json.loads(body))
+
+
+def time_call(call: Callable[[], Any], options: Namespace) -> float:
+    """
+    Time a call, repeating it until each run lasts at least --min-time
+    :param call: the call to time
+    :param options: parsed command line options
+    :return: the median time per call in nanoseconds
+    """
+    timer = Timer(call)
+    number = 1
+    while timer.timeit(number) < options.min_time:
+        number *= 2
+    runs = [timer.timeit(number) / number for _ in range(options.repeat)]
+    return median(runs) * 1e9
+
+
+def run_benchmark(name: str, options: Namespace) -> float:
+    """
+    Set up and time a benchmark in a context of its own, so that pinning the
+      clock in one benchmark does not leak into the next
+    :param name: the name of the benchmark
+    :param options: parsed command line options
+    :return: the median time per call in nanoseconds
+    """
+    return copy_context().run(lambda: time_call(BENCHMARKS[name](), options))
+
+
+def measure(options: Namespace) -> dict[str, float]:
+    """
+    Run every selected benchmark
+    :param options: parsed command line options
+    :return: the median time per call of each benchmark in nanoseconds
+    """
+    names = [
+        name
+        for name in BENCHMARKS
+        if not options.filter or any(part in name for part in options.filter)
+    ]
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.environ.update(
+            {
+                "APP_ENV": "prod",
+                "RAGIC_API_KEY": "micro",
+                "RAGIC_BASE_URL": "http://127.0.0.1:9",
+                "CONFIG_DIR": config_dir,
+                "SECRET_KEY": "micro",
+                "LOG_OVERFLOW": "block",
+                "LOG_QUEUE_SIZE": "1000000",
+            }
+        )
+        return {name: round(run_benchmark(name, options), 1) for name in names}
+
+
+def compare(results: dict[str, float], options: Namespace) -> list[str]:
+    """
+    Find the benchmarks that got slower than the baseline
+    :param results: the measured times
+    :param options: parsed command line options
+    :return: a description of every regression
+    """
+    with open(options.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = []
+    for name, elapsed in results.items():
+        limit = baseline.get(name)
+        if limit is not None and elapsed > limit * (1 + options.tolerance):
+            regressions.append(f"{name}: {elapsed} ns, baseline {limit} ns")
+    return regressions
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("--filter", nargs="+", help="run benchmarks matching these")
+    args.add_argument("--repeat", type=int, default=5)
+    args.add_argument("--min-time", type=float, default=0.1)
+    args.add_argument("--baseline", help="fail on regressions against this file")
+    args.add_argument("--tolerance", type=float, default=0.25)
+    args.add_argument("--output", help="write results as JSON for comparison")
+    args.add_argument("--record", action="store_true", help="re-record fixtures")
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Run the benchmarks and check them against the baseline
+    :param argv: the arguments, defaults to sys.argv
+    :return: the exit status
+    """
+    options = parse_args(argv)
+    if options.record:
+        for path in record_fixtures():
+            print(f"Recorded {path}")
+        return 0
+    results = measure(options)
+    for name, elapsed in results.items():
+        print(f"{elapsed:>12.1f} ns  {name}")
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            json.dump({"options": vars(options), "results": results}, output, indent=2)
+    failures = compare(results, options) if options.baseline else []
+    for failure in failures:
+        print(f"Regression: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
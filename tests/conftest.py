@@ -0,0 +1,147 @@
+"""
+Run the tests against a local fake Ragic
+"""
+# pylint: disable=redefined-outer-name
+import os
+from datetime import datetime, timezone
+from threading import Thread
+from typing import Optional
+
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE, parse_args, serve
+from volunteer_hours.common.enums import Hours
+
+DATE = "2022/06/18"
+
+
+@pytest.fixture(scope="session")
+def fake_options():
+    """
+    The latency and error injection settings of the fake Ragic, which it
+      reads on every request
+    :return: parsed fake Ragic options
+    """
+    return parse_args(["--port", "0", "--members", "50"])
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_ragic(fake_options, tmp_path_factory):
+    """
+    Serve a fake Ragic and point the app at it for the whole session, the
+      settings are read once, so this runs before any test reads them
+    :return: the base URL of the fake Ragic
+    """
+    server = serve(fake_options)
+    Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update(
+        {
+            "APP_ENV": "prod",
+            "RAGIC_API_KEY": "test",
+            "RAGIC_BASE_URL": base_url,
+            "CONFIG_DIR": str(tmp_path_factory.mktemp("config")),
+            "SECRET_KEY": "test",
+            "ADMIN_TOKEN": "admin",
+            "WRITE_BEHIND": "false",
+            "SHARED_CACHE": "false",
+            "RAGIC_BACKOFF": "0.01",
+            "BREAKER_COOLDOWN": "0.2",
+        }
+    )
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def faults(fake_options):
+    """
+    Let a test make the fake Ragic fail or slow down, and close the circuit
+      to Ragic after it, so the failures do not carry over to the next test
+    :return: the fake Ragic options to change
+    """
+    # pylint: disable=import-outside-toplevel
+    from volunteer_hours.api.retry import CircuitBreaker
+
+    yield fake_options
+    fake_options.error_rate = 0.0
+    fake_options.latency_ms = fake_options.latency_max_ms = 0.0
+    CircuitBreaker().success()
+
+
+@pytest.fixture
+def clock():
+    """
+    Fix the time at 10:00 in Vancouver on DATE, tests move it with
+      `clock.at`
+    :return: the clock
+    """
+    # pylint: disable=import-outside-toplevel
+    from volunteer_hours.common.timenow import Clock
+
+    class FixedClock:  # pylint: disable=too-few-public-methods
+        """
+        Set the time the app sees
+        """
+
+        @staticmethod
+        def at(hour: int, minute: int = 0) -> None:
+            """
+            Move the clock to a time of the day
+            :param hour: the hour in Vancouver
+            :param minute: the minute
+            :return: None
+            """
+            moment = datetime(2022, 6, 18, hour + 7, minute, tzinfo=timezone.utc)
+            Clock().set_source(lambda: moment)
+
+    FixedClock.at(10)
+    yield FixedClock
+    Clock().set_source(None)
+
+
+@pytest.fixture
+def read_hours(fake_ragic):
+    """
+    Read a member's hours detail records straight from the fake Ragic, as
+      another worker would see them
+    :return: a function of the member ID, and the event ID and date to match
+      if any, returning the records keyed by record ID with fields named by ID
+    """
+
+    def read(member_id: str, event_id=None, date: Optional[str] = DATE) -> dict:
+        where = [f"{Hours.NEW_MEMBERSHIP_ID},eq,{member_id}"]
+        if event_id is not None:
+            where.append(f"{Hours.EVENT_ID},eq,{event_id}")
+        if date is not None:
+            where.append(f"{Hours.DATE},eq,{date}")
+        params = {"where": where, "naming": "EID", "api": ""}
+        response = requests.get(f"{fake_ragic}{HOURS_ROUTE}", params=params, timeout=5)
+        return response.json()
+
+    return read
+
+
+@pytest.fixture
+def event_of():
+    """
+    Pick an event a member signed up for
+    :return: a function of the member ID returning the ID of the event
+    """
+    # pylint: disable=import-outside-toplevel
+    from volunteer_hours.api.ragic import Ragic
+
+    return lambda member_id: list(Ragic().fetch_events(member_id).values())[0].event_id
+
+
+@pytest.fixture
+def client():
+    """
+    A test client of a freshly created app
+    :return: the Flask test client
+    """
+    # pylint: disable=import-outside-toplevel
+    from volunteer_hours.app import create_app
+
+    return create_app().test_client()
@@ -0,0 +1,109 @@
+"""
+Clock in and out with the async Ragic client against the fake Ragic
+"""
+# pylint: disable=protected-access
+import asyncio
+
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE
+from volunteer_hours.api.async_ragic import AsyncRagic
+from volunteer_hours.api.ragic import UNAVAILABLE, RagicQueries
+from volunteer_hours.common.enums import Hours
+
+DATE = "2022/06/18"
+
+
+def log_hours(member_id: str, event_id: str) -> str:
+    """
+    Scan a card and pick an event like a kiosk would
+    :param member_id: the associated member ID
+    :param event_id: the ID of the selected event
+    :return: the message shown to the member
+    """
+    return asyncio.run(AsyncRagic().log_hours(member_id, event_id))
+
+
+def test_events(event_of):
+    """
+    The async client finds the same events as the sync one
+    """
+    events = asyncio.run(AsyncRagic().fetch_events("LYN00001"))
+    assert event_of("LYN00001") in [event.event_id for event in events.values()]
+
+
+def test_clock_in(read_hours, event_of, clock):
+    """
+    The first scan of the day creates a record starting now
+    """
+    member_id = "LYN00001"
+    event_id = event_of(member_id)
+    clock.at(10)
+    assert log_hours(member_id, event_id) == "Clocked in successfully."
+    records = list(read_hours(member_id, event_id).values())
+    assert len(records) == 1
+    assert records[0][str(Hours.START_TIME)] == "10:00"
+
+
+def test_repeat_scan(read_hours, event_of, clock):
+    """
+    Scans within 10 minutes of clocking in write nothing
+    """
+    member_id = "LYN00002"
+    event_id = event_of(member_id)
+    clock.at(10)
+    assert log_hours(member_id, event_id) == "Clocked in successfully."
+    for minute in (0, 1, 5):
+        clock.at(10, minute)
+        assert log_hours(member_id, event_id) == "You are already clocked in."
+    assert len(read_hours(member_id, event_id)) == 1
+
+
+def test_clock_out(read_hours, event_of, clock):
+    """
+    A later scan clocks out of the record, and the next one is refused
+    """
+    member_id = "LYN00003"
+    event_id = event_of(member_id)
+    clock.at(10)
+    assert log_hours(member_id, event_id) == "Clocked in successfully."
+    clock.at(12, 30)
+    assert log_hours(member_id, event_id) == "Clocked out successfully."
+    records = list(read_hours(member_id, event_id).values())
+    assert len(records) == 1
+    assert records[0][str(Hours.END_TIME)] == "12:30"
+    assert records[0][str(Hours.STATUS)] == "Completed"
+    clock.at(13)
+    assert log_hours(member_id, event_id) == "You have already clocked out."
+
+
+def test_clock_in_by_another_worker(fake_ragic, read_hours, event_of, clock):
+    """
+    A miss in the index is checked with Ragic before clocking in
+    """
+    member_id = "LYN00004"
+    event_id = event_of(member_id)
+    clock.at(10)
+    # Another worker clocks the member in without touching this one's index
+    requests.post(
+        f"{fake_ragic}{HOURS_ROUTE}",
+        data=RagicQueries()._clock_in_payload("E", member_id, event_id, DATE),
+        timeout=5,
+    ).raise_for_status()
+    clock.at(10, 5)
+    assert log_hours(member_id, event_id) == "You are already clocked in."
+    assert len(read_hours(member_id, event_id)) == 1
+
+
+@pytest.mark.usefixtures("clock")
+def test_ragic_unavailable(read_hours, event_of, faults):
+    """
+    A member is asked to try again when Ragic keeps failing
+    """
+    member_id = "LYN00005"
+    event_id = event_of(member_id)
+    faults.error_rate = 1.0
+    assert log_hours(member_id, event_id) == UNAVAILABLE
+    faults.error_rate = 0.0
+    assert not read_hours(member_id, event_id)
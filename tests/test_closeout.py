@@ -0,0 +1,91 @@
+"""
+Clock everyone out of an event in the fake Ragic at once
+"""
+from time import sleep
+
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.closeout import CloseOutError, close_event
+from volunteer_hours.common.enums import Hours
+
+ADMIN = {"Authorization": "Bearer admin"}
+
+
+def clock_in(base_url: str, member_id: str, event_id: int, date: str) -> str:
+    """
+    Clock a member in straight in the fake Ragic
+    :param base_url: the base URL of the fake Ragic
+    :param member_id: the associated member ID
+    :param event_id: the ID of the event
+    :param date: the day of the event
+    :return: the ID of the record
+    """
+    # pylint: disable=protected-access
+    payload = Ragic()._clock_in_payload("E", member_id, event_id, date, "09:00")
+    response = requests.post(f"{base_url}{HOURS_ROUTE}", data=payload, timeout=5)
+    return str(response.json()["ragicId"])
+
+
+def test_close_event(fake_ragic, read_hours):
+    """
+    Every open record of the event on the day is closed, and running it again
+      finds nothing left to close
+    """
+    date = "2022/07/02"
+    for member_id in ("LYN00030", "LYN00031", "LYN00032"):
+        clock_in(fake_ragic, member_id, 7, date)
+    clock_in(fake_ragic, "LYN00033", 7, "2022/07/01")
+    clock_in(fake_ragic, "LYN00034", 8, date)
+    progress = []
+    result = close_event(7, date, "17:00", lambda done, total: progress.append(done))
+    assert (result["open"], result["closed"], result["failed"]) == (3, 3, [])
+    assert sorted(progress) == [1, 2, 3]
+    for member_id in ("LYN00030", "LYN00031", "LYN00032"):
+        record = list(read_hours(member_id, 7, date).values())[0]
+        assert record[str(Hours.END_TIME)] == "17:00"
+        assert record[str(Hours.STATUS)] == "Completed"
+    for member_id, day in (("LYN00033", "2022/07/01"), ("LYN00034", date)):
+        record = list(read_hours(member_id, date=day).values())[0]
+        assert not record.get(str(Hours.END_TIME))
+    assert close_event(7, date, "17:00")["open"] == 0
+
+
+def test_invalid_time():
+    """
+    A close-out at a time that does not exist is refused
+    """
+    with pytest.raises(CloseOutError):
+        close_event(7, "2022/07/02", "25:00")
+    with pytest.raises(CloseOutError):
+        close_event(7, "2022-07-02", "17:00")
+
+
+def test_close_event_api(fake_ragic, read_hours, client):
+    """
+    The close-out runs in the background and its result is polled for
+    """
+    date = "2022/07/03"
+    clock_in(fake_ragic, "LYN00035", 9, date)
+    body = {"date": date, "time": "16:00"}
+    assert client.post("/admin/events/9/close", json=body).status_code == 403
+    response = client.post("/admin/events/9/close", json={"time": "4pm"}, headers=ADMIN)
+    assert response.status_code == 400
+    response = client.post("/admin/events/9/close", json=body, headers=ADMIN)
+    assert response.status_code == 202
+    location = response.headers["Location"]
+    assert location.endswith(response.get_json()["job_id"])
+    for _ in range(50):
+        job = client.get(location, headers=ADMIN).get_json()
+        if job["status"] != "running":
+            break
+        sleep(0.1)
+    assert job["status"] == "done"
+    assert (job["done"], job["total"]) == (1, 1)
+    assert (job["result"]["open"], job["result"]["closed"]) == (1, 1)
+    record = list(read_hours("LYN00035", 9, date).values())[0]
+    assert record[str(Hours.END_TIME)] == "16:00"
+    assert client.get(location).status_code == 403
+    assert client.get("/admin/closeouts/unknown", headers=ADMIN).status_code == 404
@@ -0,0 +1,121 @@
+"""
+Export a sheet of the fake Ragic page by page, and resume an interrupted one
+"""
+import json
+
+import pytest
+import requests
+
+from volunteer_hours import Config
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.export import ExportError, export_sheet
+
+EXPORT_PAGES = Ragic.export_pages
+
+
+def interrupted(self, *args, **kwargs):
+    """
+    Page through a sheet like Ragic.export_pages, losing the connection to
+      Ragic after two pages
+    :return: an iterator of pages of records keyed by record ID
+    """
+    for number, page in enumerate(EXPORT_PAGES(self, *args, **kwargs)):
+        if number == 2:
+            raise requests.ConnectionError("Connection reset")
+        yield page
+
+
+def interrupt(monkeypatch, path, output_format: str = "csv") -> None:
+    """
+    Export the members to a file, stopping after two pages of ten records
+    :param monkeypatch: the monkeypatch fixture
+    :param path: the output file
+    :param output_format: either "csv" or "columns"
+    :return: None
+    """
+    monkeypatch.setattr(Ragic, "export_pages", interrupted)
+    route = Config.ragic_members_route()
+    with pytest.raises(ExportError, match="after 20 records"):
+        export_sheet(route, [], path, output_format, page_size=10)
+    monkeypatch.undo()
+
+
+def state_of(path) -> dict:
+    """
+    Read the saved progress of an export
+    :param path: the output file of the export
+    :return: the progress
+    """
+    return json.loads(path.with_name(f"{path.name}.state").read_text())
+
+
+def test_export(tmp_path):
+    """
+    Every record is written once under a header, and the progress is removed
+      once the export is done
+    """
+    path = tmp_path / "members.csv"
+    assert export_sheet(Config.ragic_members_route(), [], path, page_size=10) == 50
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 51
+    assert lines[0].startswith("record_id,")
+    assert not path.with_name("members.csv.state").exists()
+
+
+def test_resume(tmp_path, monkeypatch):
+    """
+    A resumed export continues after the last page written and ends up the
+      same as one that was never interrupted
+    """
+    route = Config.ragic_members_route()
+    path = tmp_path / "members.csv"
+    interrupt(monkeypatch, path)
+    assert state_of(path)["offset"] == 20
+    with open(path, "a", encoding="utf-8") as output:
+        output.write("a partly written row")
+    assert export_sheet(route, [], path, page_size=10, resume=True) == 50
+    whole = tmp_path / "whole.csv"
+    export_sheet(route, [], whole, page_size=10)
+    assert path.read_bytes() == whole.read_bytes()
+
+
+def test_resume_without_output(tmp_path, monkeypatch):
+    """
+    An export whose output is gone starts over
+    """
+    path = tmp_path / "members.csv"
+    interrupt(monkeypatch, path)
+    path.unlink()
+    route = Config.ragic_members_route()
+    assert export_sheet(route, [], path, page_size=10, resume=True) == 50
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 51
+
+
+def test_resume_other_job(tmp_path, monkeypatch):
+    """
+    Progress saved for another format or filter is not resumed
+    """
+    path = tmp_path / "members.out"
+    interrupt(monkeypatch, path)
+    route = Config.ragic_members_route()
+    with pytest.raises(ExportError, match="different sheet"):
+        export_sheet(route, [], path, "columns", page_size=10, resume=True)
+    with pytest.raises(ExportError, match="different sheet"):
+        export_sheet(route, ["1,eq,x"], path, page_size=10, resume=True)
+
+
+def test_columns(tmp_path, monkeypatch):
+    """
+    A columnar export has a line of columns for each page, and resumes like
+      a CSV one
+    """
+    path = tmp_path / "members.jsonl"
+    interrupt(monkeypatch, path, "columns")
+    route = Config.ragic_members_route()
+    assert export_sheet(route, [], path, "columns", 10, resume=True) == 50
+    chunks = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [chunk["offset"] for chunk in chunks] == [0, 10, 20, 30, 40]
+    ids = [record_id for chunk in chunks for record_id in chunk["ids"]]
+    assert len(set(ids)) == 50
+    for chunk in chunks:
+        assert all(len(column) == 10 for column in chunk["columns"].values())
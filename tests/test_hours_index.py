@@ -0,0 +1,73 @@
+"""
+Index the day's hours detail records from the fake Ragic
+"""
+# pylint: disable=protected-access
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.common.hours_index import HoursIndex
+from volunteer_hours.common.records import HoursDetail
+
+DATE = "2022/06/18"
+
+
+def test_lookup_other_day():
+    """
+    Nothing is found on a day that is not loaded
+    """
+    index = HoursIndex()
+    index.load("2022/01/01", {("LYN00040", "1"): ("7", HoursDetail("", "09:00"))})
+    assert index.is_current("2022/01/01")
+    assert not index.is_current("2022/01/02")
+    assert index.lookup("LYN00040", 1, "2022/01/02") is None
+    assert index.lookup("LYN00041", 1, "2022/01/01") is None
+    assert "7" in index.lookup("LYN00040", 1, "2022/01/01")
+
+
+def test_update():
+    """
+    Changes are merged into the record known for a member, and changes to
+      another day are ignored
+    """
+    index = HoursIndex()
+    index.load("2022/01/01", {})
+    index.update("LYN00040", 1, "2022/01/01", "7", HoursDetail("", "09:00"))
+    index.update("LYN00040", 1, "2022/01/01", None, HoursDetail("Completed", None))
+    index.update("LYN00041", 1, "2022/01/02", "8", HoursDetail("", "09:00"))
+    details = index.lookup("LYN00040", 1, "2022/01/01")["7"]
+    assert (details.status, details.start_time) == ("Completed", "09:00")
+    assert index.lookup("LYN00041", 1, "2022/01/01") is None
+
+
+@pytest.mark.usefixtures("clock")
+def test_load_from_ragic(fake_ragic):
+    """
+    Loading the index reads every record of the day from Ragic once
+    """
+    ragic = Ragic()
+    payload = ragic._clock_in_payload("E", "LYN00042", 3, DATE, "09:30")
+    response = requests.post(f"{fake_ragic}{HOURS_ROUTE}", data=payload, timeout=5)
+    record_id = str(response.json()["ragicId"])
+    HoursIndex().load("2022/01/01", {})
+    assert ragic._indexed_hours("LYN00042", 3) is not None
+    details = HoursIndex().lookup("LYN00042", 3, DATE)[record_id]
+    assert (details.status, details.start_time) == ("", "09:30")
+    # Loaded already, so records written since are not seen
+    payload = ragic._clock_in_payload("E", "LYN00043", 3, DATE, "09:45")
+    requests.post(f"{fake_ragic}{HOURS_ROUTE}", data=payload, timeout=5)
+    assert ragic._indexed_hours("LYN00043", 3) is None
+
+
+@pytest.mark.usefixtures("clock")
+def test_written_clock_in_is_indexed():
+    """
+    A clock in written by this worker is found in the index afterwards
+    """
+    ragic = Ragic()
+    event_id = list(ragic.fetch_events("LYN00044").values())[0].event_id
+    assert ragic.load_hours_index()
+    assert ragic.log_hours("LYN00044", event_id) == "Clocked in successfully."
+    details = list(HoursIndex().lookup("LYN00044", event_id, DATE).values())[0]
+    assert (details.status, details.start_time) == ("", "10:00")
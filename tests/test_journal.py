@@ -0,0 +1,102 @@
+"""
+Journal clock events and write them to the fake Ragic in the background
+"""
+from time import sleep
+
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.api.write_behind import JournalFlusher
+from volunteer_hours.common.enums import Hours
+from volunteer_hours.common.journal import Journal
+
+DATE = "2022/06/19"
+
+
+def test_record_once():
+    """
+    A clock event is recorded once, and reads back like an hours record
+    """
+    journal = Journal()
+    assert journal.recorded("LYN00020", 1, DATE) is None
+    assert journal.record(Journal.CLOCK_IN, "LYN00020", 1, DATE, "09:00")
+    assert not journal.record(Journal.CLOCK_IN, "LYN00020", 1, DATE, "09:05")
+    clocked_in = journal.recorded("LYN00020", 1, DATE)
+    assert (clocked_in.status, clocked_in.start_time) == ("", "09:00")
+    assert journal.pending_clock_ins(1, DATE) == ["LYN00020"]
+    assert journal.record(Journal.CLOCK_OUT, "LYN00020", 1, DATE, "11:00")
+    assert journal.recorded("LYN00020", 1, DATE).completed
+    assert not journal.pending_clock_ins(1, DATE)
+
+
+def test_flush(read_hours, event_of):
+    """
+    The flusher writes a clock in and then the clock out of the record it
+      created
+    """
+    member_id = "LYN00021"
+    event_id = event_of(member_id)
+    journal = Journal()
+    journal.record(Journal.CLOCK_IN, member_id, event_id, DATE, "09:00")
+    journal.record(Journal.CLOCK_OUT, member_id, event_id, DATE, "11:30")
+    while JournalFlusher().flush():
+        pass
+    records = list(read_hours(member_id, event_id, DATE).values())
+    assert len(records) == 1
+    assert records[0][str(Hours.START_TIME)] == "09:00"
+    assert records[0][str(Hours.END_TIME)] == "11:30"
+    assert records[0][str(Hours.STATUS)] == "Completed"
+    assert journal.clock_in_record(member_id, event_id, DATE)
+    assert not journal.pending_clock_ins(event_id, DATE)
+
+
+def test_flush_clock_in_already_written(read_hours, event_of):
+    """
+    A clock in that reached Ragic on an earlier attempt is not written again
+    """
+    member_id = "LYN00022"
+    event_id = event_of(member_id)
+    ragic = Ragic()
+    # pylint: disable=protected-access
+    eid = ragic._attendance_eid(ragic.fetch_events(member_id), event_id)
+    record_id = str(ragic._clock_in(eid, member_id, event_id, DATE, "09:00")["ragicId"])
+    Journal().record(Journal.CLOCK_IN, member_id, event_id, DATE, "09:00")
+    while JournalFlusher().flush():
+        pass
+    assert list(read_hours(member_id, date=None)) == [record_id]
+    assert Journal().clock_in_record(member_id, event_id, DATE) == record_id
+
+
+def test_flush_retries(read_hours, event_of, faults):
+    """
+    An entry that fails is held back, then written on a later pass
+    """
+    member_id = "LYN00023"
+    event_id = event_of(member_id)
+    journal = Journal()
+    journal.record(Journal.CLOCK_IN, member_id, event_id, DATE, "09:00")
+    faults.error_rate = 1.0
+    while JournalFlusher().flush():
+        pass
+    faults.error_rate = 0.0
+    assert not read_hours(member_id, event_id, DATE)
+    assert journal.pending_clock_ins(event_id, DATE) == [member_id]
+    # The first retry waits two seconds
+    sleep(2.1)
+    while JournalFlusher().flush():
+        pass
+    assert len(read_hours(member_id, event_id, DATE)) == 1
+    assert not journal.pending_clock_ins(event_id, DATE)
+
+
+def test_abandon():
+    """
+    An abandoned entry is listed for an admin and may be recorded afresh
+    """
+    journal = Journal()
+    journal.record(Journal.CLOCK_IN, "LYN00024", 1, DATE, "09:00")
+    entry = next(row for row in journal.claim(100, 0) if row["member_id"] == "LYN00024")
+    journal.abandon(entry["id"])
+    assert journal.recorded("LYN00024", 1, DATE) is None
+    assert [row["key"] for row in journal.abandoned()] == [entry["key"]]
+    assert journal.counts()["abandoned"] == 1
+    assert journal.record(Journal.CLOCK_IN, "LYN00024", 1, DATE, "09:10")
+    assert journal.recorded("LYN00024", 1, DATE).start_time == "09:10"
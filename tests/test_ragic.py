@@ -0,0 +1,118 @@
+"""
+Clock in and out with the Ragic client against the fake Ragic
+"""
+# pylint: disable=protected-access
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE
+from volunteer_hours.api.ragic import NO_ATTENDANCE, NO_EVENT, UNAVAILABLE, Ragic
+from volunteer_hours.common.enums import Hours
+
+DATE = "2022/06/18"
+
+
+def test_clock_in_and_out(read_hours, event_of, clock):
+    """
+    A member clocks in, is held off for 10 minutes, clocks out once and is
+      refused after that
+    """
+    member_id = "LYN00010"
+    event_id = event_of(member_id)
+    ragic = Ragic()
+    assert ragic.log_hours(member_id, event_id) == "Clocked in successfully."
+    clock.at(10, 5)
+    assert ragic.log_hours(member_id, event_id) == "You are already clocked in."
+    clock.at(12, 30)
+    assert ragic.log_hours(member_id, event_id) == "Clocked out successfully."
+    clock.at(13)
+    assert ragic.log_hours(member_id, event_id) == "You have already clocked out."
+    records = list(read_hours(member_id, event_id).values())
+    assert len(records) == 1
+    assert records[0][str(Hours.START_TIME)] == "10:00"
+    assert records[0][str(Hours.END_TIME)] == "12:30"
+    assert records[0][str(Hours.STATUS)] == "Completed"
+
+
+@pytest.mark.usefixtures("clock")
+def test_no_event(read_hours):
+    """
+    A scan without an event writes nothing
+    """
+    member_id = "LYN00011"
+    assert Ragic().log_hours(member_id, -1) == NO_EVENT
+    assert not read_hours(member_id)
+
+
+@pytest.mark.usefixtures("clock")
+def test_no_attendance(read_hours):
+    """
+    A member who did not sign up for any event is not clocked in
+    """
+    member_id = "LYN99999"
+    assert Ragic().log_hours(member_id, 1) == NO_ATTENDANCE
+    assert not read_hours(member_id)
+
+
+def test_repeated_request(read_hours, event_of, clock):
+    """
+    A kiosk retrying a request gets the first answer without a second write
+    """
+    member_id = "LYN00012"
+    event_id = event_of(member_id)
+    ragic = Ragic()
+    assert ragic.log_hours(member_id, event_id, "key") == "Clocked in successfully."
+    clock.at(12)
+    assert ragic.log_hours(member_id, event_id, "key") == "Clocked in successfully."
+    records = list(read_hours(member_id, event_id).values())
+    assert len(records) == 1
+    assert not records[0].get(str(Hours.END_TIME))
+
+
+@pytest.mark.usefixtures("clock")
+def test_clock_in_by_another_worker(fake_ragic, read_hours, event_of):
+    """
+    A member missing from the index is looked up in Ragic before clocking in
+    """
+    member_id = "LYN00013"
+    event_id = event_of(member_id)
+    ragic = Ragic()
+    assert ragic.load_hours_index()
+    payload = ragic._clock_in_payload("E", member_id, event_id, DATE, "09:55")
+    requests.post(f"{fake_ragic}{HOURS_ROUTE}", data=payload, timeout=5)
+    assert ragic.log_hours(member_id, event_id) == "You are already clocked in."
+    assert len(read_hours(member_id, event_id)) == 1
+
+
+def test_clock_out_by_another_worker(fake_ragic, read_hours, event_of, clock):
+    """
+    An open record in the index is checked with Ragic before clocking out,
+      so the end time another worker wrote is kept
+    """
+    member_id = "LYN00014"
+    event_id = event_of(member_id)
+    ragic = Ragic()
+    assert ragic.log_hours(member_id, event_id) == "Clocked in successfully."
+    record_id = list(ragic._indexed_hours(member_id, event_id))[0]
+    requests.post(
+        f"{fake_ragic}{HOURS_ROUTE}/{record_id}",
+        data=ragic._clock_out_payload("11:00"),
+        timeout=5,
+    )
+    clock.at(12)
+    assert ragic.log_hours(member_id, event_id) == "You have already clocked out."
+    record = read_hours(member_id, event_id)[str(record_id)]
+    assert record[str(Hours.END_TIME)] == "11:00"
+
+
+@pytest.mark.usefixtures("clock")
+def test_ragic_unavailable(read_hours, event_of, faults):
+    """
+    A member is asked to try again when Ragic keeps failing
+    """
+    member_id = "LYN00015"
+    event_id = event_of(member_id)
+    faults.error_rate = 1.0
+    assert Ragic().log_hours(member_id, event_id) == UNAVAILABLE
+    faults.error_rate = 0.0
+    assert not read_hours(member_id, event_id)
@@ -0,0 +1,133 @@
+"""
+Total the hours in the fake Ragic with the columnar hours table
+"""
+# pylint: disable=redefined-outer-name
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE
+from volunteer_hours.common.enums import Hours
+
+numpy = pytest.importorskip("numpy")
+
+# pylint: disable=wrong-import-position
+from volunteer_hours.common.hours_table import (
+    HoursTable,
+    parse_dates,
+    parse_times,
+)
+
+ADMIN = {"Authorization": "Bearer admin"}
+SHIFTS = [
+    ("RPT1", "Food Bank", "2021/03/01", "09:00", "12:30"),
+    ("RPT1", "Food Bank", "2021/03/02", "22:00", "01:00"),
+    ("RPT2", "Food Bank", "2021/03/02", "09:00", ""),
+    ("RPT2", "Garden", "2021/04/01", "10:00", "11:00"),
+    ("RPT3", "Garden", "2021/05/01", "10:00", "11:00"),
+]
+
+
+def row(member_id: str, event: str, date: str, start: str, end: str) -> dict:
+    """
+    Build an hours detail record with fields named by ID
+    :return: the record
+    """
+    return {
+        str(Hours.NEW_MEMBERSHIP_ID): member_id,
+        str(Hours.EVENT_NAME): event,
+        str(Hours.DATE): date,
+        str(Hours.START_TIME): start,
+        str(Hours.END_TIME): end,
+    }
+
+
+@pytest.fixture(scope="module")
+def shifts(fake_ragic):
+    """
+    Write the shifts to the fake Ragic once for the module
+    :return: None
+    """
+    for shift in SHIFTS:
+        requests.post(
+            f"{fake_ragic}{HOURS_ROUTE}", data=row(*shift), timeout=5
+        ).raise_for_status()
+
+
+def test_parse_times():
+    """
+    Times are minutes after midnight, malformed times are flagged
+    """
+    minutes, valid = parse_times(numpy, ["00:00", "09:30", "23:59", "24:00", "9:5", ""])
+    assert valid.tolist() == [True, True, True, False, False, False]
+    assert minutes[:3].tolist() == [0, 570, 1439]
+
+
+def test_parse_dates():
+    """
+    Dates are days, malformed dates are flagged
+    """
+    dates, valid = parse_dates(numpy, ["2021/03/01", "2020/02/29", "2021/13/01", "x"])
+    assert valid.tolist() == [True, True, False, False]
+    assert str(dates[0]) == "2021-03-01"
+    assert str(dates[1]) == "2020-02-29"
+
+
+def test_totals():
+    """
+    Shifts past midnight count until the next morning, open shifts count no
+      hours, and records without a valid date are left out
+    """
+    page = {str(index): row(*shift) for index, shift in enumerate(SHIFTS[:3])}
+    page["x"] = row("RPT9", "Food Bank", "not a date", "09:00", "10:00")
+    table = HoursTable.from_pages([page])
+    assert len(table) == 3
+    assert table.summary() == {"hours": 6.5, "shifts": 2, "open": 1}
+    assert table.totals("member") == [
+        {"member": "RPT1", "hours": 6.5, "shifts": 2, "open": 0},
+        {"member": "RPT2", "hours": 0.0, "shifts": 0, "open": 1},
+    ]
+    assert [(total["date"], total["hours"]) for total in table.totals("date")] == [
+        ("2021/03/01", 3.5),
+        ("2021/03/02", 3.0),
+    ]
+
+
+@pytest.mark.usefixtures("shifts")
+def test_report(client):
+    """
+    The report totals the shifts of a date range by month
+    """
+    params = {"start": "2021/03/01", "end": "2021/04/30", "by": "month"}
+    response = client.get("/reports", query_string={**params, "format": "json"})
+    assert response.status_code == 403
+    response = client.get(
+        "/reports", query_string={**params, "format": "json"}, headers=ADMIN
+    )
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["records"] == 4
+    assert report["summary"] == {"hours": 7.5, "shifts": 3, "open": 1}
+    assert report["totals"] == [
+        {"month": "2021/03", "hours": 6.5, "shifts": 2, "open": 1},
+        {"month": "2021/04", "hours": 1.0, "shifts": 1, "open": 0},
+    ]
+    response = client.get("/reports", query_string=params, headers=ADMIN)
+    assert response.status_code == 200
+    assert b"2021/04" in response.data
+
+
+@pytest.mark.usefixtures("shifts")
+def test_report_errors(client):
+    """
+    A bad range or grouping is refused
+    """
+    for params in (
+        {"start": "2021/04/01", "end": "2021/03/01"},
+        {"start": "2021-03-01"},
+        {"by": "week"},
+    ):
+        response = client.get(
+            "/reports", query_string={**params, "format": "json"}, headers=ADMIN
+        )
+        assert response.status_code == 400
+        assert response.get_json()["error"]
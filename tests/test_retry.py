@@ -0,0 +1,143 @@
+"""
+Retry calls to the fake Ragic behind the circuit breaker
+"""
+from time import sleep
+
+import pytest
+import requests
+
+from benchmarks.fake_ragic import HOURS_ROUTE
+from volunteer_hours.api.retry import CircuitBreaker, RagicCall, RagicUnavailable
+from volunteer_hours.common.metrics import Metrics
+
+TRANSIENT = (requests.ConnectionError, requests.Timeout)
+
+
+def retries(method: str) -> float:
+    """
+    Read the number of retried calls from the metrics
+    :param method: the HTTP method of the calls
+    :return: the count
+    """
+    prefix = f'ragic_retries_total{{method="{method}"}} '
+    for line in Metrics().ragic_retries.render():
+        if line.startswith(prefix):
+            return float(line[len(prefix) :])
+    return 0.0
+
+
+def opened() -> CircuitBreaker:
+    """
+    Open the circuit with a run of failures
+    :return: the breaker
+    """
+    breaker = CircuitBreaker()
+    for _ in range(5):
+        breaker.check()
+        breaker.failure()
+    return breaker
+
+
+@pytest.mark.usefixtures("faults")
+def test_breaker():
+    """
+    The circuit opens after five failures in a row, lets a single trial call
+      through once it has cooled down, and closes when the trial succeeds
+    """
+    breaker = CircuitBreaker()
+    for _ in range(4):
+        breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.success()
+    breaker = opened()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(RagicUnavailable):
+        breaker.check()
+    sleep(0.25)
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(RagicUnavailable):
+        breaker.check()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+@pytest.mark.usefixtures("faults")
+def test_failed_trial():
+    """
+    A trial call that fails opens the circuit again, even when it fails with
+      an error that is not retried
+    """
+
+    def request(timeout):
+        raise KeyError(timeout)
+
+    breaker = opened()
+    sleep(0.25)
+    with pytest.raises(KeyError):
+        RagicCall("GET", True, TRANSIENT).send(request)
+    assert breaker.state == CircuitBreaker.OPEN
+    sleep(0.25)
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_get_is_retried(fake_ragic, faults):
+    """
+    A GET answered with an error is retried twice, and the last response is
+      returned
+    """
+    attempts = []
+
+    def request(timeout):
+        attempts.append(timeout)
+        return requests.get(f"{fake_ragic}{HOURS_ROUTE}", timeout=timeout)
+
+    faults.error_rate = 1.0
+    before = retries("GET")
+    response = RagicCall("GET", True, TRANSIENT).send(request)
+    assert response.status_code == 503
+    assert len(attempts) == 3
+    assert retries("GET") == before + 2
+    faults.error_rate = 0.0
+    CircuitBreaker().success()
+    assert RagicCall("GET", True, TRANSIENT).send(request).status_code == 200
+    assert len(attempts) == 4
+
+
+def test_post_is_not_retried(fake_ragic, faults):
+    """
+    A POST might have been written, so it is not repeated
+    """
+    attempts = []
+
+    def request(timeout):
+        attempts.append(timeout)
+        return requests.post(f"{fake_ragic}{HOURS_ROUTE}", data={}, timeout=timeout)
+
+    faults.error_rate = 1.0
+    before = retries("POST")
+    assert RagicCall("POST", False, TRANSIENT).send(request).status_code == 503
+    assert len(attempts) == 1
+    assert retries("POST") == before
+
+
+def test_unavailable(fake_ragic, faults):
+    """
+    Calls fail fast once repeated failures have opened the circuit
+    """
+    attempts = []
+
+    def request(timeout):
+        attempts.append(timeout)
+        return requests.get(f"{fake_ragic}{HOURS_ROUTE}", timeout=timeout)
+
+    faults.error_rate = 1.0
+    RagicCall("GET", True, TRANSIENT).send(request)
+    with pytest.raises(RagicUnavailable):
+        RagicCall("GET", True, TRANSIENT).send(request)
+    assert len(attempts) == 5
+    with pytest.raises(RagicUnavailable):
+        RagicCall("GET", True, TRANSIENT).send(request)
+    assert len(attempts) == 5
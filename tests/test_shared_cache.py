@@ -0,0 +1,59 @@
+"""
+Share cached values between workers through SQLite
+"""
+import sqlite3
+
+from volunteer_hours import Config
+from volunteer_hours.common.shared_cache import SharedCache
+
+
+def test_put_and_get():
+    """
+    A stored value reads back with its age until it expires
+    """
+    cache = SharedCache()
+    cache.put("member", "LYN00001", {"name": "Volunteer 1"}, 60)
+    assert cache.get("member", "LYN00001") == {"name": "Volunteer 1"}
+    value, age = cache.get_with_age("member", "LYN00001")
+    assert value == {"name": "Volunteer 1"}
+    assert 0 <= age < 60
+    cache.put("member", "LYN00002", ["expired"], -1)
+    assert cache.get("member", "LYN00002") is None
+    assert cache.get("roster", "LYN00001") is None
+
+
+def test_invalidate_and_clear():
+    """
+    Entries can be dropped one at a time or a namespace at once
+    """
+    cache = SharedCache()
+    for key in ("a", "b"):
+        cache.put("test", key, key, 60)
+    cache.put("other", "a", "a", 60)
+    cache.invalidate("test", "a")
+    assert cache.get("test", "a") is None
+    assert cache.get("test", "b") == "b"
+    cache.clear("test")
+    assert cache.get("test", "b") is None
+    assert cache.get("other", "a") == "a"
+
+
+def test_corrupt_value():
+    """
+    A value garbled on disk is a miss and is dropped
+    """
+    cache = SharedCache()
+    cache.put("member", "LYN00003", {"name": "Volunteer 3"}, 60)
+    path = Config.config_dir() / Config.shared_cache_name()
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute(
+            "UPDATE cache SET value = ? WHERE namespace = ? AND key = ?",
+            ('{"name": "Volu', "member", "LYN00003"),
+        )
+    assert cache.get("member", "LYN00003") is None
+    with sqlite3.connect(str(path)) as conn:
+        rows = conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND key = ?",
+            ("member", "LYN00003"),
+        ).fetchone()
+    assert rows == (0,)
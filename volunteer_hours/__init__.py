@@ -3,11 +3,11 @@ Package wide configurations
 """
 import os
 import sys
+import secrets
+from functools import lru_cache
 from typing import Optional
 from pathlib import Path
-from threading import Lock
-
-from dotenv import dotenv_values, find_dotenv, set_key
+from threading import RLock
 
 
 class ThreadSafeMeta(type):
@@ -16,7 +16,7 @@ class ThreadSafeMeta(type):
     """
 
     _instances: dict = {}
-    _lock = Lock()
+    _lock = RLock()
 
     def __call__(cls, *args, **kwargs):
         """
@@ -34,32 +34,92 @@ class Config(metaclass=ThreadSafeMeta):
     """
     Global program configuration, uses the dotenv package to load runtime
       configuration from a .env file, once and only once into this object,
-      this object can be used through-out the code base
+      the first time a setting is read, this object can be used through-out
+      the code base, environment variables take precedence over the .env file
     """
 
-    try:
-        __package = "volunteer_hours"
-        __version = "1.0.0"
-        __default_env = "dev"
-        __logfile_name = f"{__package}-{__version}.log"
-        __config = dotenv_values(find_dotenv())
-        __env = __config["APP_ENV"]
-        __ragic_api_key = __config["RAGIC_API_KEY"]
-        __config_dir = (
-            Path().home() / "AppData" / "Local" / __package
-            if os.name == "nt"
-            else Path().home() / ".config" / __package
-        )
-        __ragic_members_route = "lynvolunteer/lyn-temp/53"
-        __ragic_attendance_route = "lynvolunteer/lyn-temp/9"
-        __ragic_hours_detail = "lynvolunteer/lyn-temp/55"
-        __date_format = "%Y/%m/%d"
-        __time_format = "%H:%M"
-        __timezone_name = "America/Vancouver"
-        __member_prefix = "LYN"
-    except KeyError as error:
-        sys.stderr.write(f"Dotenv config error: {error} is missing\n")
-        sys.exit(1)
+    __package = "volunteer_hours"
+    __version = "1.0.0"
+    __default_env = "dev"
+    __logfile_name = f"{__package}-{__version}.log"
+    __ragic_members_route = "lynvolunteer/lyn-temp/53"
+    __ragic_attendance_route = "lynvolunteer/lyn-temp/9"
+    __ragic_hours_detail = "lynvolunteer/lyn-temp/55"
+    __date_format = "%Y/%m/%d"
+    __time_format = "%H:%M"
+    __timezone_name = "America/Vancouver"
+    __member_prefix = "LYN"
+    __journal_name = "journal.db"
+    __shared_cache_name = "cache.db"
+    __profile_dir_name = "profiles"
+    __secret_key_name = "secret_key"
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def __settings() -> dict:
+        """
+        Load the runtime configuration on first use, so that importing the
+          package does not touch the disk
+        :return: settings keyed by getter name
+        """
+        # pylint: disable=import-outside-toplevel
+        from dotenv import dotenv_values, find_dotenv
+
+        config = {**dotenv_values(find_dotenv()), **os.environ}
+        truthy = ("1", "true", "yes")
+        package = Config.package()
+        try:
+            return {
+                "env": config["APP_ENV"],
+                "ragic_api_key": config["RAGIC_API_KEY"],
+                "config_dir": (
+                    Path(config["CONFIG_DIR"])
+                    if config.get("CONFIG_DIR")
+                    else Path().home() / "AppData" / "Local" / package
+                    if os.name == "nt"
+                    else Path().home() / ".config" / package
+                ),
+                "ragic_base_url": config.get("RAGIC_BASE_URL")
+                or "https://na3.ragic.com",
+                "ragic_pool_size": int(config.get("RAGIC_POOL_SIZE") or 10),
+                "ragic_timeout": (
+                    float(config.get("RAGIC_CONNECT_TIMEOUT") or 3.05),
+                    float(config.get("RAGIC_READ_TIMEOUT") or 10),
+                ),
+                "ragic_deadline": float(config.get("RAGIC_DEADLINE") or 20),
+                "ragic_retries": int(config.get("RAGIC_RETRIES") or 2),
+                "ragic_backoff": float(config.get("RAGIC_BACKOFF") or 0.25),
+                "breaker_failures": int(config.get("BREAKER_FAILURES") or 5),
+                "breaker_cooldown": float(config.get("BREAKER_COOLDOWN") or 30),
+                "member_cache_size": int(config.get("MEMBER_CACHE_SIZE") or 1024),
+                "member_cache_ttl": float(config.get("MEMBER_CACHE_TTL") or 3600),
+                "lookup_workers": int(config.get("LOOKUP_WORKERS") or 8),
+                "lookup_timeout": float(config.get("LOOKUP_TIMEOUT") or 15),
+                "secret_key": config.get("SECRET_KEY") or None,
+                "scan_debounce": float(config.get("SCAN_DEBOUNCE") or 3),
+                "member_lock_stripes": int(config.get("MEMBER_LOCK_STRIPES") or 64),
+                "idempotency_ttl": float(config.get("IDEMPOTENCY_TTL") or 600),
+                "write_behind": config.get("WRITE_BEHIND", "true").lower() in truthy,
+                "journal_batch_size": int(config.get("JOURNAL_BATCH_SIZE") or 20),
+                "journal_max_attempts": int(config.get("JOURNAL_MAX_ATTEMPTS") or 50),
+                "roster_refresh": float(config.get("ROSTER_REFRESH") or 300),
+                "roster_max_age": float(config.get("ROSTER_MAX_AGE") or 900),
+                "log_queue_size": int(config.get("LOG_QUEUE_SIZE") or 10000),
+                "log_overflow": (config.get("LOG_OVERFLOW") or "drop").lower(),
+                "async_views": config.get("ASYNC_VIEWS", "").lower() in truthy,
+                "admin_token": config.get("ADMIN_TOKEN") or None,
+                "closeout_workers": int(config.get("CLOSEOUT_WORKERS") or 8),
+                "closeout_rate": float(config.get("CLOSEOUT_RATE") or 20),
+                "shared_cache": config.get("SHARED_CACHE", "true").lower() in truthy,
+                "shared_cache_size": int(config.get("SHARED_CACHE_SIZE") or 10000),
+                "profile": config.get("PROFILE", "").lower() in truthy,
+                "profile_threshold": float(config.get("PROFILE_THRESHOLD") or 500),
+                "profile_rate": float(config.get("PROFILE_RATE") or 0.1),
+                "profile_keep": int(config.get("PROFILE_KEEP") or 200),
+            }
+        except KeyError as error:
+            sys.stderr.write(f"Dotenv config error: {error} is missing\n")
+            sys.exit(1)
 
     @classmethod
     def package(cls) -> str:
@@ -94,21 +154,28 @@ class Config(metaclass=ThreadSafeMeta):
         """
         Getter for config
         """
-        return cls.__env
+        return cls.__settings()["env"]
 
     @classmethod
     def ragic_api_key(cls) -> Optional[str]:
         """
         Getter for Ragic API key
         """
-        return cls.__ragic_api_key
+        return cls.__settings()["ragic_api_key"]
 
     @classmethod
     def config_dir(cls) -> Path:
         """
         Getter for config directory
         """
-        return cls.__config_dir
+        return cls.__settings()["config_dir"]
+
+    @classmethod
+    def ragic_base_url(cls) -> str:
+        """
+        Getter for the base URL of the Ragic API
+        """
+        return cls.__settings()["ragic_base_url"]
 
     @classmethod
     def ragic_members_route(cls) -> str:
@@ -158,3 +225,286 @@ class Config(metaclass=ThreadSafeMeta):
         Getter for member prefix
         """
         return cls.__member_prefix
+
+    @classmethod
+    def ragic_pool_size(cls) -> int:
+        """
+        Getter for the number of pooled connections to Ragic
+        """
+        return cls.__settings()["ragic_pool_size"]
+
+    @classmethod
+    def ragic_timeout(cls) -> tuple[float, float]:
+        """
+        Getter for Ragic connect and read timeouts in seconds
+        """
+        return cls.__settings()["ragic_timeout"]
+
+    @classmethod
+    def ragic_deadline(cls) -> float:
+        """
+        Getter for how long one call to Ragic may take in seconds, retries
+          included
+        """
+        return cls.__settings()["ragic_deadline"]
+
+    @classmethod
+    def ragic_retries(cls) -> int:
+        """
+        Getter for how many times a failed GET request to Ragic is retried
+        """
+        return cls.__settings()["ragic_retries"]
+
+    @classmethod
+    def ragic_backoff(cls) -> float:
+        """
+        Getter for the base delay between retries in seconds, doubled on
+          every attempt
+        """
+        return cls.__settings()["ragic_backoff"]
+
+    @classmethod
+    def breaker_failures(cls) -> int:
+        """
+        Getter for how many failures in a row open the circuit to Ragic
+        """
+        return cls.__settings()["breaker_failures"]
+
+    @classmethod
+    def breaker_cooldown(cls) -> float:
+        """
+        Getter for how long the circuit to Ragic stays open in seconds before
+          a trial call is let through
+        """
+        return cls.__settings()["breaker_cooldown"]
+
+    @classmethod
+    def member_cache_size(cls) -> int:
+        """
+        Getter for the maximum number of cached member profiles
+        """
+        return cls.__settings()["member_cache_size"]
+
+    @classmethod
+    def member_cache_ttl(cls) -> float:
+        """
+        Getter for how long a cached member profile stays fresh in seconds
+        """
+        return cls.__settings()["member_cache_ttl"]
+
+    @classmethod
+    def lookup_workers(cls) -> int:
+        """
+        Getter for the number of threads used for concurrent lookups
+        """
+        return cls.__settings()["lookup_workers"]
+
+    @classmethod
+    def lookup_timeout(cls) -> float:
+        """
+        Getter for how long to wait for concurrent lookups in seconds
+        """
+        return cls.__settings()["lookup_timeout"]
+
+    @classmethod
+    def async_views(cls) -> bool:
+        """
+        Getter for whether to serve the Ragic backed pages with async views
+        """
+        return cls.__settings()["async_views"]
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def __host_secret_key() -> str:
+        """
+        Read the session key kept under the config directory, generating it
+          the first time, so that every worker on the host shares one key
+        :return: the key
+        """
+        # pylint: disable=import-outside-toplevel
+        import tempfile
+
+        config_dir = Config.config_dir()
+        path = config_dir / Config.__secret_key_name
+        if not path.exists():
+            config_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=config_dir, delete=False) as temp:
+                temp.write(secrets.token_hex(32))
+            try:
+                # Linking fails if another worker stored its key first
+                os.link(temp.name, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temp.name)
+        return path.read_text(encoding="utf-8").strip()
+
+    @classmethod
+    def secret_key(cls) -> str:
+        """
+        Getter for the key that signs session cookies, when SECRET_KEY is not
+          set a key is generated once per host and kept under the config
+          directory, so that every worker accepts the same cookies
+        """
+        return cls.__settings()["secret_key"] or cls.__host_secret_key()
+
+    @classmethod
+    def scan_debounce(cls) -> float:
+        """
+        Getter for how long repeated scans of the same card at a kiosk are
+          ignored in seconds
+        """
+        return cls.__settings()["scan_debounce"]
+
+    @classmethod
+    def member_lock_stripes(cls) -> int:
+        """
+        Getter for the number of locks that clock ins and outs are striped over
+        """
+        return cls.__settings()["member_lock_stripes"]
+
+    @classmethod
+    def idempotency_ttl(cls) -> float:
+        """
+        Getter for how long the outcome of a clock in or out is remembered
+          for requests repeating its idempotency key in seconds
+        """
+        return cls.__settings()["idempotency_ttl"]
+
+    @classmethod
+    def journal_name(cls) -> str:
+        """
+        Getter for the file name of the clock event journal
+        """
+        return cls.__journal_name
+
+    @classmethod
+    def shared_cache_name(cls) -> str:
+        """
+        Getter for the file name of the cache shared by every worker
+        """
+        return cls.__shared_cache_name
+
+    @classmethod
+    def shared_cache(cls) -> bool:
+        """
+        Getter for whether member info and the roster are also cached where
+          every worker on the host can read them
+        """
+        return cls.__settings()["shared_cache"]
+
+    @classmethod
+    def shared_cache_size(cls) -> int:
+        """
+        Getter for the maximum number of entries in the shared cache
+        """
+        return cls.__settings()["shared_cache_size"]
+
+    @classmethod
+    def write_behind(cls) -> bool:
+        """
+        Getter for whether clock events are journaled and written to Ragic
+          in the background
+        """
+        return cls.__settings()["write_behind"]
+
+    @classmethod
+    def journal_batch_size(cls) -> int:
+        """
+        Getter for the number of journal entries flushed per pass
+        """
+        return cls.__settings()["journal_batch_size"]
+
+    @classmethod
+    def journal_max_attempts(cls) -> int:
+        """
+        Getter for how many times a journal entry is retried before giving up
+        """
+        return cls.__settings()["journal_max_attempts"]
+
+    @classmethod
+    def roster_refresh(cls) -> float:
+        """
+        Getter for how often the attendance roster is reloaded in seconds
+        """
+        return cls.__settings()["roster_refresh"]
+
+    @classmethod
+    def roster_max_age(cls) -> float:
+        """
+        Getter for the oldest attendance roster to trust in seconds
+        """
+        return cls.__settings()["roster_max_age"]
+
+    @classmethod
+    def log_queue_size(cls) -> int:
+        """
+        Getter for the maximum number of log records waiting to be written
+        """
+        return cls.__settings()["log_queue_size"]
+
+    @classmethod
+    def log_overflow(cls) -> str:
+        """
+        Getter for what to do when the log queue is full, either "drop" the
+          new record or "block" until there is room
+        """
+        return cls.__settings()["log_overflow"]
+
+    @classmethod
+    def admin_token(cls) -> Optional[str]:
+        """
+        Getter for the bearer token of the admin routes, which are disabled
+          when it is not set
+        """
+        return cls.__settings()["admin_token"]
+
+    @classmethod
+    def closeout_workers(cls) -> int:
+        """
+        Getter for the number of records closed out at the same time
+        """
+        return cls.__settings()["closeout_workers"]
+
+    @classmethod
+    def closeout_rate(cls) -> float:
+        """
+        Getter for the most records closed out per second, 0 for no limit
+        """
+        return cls.__settings()["closeout_rate"]
+
+    @classmethod
+    def profile_dir(cls) -> Path:
+        """
+        Getter for the directory that request profiles are written to
+        """
+        return cls.config_dir() / cls.__profile_dir_name
+
+    @classmethod
+    def profile(cls) -> bool:
+        """
+        Getter for whether requests are sampled by the profiler
+        """
+        return cls.__settings()["profile"]
+
+    @classmethod
+    def profile_threshold(cls) -> float:
+        """
+        Getter for the latency above which a sampled request's profile is
+          kept in milliseconds
+        """
+        return cls.__settings()["profile_threshold"]
+
+    @classmethod
+    def profile_rate(cls) -> float:
+        """
+        Getter for the most requests sampled by the profiler per second
+        """
+        return cls.__settings()["profile_rate"]
+
+    @classmethod
+    def profile_keep(cls) -> int:
+        """
+        Getter for the number of most recent profiles to keep
+        """
+        return cls.__settings()["profile_keep"]
@@ -0,0 +1,334 @@
+"""
+An asyncio wrapper for the Ragic API
+"""
+import asyncio
+from threading import Lock, Thread
+from typing import Callable, Optional, TypeVar
+
+import httpx
+import requests
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.api.ragic import NO_EVENT, UNAVAILABLE, ClockPlan, RagicQueries
+from volunteer_hours.api.retry import RagicCall
+from volunteer_hours.logger.pkg_logger import Logger
+from volunteer_hours.common.hours_index import HoursIndex
+from volunteer_hours.common.journal import Journal
+from volunteer_hours.common.metrics import Metrics
+from volunteer_hours.common.records import EventInfo, HoursDetail, MemberInfo
+from volunteer_hours.common.single_flight import SingleFlight
+from volunteer_hours.common.striped_lock import MemberLocks
+
+T = TypeVar("T")
+
+
+class AsyncRagicSession(metaclass=ThreadSafeMeta):
+    """
+    A process wide pool of keep-alive connections to Ragic for the async
+      views, served from an event loop thread of its own, since Flask runs
+      every async view on a new event loop and a pool tied to it would be
+      thrown away with it
+    """
+
+    def __init__(self):
+        pool_size = Config.ragic_pool_size()
+        connect_timeout, read_timeout = Config.ragic_timeout()
+        self.__client = httpx.AsyncClient(
+            base_url=Config.ragic_base_url(),
+            headers={"Authorization": f"Basic {Config.ragic_api_key()}"},
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.__loop = asyncio.new_event_loop()
+        Thread(target=self.__loop.run_forever, name="ragic-async", daemon=True).start()
+
+    async def __request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request on the pool's event loop and wait for it on the
+          caller's, cancelling the caller cancels the request
+        :param method: the HTTP method of the request
+        :param url: the URL to request, relative to the base URL
+        :return: a response object with its body read
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.__client.request(method, url, **kwargs), self.__loop
+        )
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def __timeout(timeout: tuple[float, float]) -> httpx.Timeout:
+        connect, read = timeout
+        # Wait for a pooled connection no longer than for a new one
+        return httpx.Timeout(read, connect=connect, pool=connect)
+
+    async def get(self, url: str, params: dict) -> httpx.Response:
+        """
+        Send a GET request through the shared pool, retrying transport errors
+          and overloaded responses until the deadline
+        :param url: the URL to request, relative to the base URL
+        :param params: query parameters to send
+        :return: a response object
+        """
+        call = RagicCall("GET", True, (httpx.TransportError,))
+        return await call.send_async(
+            lambda timeout: self.__request(
+                "GET", url, params=params, timeout=self.__timeout(timeout)
+            )
+        )
+
+    async def post(self, url: str, data: dict) -> httpx.Response:
+        """
+        Send a POST request through the shared pool, once, since a write
+          that timed out may still have been applied
+        :param url: the URL to request, relative to the base URL
+        :param data: form data to send
+        :return: a response object
+        """
+        call = RagicCall("POST", False, (httpx.TransportError,))
+        return await call.send_async(
+            lambda timeout: self.__request(
+                "POST", url, data=data, timeout=self.__timeout(timeout)
+            )
+        )
+
+
+class AsyncRagic(RagicQueries):
+    """
+    Use the httpx library to talk to the Ragic API without blocking a thread
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._session = AsyncRagicSession()
+
+    async def _get_data(self, api_route: str, params: dict) -> httpx.Response:
+        """
+        Get data from the specified API route
+        :param api_route: an API route in Ragic
+        :param params: parameters to send to Ragic
+        :raises httpx.HTTPStatusError: if Ragic still responded with an error
+          once retries ran out
+        :return: a response object from Ragic
+        """
+        flights = SingleFlight()
+        key = ("httpx", *self._flight_key(api_route, params))
+        future, leader = flights.claim(key)
+        if not leader:
+            Metrics().ragic_coalesced.inc(method="GET")
+            return await asyncio.wrap_future(future)
+        try:
+            with self._instrument(api_route, "GET") as outcome:
+                response = await self._session.get(f"/{api_route}", params)
+                outcome["status"] = response.status_code
+            response.raise_for_status()
+        except BaseException as error:
+            flights.settle(key, future, error=error)
+            raise
+        flights.settle(key, future, response)
+        Logger.info("Data received from %s/%s.", self._base_url, api_route)
+        return response
+
+    async def _send_data(self, api_route: str, data: dict) -> httpx.Response:
+        """
+        Send data to the specified API route.
+        :param api_route: an API route in Ragic
+        :param data: data to send to Ragic
+        :raises httpx.HTTPStatusError: if Ragic responded with an error
+        :return: a response object from Ragic
+        """
+        with self._instrument(api_route, "POST") as outcome:
+            response = await self._session.post(f"/{api_route}", data)
+            outcome["status"] = response.status_code
+        response.raise_for_status()
+        Logger.info("Data sent to %s/%s.", self._base_url, api_route)
+        return response
+
+    async def get_member_info(self, member_id: str) -> dict[str, MemberInfo]:
+        """
+        Get the current member's info
+        :param member_id: the associated member ID
+        :return: info of the member keyed by record ID
+        """
+        route = Config.ragic_members_route()
+        response = await self._get_data(route, self._member_query(member_id))
+        return MemberInfo.from_page(response.json())
+
+    async def fetch_events(self, member_id: str) -> dict[str, EventInfo]:
+        """
+        Retrieve active events that the member signed up for
+        :param member_id: the associated member ID
+        :return: events keyed by record ID
+        """
+        route = Config.ragic_attendance_route()
+        response = await self._get_data(route, self._events_query(member_id))
+        return EventInfo.from_page(response.json())
+
+    async def roster_events(self, member_id: str) -> dict[str, EventInfo]:
+        """
+        Get a member's active events from the roster, falling back to Ragic
+          if the roster is missing or stale or does not list the member
+        :param member_id: the associated member ID
+        :return: events keyed by record ID
+        """
+        events = self._rostered_events(member_id)
+        if events is None:
+            events = await self.fetch_events(member_id)
+        return events
+
+    async def _get_hours_detail(
+        self, member_id: str, event_id: int
+    ) -> dict[str, HoursDetail]:
+        """
+        Get the hours detail of the current member
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :return: hours detail keyed by record ID
+        """
+        route = Config.ragic_hours_detail()
+        params = self._hours_query(member_id, event_id)
+        response = await self._get_data(route, params)
+        return HoursDetail.from_page(response.json())
+
+    async def _clock_in(
+        self,
+        eid: str,
+        member_id: str,
+        event_id: int,
+        date: Optional[str] = None,
+        time: Optional[str] = None,
+    ) -> dict:
+        """
+        Clock in by creating a new record in hours detail
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the record, defaults to today
+        :param time: the start time of the record, defaults to now
+        :return: response data from Ragic
+        """
+        route = Config.ragic_hours_detail()
+        payload = self._clock_in_payload(eid, member_id, event_id, date, time)
+        response = await self._send_data(route, payload)
+        return response.json()
+
+    async def _clock_out(self, record_id: str, time: Optional[str] = None) -> dict:
+        """
+        Clock out by modifying an existing record in hours detail
+        :param record_id: the ID of the record to modify
+        :param time: the end time of the record, defaults to now
+        :return: response data from Ragic
+        """
+        route = f"{Config.ragic_hours_detail()}/{record_id}"
+        response = await self._send_data(route, self._clock_out_payload(time))
+        return response.json()
+
+    @staticmethod
+    async def __acquire(lock: Lock) -> None:
+        """
+        Wait for a member's lock off the event loop, since it is shared with
+          the sync views, releasing it if the request is cancelled meanwhile
+        :param lock: the member's lock
+        :return: None
+        """
+        acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+        try:
+            # The thread takes the lock even if this request is cancelled
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or lock.release()
+            )
+            raise
+
+    async def log_hours(
+        self, member_id: str, event_id: int, request_key: Optional[str] = None
+    ) -> str:
+        """
+        Clock in if the member is not clocked in, otherwise clock out, one
+          request at a time per member and once per idempotency key
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param request_key: a key the kiosk repeats when it retries a request
+        :return: a message to the member
+        """
+        lock = MemberLocks().lock_for(member_id)
+        await self.__acquire(lock)
+        try:
+            message = self._repeated_outcome(member_id, request_key)
+            if message is None:
+                try:
+                    message = await self._log_hours(member_id, event_id)
+                except (
+                    httpx.HTTPError,
+                    requests.RequestException,
+                    ValueError,
+                ) as error:
+                    Logger.error("Unable to log hours of %s: %s", member_id, error)
+                    return UNAVAILABLE
+                self._remember_outcome(member_id, request_key, message)
+            return message
+        finally:
+            lock.release()
+
+    async def _log_hours(self, member_id: str, event_id: int) -> str:
+        """
+        Decide whether to clock in or out and write it to Ragic, or to the
+          journal with write-behind on
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :return: a message to the member
+        """
+        # Prevent users from signing in without an event
+        if event_id == -1:
+            return NO_EVENT
+        phases = Metrics().log_hours_phase
+        with phases.time(phase="lookup"):
+            hours_info = HoursIndex().lookup(member_id, event_id, self._clock.today())
+            plan = await self.__journaling(
+                self._indexed_plan, member_id, event_id, hours_info
+            )
+            if plan is None:
+                hours_info = await self._get_hours_detail(member_id, event_id)
+                plan = await self.__journaling(
+                    self._clock_action, member_id, event_id, hours_info
+                )
+        if plan.action == Journal.CLOCK_IN:
+            with phases.time(phase="roster"):
+                events = await self.roster_events(member_id)
+            plan = self._with_attendance(plan, events, event_id)
+        if plan.action is not None and not await self.__journaling(
+            self._journal_clock, plan, member_id, event_id
+        ):
+            await self._write_clock(plan, member_id, event_id)
+        return plan.message
+
+    @staticmethod
+    async def __journaling(call: Callable[..., T], *args) -> T:
+        """
+        Make a call that reads or writes the journal with write-behind on in
+          a thread, since a journal locked by another worker would block the
+          event loop until the busy timeout
+        :param call: the call to make
+        :return: the result of the call
+        """
+        if Config.write_behind():
+            return await asyncio.to_thread(call, *args)
+        return call(*args)
+
+    async def _write_clock(
+        self, plan: ClockPlan, member_id: str, event_id: int
+    ) -> None:
+        """
+        Write a clock in or out to Ragic and the index
+        :param plan: the clock event to write
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :return: None
+        """
+        date, now = self._clock.today(), self._clock.now()
+        route, data = self._clock_request(plan, member_id, event_id, date, now)
+        with Metrics().log_hours_phase.time(phase="write"):
+            response = await self._send_data(route, data)
+        record_id = plan.record_id or response.json().get("ragicId")
+        self._index_clock(plan.action, member_id, event_id, date, record_id, now)
@@ -1,23 +1,468 @@
 """
 A wrapper for the Ragic API
 """
+import re
+from contextlib import contextmanager
+from threading import BoundedSemaphore
+from time import perf_counter
+from typing import Iterator, NamedTuple, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
 
-from volunteer_hours import Config
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.api.retry import RagicCall
 from volunteer_hours.logger.pkg_logger import Logger
-from volunteer_hours.common.timenow import LocalTime
-from volunteer_hours.common.enums import Http, Members, Attendance, Hours
+from volunteer_hours.common.timenow import Clock
+from volunteer_hours.common.journal import Journal
+from volunteer_hours.common.hours_index import HoursIndex
+from volunteer_hours.common.roster import Roster
+from volunteer_hours.common.metrics import Metrics
+from volunteer_hours.common.single_flight import SingleFlight
+from volunteer_hours.common.cache import OutcomeCache
+from volunteer_hours.common.striped_lock import MemberLocks
+from volunteer_hours.common.enums import Members, Attendance, Hours
+from volunteer_hours.common.records import EventInfo, HoursDetail, MemberInfo
+
+RECORD_ID = re.compile(r"^([^/]+/[^/]+/\d+)/\d+$")
+TRANSIENT = (requests.ConnectionError, requests.Timeout)
+TRY_AGAIN = "Please try again later."
+UNAVAILABLE = f"Unable to reach Ragic. {TRY_AGAIN}"
+NO_ATTENDANCE = f"Unable to retrieve attendance info. {TRY_AGAIN}"
+NO_EVENT = "Unable to find an event. Please contact a volunteer coordinator."
 
 
-class Ragic:
+class RagicSession(metaclass=ThreadSafeMeta):
     """
-    Use the requests library to talk to the Ragic API
+    A process wide pool of keep-alive connections to Ragic, shared by every
+      Ragic instance so that each call skips the TCP and TLS handshakes
     """
 
-    _base_url = "https://na3.ragic.com"
+    def __init__(self):
+        pool_size = Config.ragic_pool_size()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        # Only as many requests as there are pooled connections are sent at a
+        # time, so that the wait for a connection can be bounded
+        self.__free = BoundedSemaphore(pool_size)
+        self.__session = requests.Session()
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
+        self.__session.headers.update(
+            {
+                "Authorization": f"Basic {Config.ragic_api_key()}",
+                "Connection": "keep-alive",
+            }
+        )
+
+    def __request(
+        self, method: str, url: str, timeout: tuple[float, float], **kwargs
+    ) -> requests.Response:
+        """
+        Send a request once a pooled connection is free, waiting for one no
+          longer than the connect timeout, which ends by the deadline
+        :param method: the HTTP method of the request
+        :param url: the URL to request
+        :param timeout: the connect and read timeouts of the request
+        :raises requests.ConnectTimeout: if no connection became free in time
+        :return: a response object
+        """
+        if not self.__free.acquire(timeout=timeout[0]):
+            raise requests.ConnectTimeout("No pooled connection to Ragic is free")
+        try:
+            return self.__session.request(method, url, timeout=timeout, **kwargs)
+        finally:
+            self.__free.release()
+
+    def get(self, url: str, params: dict) -> requests.Response:
+        """
+        Send a GET request through the shared pool, retrying connection
+          errors, timeouts and overloaded responses until the deadline
+        :param url: the URL to request
+        :param params: query parameters to send
+        :return: a response object
+        """
+        call = RagicCall("GET", True, TRANSIENT)
+        return call.send(
+            lambda timeout: self.__request("GET", url, timeout, params=params)
+        )
+
+    def post(self, url: str, data: dict) -> requests.Response:
+        """
+        Send a POST request through the shared pool, once, since a write
+          that timed out may still have been applied
+        :param url: the URL to request
+        :param data: form data to send
+        :return: a response object
+        """
+        call = RagicCall("POST", False, TRANSIENT)
+        return call.send(
+            lambda timeout: self.__request("POST", url, timeout, data=data)
+        )
+
+
+class ClockPlan(NamedTuple):
+    """
+    What a scan does: the clock event to write, or None if it writes
+      nothing, the record to clock out of, the message to the member, and the
+      EID of the attendance record to clock in with
+    """
+
+    action: Optional[str]
+    record_id: Optional[str]
+    message: str
+    eid: Optional[str] = None
+
+
+class RagicQueries:
+    """
+    Build the queries and payloads sent to the Ragic API
+    """
+
+    def __init__(self):
+        self._base_url = Config.ragic_base_url()
+        self._clock = Clock()
+
+    @staticmethod
+    @contextmanager
+    def _instrument(api_route: str, method: str) -> Iterator[dict]:
+        """
+        Record the latency and outcome of a call to Ragic, the caller sets
+          the "status" of the yielded dictionary once a response arrives
+        :param api_route: an API route in Ragic
+        :param method: the HTTP method of the call
+        """
+        metrics = Metrics()
+        route = RECORD_ID.sub(r"\1/{id}", api_route)
+        outcome = {"status": "error"}
+        metrics.ragic_in_flight.inc(method=method)
+        started = perf_counter()
+        try:
+            yield outcome
+        finally:
+            elapsed = perf_counter() - started
+            metrics.ragic_in_flight.dec(method=method)
+            metrics.ragic_latency.observe(elapsed, route=route, method=method)
+            metrics.ragic_requests.inc(
+                route=route, method=method, status=outcome["status"]
+            )
+
+    @staticmethod
+    def _flight_key(api_route: str, params: dict) -> tuple:
+        """
+        Identify a query so that identical queries in flight can be coalesced
+        :param api_route: an API route in Ragic
+        :param params: parameters to send to Ragic
+        :return: the route and the parameters, including `where` conditions
+        """
+        items = (
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in params.items()
+        )
+        return api_route, tuple(sorted(items))
+
+    @staticmethod
+    def _projection(*fields: int) -> dict:
+        """
+        Ask Ragic for only some fields of each record, named by ID
+        :param fields: the IDs of the fields to return
+        :return: query parameters that leave out every other field and the
+          subtables
+        """
+        return {
+            "fields": [str(field) for field in fields],
+            "naming": "EID",
+            "subtables": 0,
+        }
+
+    @staticmethod
+    def _member_query(member_id: str) -> dict:
+        """
+        Build the query for a member's info
+        :param member_id: the associated member ID
+        :return: query parameters for the members route
+        """
+        condition = [f"{Members.MEMBERSHIP_ID},eq,{member_id}"]
+        return {"where": condition, "api": ""}
+
+    @staticmethod
+    def _events_query(member_id: str) -> dict:
+        """
+        Build the query for a member's active events
+        :param member_id: the associated member ID
+        :return: query parameters for the attendance route
+        """
+        conditions = [
+            f"{Attendance.TIMECLOCK_STATUS},eq,Open",
+            f"{Attendance.MEMBERSHIP_ID},eq,{member_id}",
+        ]
+        return {"where": conditions, "api": ""}
+
+    def _hours_query(
+        self, member_id: str, event_id: int, date: Optional[str] = None
+    ) -> dict:
+        """
+        Build the query for a day's hours detail of a member
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the day to look up, defaults to today
+        :return: query parameters for the hours detail route
+        """
+        date = date or self._clock.today()
+        conditions = [
+            f"{Hours.DATE},eq,{date}",
+            f"{Hours.EVENT_ID},eq,{event_id}",
+            f"{Hours.NEW_MEMBERSHIP_ID},eq,{member_id}",
+        ]
+        projection = self._projection(Hours.STATUS, Hours.START_TIME)
+        return {"where": conditions, **projection, "api": ""}
+
+    @classmethod
+    def _event_hours_query(cls, event_id: int, date: str) -> dict:
+        """
+        Build the query for the hours detail of everyone at an event on a day
+        :param event_id: the ID of the event
+        :param date: the day to look up
+        :return: query parameters for the hours detail route, with fields
+          named by ID
+        """
+        conditions = [f"{Hours.EVENT_ID},eq,{event_id}", f"{Hours.DATE},eq,{date}"]
+        projection = cls._projection(
+            Hours.NEW_MEMBERSHIP_ID, Hours.STATUS, Hours.END_TIME
+        )
+        return {"where": conditions, **projection, "api": ""}
+
+    def _clock_in_payload(
+        self,
+        eid: str,
+        member_id: str,
+        event_id: int,
+        date: Optional[str] = None,
+        time: Optional[str] = None,
+    ) -> dict:
+        """
+        Build a new hours detail record
+        :param eid: the EID of the member's attendance record
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the record, defaults to today
+        :param time: the start time of the record, defaults to now
+        :return: data for the hours detail route
+        """
+        return {
+            Hours.EID: eid,
+            Hours.DATE: date or self._clock.today(),
+            Hours.EVENT_ID: event_id,
+            Hours.NEW_MEMBERSHIP_ID: member_id,
+            Hours.START_TIME: time or self._clock.now(),
+        }
+
+    def _clock_out_payload(self, time: Optional[str] = None) -> dict:
+        """
+        Build the update that ends an hours detail record
+        :param time: the end time of the record, defaults to now
+        :return: data for an hours detail record
+        """
+        return {Hours.END_TIME: time or self._clock.now()}
+
+    @staticmethod
+    def _rostered_events(member_id: str) -> Optional[dict[str, EventInfo]]:
+        """
+        Get a member's active events from the roster if it is fresh enough
+        :param member_id: the associated member ID
+        :return: events keyed by record ID, or None if the roster is missing
+          or stale or does not list the member
+        """
+        return Roster().lookup(member_id, Config.roster_max_age())
+
+    @staticmethod
+    def _repeated_outcome(member_id: str, request_key: Optional[str]) -> Optional[str]:
+        """
+        Look up the message already returned for a repeated request
+        :param member_id: the associated member ID
+        :param request_key: the idempotency key of the request, if any
+        :return: the message, or None if the request is new
+        """
+        if not request_key:
+            return None
+        message = OutcomeCache().get((member_id, request_key))
+        if message is not None:
+            Logger.info("Repeated request %s of %s", request_key, member_id)
+        return message
+
+    @staticmethod
+    def _remember_outcome(
+        member_id: str, request_key: Optional[str], message: str
+    ) -> None:
+        """
+        Remember the message returned for a request, unless the member was
+          asked to try again
+        :param member_id: the associated member ID
+        :param request_key: the idempotency key of the request, if any
+        :param message: the message returned to the member
+        :return: None
+        """
+        if request_key and not message.endswith(TRY_AGAIN):
+            OutcomeCache().put((member_id, request_key), message)
+
+    def _clock_action(
+        self, member_id: str, event_id: int, hours_info: dict[str, HoursDetail]
+    ) -> ClockPlan:
+        """
+        Decide whether a scan clocks the member in or out, counting the clock
+          events journaled on the host but not written to Ragic yet
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param hours_info: today's hours detail from the index or Ragic
+        :return: a plan to clock in, clock out or write nothing
+        """
+        record_id, hour_details = None, None
+        if Config.write_behind():
+            date = self._clock.today()
+            hour_details = Journal().recorded(member_id, event_id, date)
+        if hours_info:
+            record_id = list(hours_info.keys())[0]
+            hour_details = hours_info[record_id].merge(hour_details)
+        if hour_details is None:
+            return ClockPlan(Journal.CLOCK_IN, None, "Clocked in successfully.")
+        # Prevent users from clocking in again after clocking out
+        if hour_details.completed:
+            return ClockPlan(None, record_id, "You have already clocked out.")
+        # Prevent users from clocking out within 10 minutes of clocking in
+        if self._clock.delta_minutes(hour_details.start_time) < 10:
+            return ClockPlan(None, record_id, "You are already clocked in.")
+        return ClockPlan(Journal.CLOCK_OUT, record_id, "Clocked out successfully.")
+
+    def _indexed_plan(
+        self,
+        member_id: str,
+        event_id: int,
+        hours_info: Optional[dict[str, HoursDetail]],
+    ) -> Optional[ClockPlan]:
+        """
+        Decide a scan from the index if the record found can be trusted,
+          which is unless the scan clocks out: another worker may have clocked
+          the member out since, and clocking out again would overwrite the end
+          time, so that is left to Ragic, or to the journal with write-behind
+          on, since every worker on the host records its clock events there
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param hours_info: today's hours detail from the index, if any
+        :return: the plan, or None if Ragic has to be asked
+        """
+        if hours_info is None:
+            return None
+        plan = self._clock_action(member_id, event_id, hours_info)
+        if plan.action == Journal.CLOCK_OUT and not Config.write_behind():
+            return None
+        return plan
+
+    def _with_attendance(
+        self, plan: ClockPlan, events: dict[str, EventInfo], event_id: int
+    ) -> ClockPlan:
+        """
+        Pick the attendance record a clock in is written with
+        :param plan: a plan to clock in
+        :param events: the member's active events keyed by record ID
+        :param event_id: the ID of the selected event
+        :return: the plan with the EID of the record, or a plan that writes
+          nothing if the member has no events
+        """
+        eid = self._attendance_eid(events, event_id)
+        # Display an error message if no events availble
+        if eid is None:
+            return ClockPlan(None, None, NO_ATTENDANCE)
+        return plan._replace(eid=eid)
+
+    @staticmethod
+    def _attendance_eid(events: dict[str, EventInfo], event_id) -> Optional[str]:
+        """
+        Pick the attendance record to clock in with, preferring the one of
+          the selected event
+        :param events: the member's active events keyed by record ID
+        :param event_id: the ID of the selected event
+        :return: the EID of the record, or None if the member has no events
+        """
+        if not events:
+            return None
+        matching = [
+            event for event in events.values() if event.event_id == str(event_id)
+        ]
+        return (matching or list(events.values()))[0].eid
+
+    @staticmethod
+    def _index_clock(
+        action: str,
+        member_id: str,
+        event_id,
+        date: str,
+        record_id: Optional[str],
+        time: str,
+    ) -> None:
+        """
+        Record a clock in or out written to Ragic in the hours index
+        :param action: either Journal.CLOCK_IN or Journal.CLOCK_OUT
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the record
+        :param record_id: the ID of the record written to
+        :param time: the time of the clock in or out
+        :return: None
+        """
+        if action == Journal.CLOCK_IN:
+            details = HoursDetail("", time)
+        else:
+            details = HoursDetail("Completed", None)
+        HoursIndex().update(member_id, event_id, date, record_id, details)
+
+    def _journal_clock(self, plan: ClockPlan, member_id: str, event_id: int) -> bool:
+        """
+        Record a clock in or out in the local journal with write-behind on,
+          which writes it to Ragic in the background
+        :param plan: the clock event to record
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :return: True if the clock event was journaled
+        """
+        if not Config.write_behind():
+            return False
+        date, now = self._clock.today(), self._clock.now()
+        with Metrics().log_hours_phase.time(phase="write"):
+            Journal().record(
+                plan.action, member_id, event_id, date, now, plan.record_id
+            )
+        return True
+
+    def _clock_request(
+        self, plan: ClockPlan, member_id: str, event_id: int, date: str, now: str
+    ) -> tuple[str, dict]:
+        """
+        Build the write to Ragic that clocks a member in or out
+        :param plan: the clock event to write
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the clock event
+        :param now: the time of the clock event
+        :return: the API route and the data to send to it
+        """
+        route = Config.ragic_hours_detail()
+        if plan.action == Journal.CLOCK_IN:
+            # Sign in by filling out the member's info, event, and start time
+            payload = self._clock_in_payload(plan.eid, member_id, event_id, date, now)
+            return route, payload
+        # Clock out by filling out the end time
+        return f"{route}/{plan.record_id}", self._clock_out_payload(now)
+
+
+class Ragic(RagicQueries):
+    """
+    Use the requests library to talk to the Ragic API
+    """
 
     def __init__(self):
-        self._local_time = LocalTime()
+        super().__init__()
+        self._session = RagicSession()
 
     def _get_data(self, api_route: str, params: dict) -> requests.Response:
         """
@@ -26,12 +471,31 @@ class Ragic:
         :param params: parameters to send to Ragic
         :return: a response object from Ragic
         """
+        key = ("requests", *self._flight_key(api_route, params))
+        response, shared = SingleFlight().run(
+            key, lambda: self.__fetch(api_route, params)
+        )
+        if shared:
+            Metrics().ragic_coalesced.inc(method="GET")
+        return response
+
+    def __fetch(self, api_route: str, params: dict) -> requests.Response:
+        """
+        Call Ragic for data, reading the whole body so that callers who share
+          the response do not race to read it
+        :param api_route: an API route in Ragic
+        :param params: parameters to send to Ragic
+        :raises requests.HTTPError: if Ragic still responded with an error
+          once retries ran out
+        :return: a response object from Ragic
+        """
         url = f"{self._base_url}/{api_route}"
-        api_key = Config.ragic_api_key()
-        headers = {"Authorization": f"Basic {api_key}"}
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == Http.OK:
-            Logger.info(f"Data sent to {url}.")
+        with self._instrument(api_route, "GET") as outcome:
+            response = self._session.get(url, params)
+            outcome["status"] = response.status_code
+            _ = response.content
+        response.raise_for_status()
+        Logger.info("Data received from %s.", url)
         return response
 
     def _send_data(self, api_route: str, data: dict) -> requests.Response:
@@ -39,122 +503,337 @@ class Ragic:
         Send data to the specified API route.
         :param api_route: an API route in Ragic
         :param data: data to send to Ragic
+        :raises requests.HTTPError: if Ragic responded with an error
         :return: a response object from Ragic
         """
         url = f"{self._base_url}/{api_route}"
-        api_key = Config.ragic_api_key()
-        headers = {"Authorization": f"Basic {api_key}"}
-        response = requests.post(url, data=data, headers=headers)
-        if response.status_code == Http.OK:
-            Logger.info(f"Data sent to {url}.")
+        with self._instrument(api_route, "POST") as outcome:
+            response = self._session.post(url, data)
+            outcome["status"] = response.status_code
+        response.raise_for_status()
+        Logger.info("Data sent to %s.", url)
         return response
 
-    def get_member_info(self, member_id: str) -> dict:
+    def _get_pages(
+        self, api_route: str, params: dict, page_size: int = 1000, offset: int = 0
+    ) -> Iterator[dict]:
+        """
+        Page through every record matching a query
+        :param api_route: an API route in Ragic
+        :param params: parameters to send to Ragic
+        :param page_size: the number of records to request at a time
+        :param offset: the number of matching records to skip
+        :return: an iterator of pages of records keyed by record ID
+        """
+        while True:
+            page_params = {**params, "limit": page_size, "offset": offset}
+            page = self._get_data(api_route, page_params).json()
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def load_hours_index(self) -> bool:
+        """
+        Load today's hours detail records into the index in bulk
+        :return: True if the index holds today's records
+        """
+        index = HoursIndex()
+        date = self._clock.today()
+        with index.loading:
+            if index.is_current(date):
+                return True
+            route = Config.ragic_hours_detail()
+            projection = self._projection(
+                Hours.NEW_MEMBERSHIP_ID, Hours.EVENT_ID, Hours.STATUS, Hours.START_TIME
+            )
+            params = {"where": [f"{Hours.DATE},eq,{date}"], **projection, "api": ""}
+            records: dict[tuple[str, str], tuple[str, HoursDetail]] = {}
+            try:
+                pages = list(self._get_pages(route, params))
+            except (requests.RequestException, ValueError) as error:
+                Logger.error("Unable to load the hours index: %s", error)
+                return False
+            for page in pages:
+                for record_id, row in page.items():
+                    key = (
+                        str(row.get(str(Hours.NEW_MEMBERSHIP_ID), "")),
+                        str(row.get(str(Hours.EVENT_ID), "")),
+                    )
+                    records.setdefault(key, (record_id, HoursDetail.from_row(row)))
+            index.load(date, records)
+            Logger.info("Indexed %d hours records for %s", len(records), date)
+            return True
+
+    def hours_between(self, start: str, end: str) -> Iterator[dict]:
+        """
+        Page through the hours detail records of a date range
+        :param start: the first date in the configured date format
+        :param end: the last date in the configured date format
+        :return: an iterator of pages of records keyed by record ID, with
+          fields named by ID
+        """
+        projection = self._projection(
+            Hours.NEW_MEMBERSHIP_ID,
+            Hours.EVENT_NAME,
+            Hours.DATE,
+            Hours.START_TIME,
+            Hours.END_TIME,
+        )
+        params = {
+            "where": [f"{Hours.DATE},gte,{start}", f"{Hours.DATE},lte,{end}"],
+            **projection,
+            "api": "",
+        }
+        return self._get_pages(Config.ragic_hours_detail(), params)
+
+    def export_pages(
+        self, api_route: str, where: list[str], offset: int = 0, page_size: int = 1000
+    ) -> Iterator[dict]:
+        """
+        Page through the records of a sheet for an export, one page in memory
+          at a time
+        :param api_route: an API route in Ragic
+        :param where: conditions in the "field ID,operator,value" format
+        :param offset: the number of matching records already exported
+        :param page_size: the number of records to request at a time
+        :return: an iterator of pages of records keyed by record ID
+        """
+        params = {"where": where, "subtables": 0, "api": ""}
+        return self._get_pages(api_route, params, page_size, offset)
+
+    def open_hours(self, event_id: int, date: str) -> dict:
+        """
+        Find every hours detail record of an event on a day that has not been
+          clocked out of, with one paged query
+        :param event_id: the ID of the event
+        :param date: the day to look up
+        :return: open records keyed by record ID, with fields named by ID
+        """
+        route = Config.ragic_hours_detail()
+        params = self._event_hours_query(event_id, date)
+        return {
+            record_id: row
+            for page in self._get_pages(route, params)
+            for record_id, row in page.items()
+            if row.get(str(Hours.STATUS)) != "Completed"
+            and not row.get(str(Hours.END_TIME))
+        }
+
+    def load_roster(self) -> bool:
+        """
+        Load every open attendance record into the roster in bulk, from the
+          shared cache if another worker loaded it since the last refresh
+        :return: True if the roster was loaded
+        """
+        roster = Roster()
+        if roster.restore(Config.roster_refresh()):
+            Logger.info("Restored the roster from the shared cache")
+            return True
+        route = Config.ragic_attendance_route()
+        conditions = [f"{Attendance.TIMECLOCK_STATUS},eq,Open"]
+        # Events are decoded from fields named by name, as when fetching the
+        # events of one member, so the member of each record is read by field
+        # ID with a query of its own that returns only that field
+        members_params = {
+            "where": conditions,
+            **self._projection(Attendance.MEMBERSHIP_ID),
+            "api": "",
+        }
+        params = {"where": conditions, "subtables": 0, "api": ""}
+        events: dict[str, dict[str, EventInfo]] = {}
+        try:
+            members = {
+                record_id: str(row.get(str(Attendance.MEMBERSHIP_ID)) or "")
+                for page in self._get_pages(route, members_params)
+                for record_id, row in page.items()
+            }
+            for page in self._get_pages(route, params):
+                for record_id, row in page.items():
+                    # Skip records opened between the two queries
+                    member_id = members.get(record_id)
+                    if member_id:
+                        event = EventInfo.from_row(row)
+                        events.setdefault(member_id, {})[record_id] = event
+        except (requests.RequestException, ValueError) as error:
+            Logger.error("Unable to load the roster: %s", error)
+            return False
+        roster.load(events)
+        roster.share()
+        Logger.info("Loaded open events of %d members into the roster", len(events))
+        return True
+
+    def roster_events(self, member_id: str) -> dict[str, EventInfo]:
+        """
+        Get a member's active events from the roster, falling back to Ragic
+          if the roster is missing or stale or does not list the member
+        :param member_id: the associated member ID
+        :return: events keyed by record ID
+        """
+        events = self._rostered_events(member_id)
+        if events is None:
+            events = self.fetch_events(member_id)
+        return events
+
+    def _indexed_hours(
+        self, member_id: str, event_id: int
+    ) -> Optional[dict[str, HoursDetail]]:
+        """
+        Get today's hours detail of a member from the index, loading the index
+          on the first scan of the day
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :return: hours detail keyed by record ID, or None if the index holds
+          no record of the member
+        """
+        index = HoursIndex()
+        date = self._clock.today()
+        if not index.is_current(date):
+            self.load_hours_index()
+        return index.lookup(member_id, event_id, date)
+
+    def get_member_info(self, member_id: str) -> dict[str, MemberInfo]:
         """
         Get the current member's info
         :param member_id: the associated member ID
-        :return: info of the member
+        :return: info of the member keyed by record ID
         """
         route = Config.ragic_members_route()
-        condition = [f"{Members.MEMBERSHIP_ID},eq,{member_id}"]
-        payload = {"where": condition, "api": ""}
-        response = self._get_data(route, payload)
-        return response.json()
+        response = self._get_data(route, self._member_query(member_id))
+        return MemberInfo.from_page(response.json())
 
-    def fetch_events(self, member_id: str) -> dict:
+    def fetch_events(self, member_id: str) -> dict[str, EventInfo]:
         """
         Retrieve active events that the member signed up for
         :param member_id: the associated member ID
-        :return: events data from Ragic
+        :return: events keyed by record ID
         """
         route = Config.ragic_attendance_route()
-        conditions = [
-            f"{Attendance.TIMECLOCK_STATUS},eq,Open",
-            f"{Attendance.MEMBERSHIP_ID},eq,{member_id}",
-        ]
-        payload = {"where": conditions, "api": ""}
-        response = self._get_data(route, payload)
-        return response.json()
+        response = self._get_data(route, self._events_query(member_id))
+        return EventInfo.from_page(response.json())
 
-    def _get_hours_detail(self, member_id: str, event_id: int) -> dict:
+    def _get_hours_detail(
+        self, member_id: str, event_id: int, date: Optional[str] = None
+    ) -> dict[str, HoursDetail]:
         """
         Get the hours detail of the current member
         :param member_id: the associated member ID
         :param event_id: the ID of the selected event
-        :return: hours detail from Ragic
+        :param date: the day to look up, defaults to today
+        :return: hours detail keyed by record ID
         """
         route = Config.ragic_hours_detail()
-        date = self._local_time.today()
-        conditions = [
-            f"{Hours.DATE},eq,{date}",
-            f"{Hours.EVENT_ID},eq,{event_id}",
-            f"{Hours.NEW_MEMBERSHIP_ID},eq,{member_id}",
-        ]
-        payload = {"where": conditions, "api": ""}
-        response = self._get_data(route, payload)
-        return response.json()
+        params = self._hours_query(member_id, event_id, date)
+        response = self._get_data(route, params)
+        return HoursDetail.from_page(response.json())
 
-    def _clock_in(self, eid: str, member_id: str, event_id: int) -> dict:
+    def _clock_in(
+        self,
+        eid: str,
+        member_id: str,
+        event_id: int,
+        date: Optional[str] = None,
+        time: Optional[str] = None,
+    ) -> dict:
         """
         Clock in by creating a new record in hours detail
         :param member_id: the associated member ID
         :param event_id: the ID of the selected event
+        :param date: the date of the record, defaults to today
+        :param time: the start time of the record, defaults to now
         :return: response data from Ragic
         """
         route = Config.ragic_hours_detail()
-        date = self._local_time.today()
-        time = self._local_time.now()
-        payload = {
-            Hours.EID: eid,
-            Hours.DATE: date,
-            Hours.EVENT_ID: event_id,
-            Hours.NEW_MEMBERSHIP_ID: member_id,
-            Hours.START_TIME: time,
-        }
+        payload = self._clock_in_payload(eid, member_id, event_id, date, time)
         response = self._send_data(route, payload)
         return response.json()
 
-    def _clock_out(self, record_id: str) -> dict:
+    def _clock_out(self, record_id: str, time: Optional[str] = None) -> dict:
         """
         Clock out by modifying an existing record in hours detail
         :param record_id: the ID of the record to modify
+        :param time: the end time of the record, defaults to now
         :return: response data from Ragic
         """
         route = f"{Config.ragic_hours_detail()}/{record_id}"
-        time = self._local_time.now()
-        payload = {Hours.END_TIME: time}
-        response = self._send_data(route, payload)
+        response = self._send_data(route, self._clock_out_payload(time))
         return response.json()
 
-    def log_hours(self, member_id: str, event_id: int) -> str:
+    def close_hours(self, record_id: str, time: Optional[str] = None) -> None:
+        """
+        Clock out of a record on a member's behalf, safe to repeat since it
+          only sets the end time
+        :param record_id: the ID of the record to close
+        :param time: the end time of the record, defaults to now
+        :return: None
+        """
+        route = f"{Config.ragic_hours_detail()}/{record_id}"
+        result = self._send_data(route, self._clock_out_payload(time)).json()
+        if result.get("status") == "ERROR":
+            raise ValueError(result.get("msg") or f"Ragic rejected {record_id}")
+
+    def log_hours(
+        self, member_id: str, event_id: int, request_key: Optional[str] = None
+    ) -> str:
+        """
+        Clock in if the member is not clocked in, otherwise clock out, one
+          request at a time per member and once per idempotency key
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param request_key: a key the kiosk repeats when it retries a request
+        :return: a message to the member
+        """
+        with MemberLocks().hold(member_id):
+            message = self._repeated_outcome(member_id, request_key)
+            if message is None:
+                try:
+                    message = self._log_hours(member_id, event_id)
+                except (requests.RequestException, ValueError) as error:
+                    Logger.error("Unable to log hours of %s: %s", member_id, error)
+                    return UNAVAILABLE
+                self._remember_outcome(member_id, request_key, message)
+            return message
+
+    def _log_hours(self, member_id: str, event_id: int) -> str:
         """
-        Clock in if the member is not clocked in, otherwise clock out
+        Decide whether to clock in or out and write it to Ragic, or to the
+          journal with write-behind on
         :param member_id: the associated member ID
         :param event_id: the ID of the selected event
         :return: a message to the member
         """
         # Prevent users from signing in without an event
         if event_id == -1:
-            return "Unable to find an event. Please contact a volunteer coordinator."
-        hours_info = self._get_hours_detail(member_id, event_id)
-        if not hours_info:
-            attendance_info = self.fetch_events(member_id)
-            # Display an error message if no events availble
-            if not attendance_info:
-                return "Unable to retrieve attendance info. Please try again later."
-            # Sign in by filling out the member's info, event, and start time
-            event_details = list(attendance_info.values())[0]
-            eid = event_details["EID"]
-            self._clock_in(eid, member_id, event_id)
-            return "Clocked in successfully."
-        record_id = list(hours_info.keys())[0]
-        hour_details = hours_info[record_id]
-        # Prevent users from clocking in again after clocking out
-        if hour_details["Status"] == "Completed":
-            return "You have already clocked out."
-        # Prevent users from clocking out within 10 minutes of clocking in
-        if self._local_time.delta_minutes(hour_details["Start Time"]) < 10:
-            return "You are already clocked in."
-        # Clock out by filling out the end time
-        self._clock_out(record_id)
-        return "Clocked out successfully."
+            return NO_EVENT
+        phases = Metrics().log_hours_phase
+        with phases.time(phase="lookup"):
+            hours_info = self._indexed_hours(member_id, event_id)
+            plan = self._indexed_plan(member_id, event_id, hours_info)
+            if plan is None:
+                hours_info = self._get_hours_detail(member_id, event_id)
+                plan = self._clock_action(member_id, event_id, hours_info)
+        if plan.action == Journal.CLOCK_IN:
+            with phases.time(phase="roster"):
+                events = self.roster_events(member_id)
+            plan = self._with_attendance(plan, events, event_id)
+        if plan.action is not None and not self._journal_clock(
+            plan, member_id, event_id
+        ):
+            self._write_clock(plan, member_id, event_id)
+        return plan.message
+
+    def _write_clock(self, plan: ClockPlan, member_id: str, event_id: int) -> None:
+        """
+        Write a clock in or out to Ragic and the index
+        :param plan: the clock event to write
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :return: None
+        """
+        date, now = self._clock.today(), self._clock.now()
+        route, data = self._clock_request(plan, member_id, event_id, date, now)
+        with Metrics().log_hours_phase.time(phase="write"):
+            result = self._send_data(route, data).json()
+        record_id = plan.record_id or result.get("ragicId")
+        self._index_clock(plan.action, member_id, event_id, date, record_id, now)
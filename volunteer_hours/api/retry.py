@@ -0,0 +1,247 @@
+"""
+Retry calls to Ragic behind a circuit breaker
+"""
+import asyncio
+import random
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Awaitable, Callable, Optional
+
+import requests
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.logger.pkg_logger import Logger
+from volunteer_hours.common.metrics import Metrics
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RagicUnavailable(requests.ConnectionError):
+    """
+    Raised without calling Ragic while the circuit to Ragic is open
+    """
+
+
+class CircuitBreaker(metaclass=ThreadSafeMeta):
+    """
+    A global circuit to Ragic that opens after a run of failures, so that
+      calls fail fast instead of waiting on a degraded Ragic, and lets one
+      trial call through once it has cooled down
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__trial = False
+        self.__state = self.CLOSED
+        Metrics().ragic_breaker_state.set(self.__state)
+
+    @property
+    def state(self) -> int:
+        """
+        Getter for the state of the circuit
+        :return: one of CLOSED, HALF_OPEN or OPEN
+        """
+        return self.__state
+
+    def __move(self, state: int) -> None:
+        if state != self.__state:
+            names = {self.CLOSED: "closed", self.HALF_OPEN: "half open"}
+            Logger.warn("Circuit to Ragic is %s", names.get(state, "open"))
+            self.__state = state
+            Metrics().ragic_breaker_state.set(state)
+
+    def check(self) -> None:
+        """
+        Make sure a call may go through
+        :return: None
+        """
+        with self.__lock:
+            if self.__state == self.OPEN:
+                if monotonic() - self.__opened_at >= Config.breaker_cooldown():
+                    self.__move(self.HALF_OPEN)
+            if self.__state == self.CLOSED:
+                return
+            if self.__state == self.HALF_OPEN and not self.__trial:
+                self.__trial = True
+                return
+        Metrics().ragic_breaker_rejections.inc()
+        raise RagicUnavailable("The circuit to Ragic is open")
+
+    def success(self) -> None:
+        """
+        Close the circuit after a successful call
+        :return: None
+        """
+        with self.__lock:
+            self.__failures = 0
+            self.__trial = False
+            self.__move(self.CLOSED)
+
+    def failure(self) -> None:
+        """
+        Count a failed call, opening the circuit after too many in a row or
+          when the trial call fails
+        :return: None
+        """
+        with self.__lock:
+            self.__failures += 1
+            self.__trial = False
+            if (
+                self.__state == self.HALF_OPEN
+                or self.__failures >= Config.breaker_failures()
+            ):
+                self.__opened_at = monotonic()
+                self.__move(self.OPEN)
+
+
+def call_timeout(deadline: float) -> tuple[float, float]:
+    """
+    Get the timeouts of one attempt so that it ends by the deadline
+    :param deadline: when the whole call must be done, on the monotonic clock
+    :return: the connect and read timeouts in seconds
+    """
+    connect, read = Config.ragic_timeout()
+    remaining = max(deadline - monotonic(), 0.001)
+    return min(connect, remaining), min(read, remaining)
+
+
+def retry_delay(attempt: int, deadline: float) -> Optional[float]:
+    """
+    Get how long to wait before retrying a failed call, with full jitter
+    :param attempt: the number of attempts made so far
+    :param deadline: when the whole call must be done, on the monotonic clock
+    :return: the delay in seconds, or None if the call should not be retried
+    """
+    if attempt > Config.ragic_retries():
+        return None
+    delay = random.uniform(0, Config.ragic_backoff() * 2 ** (attempt - 1))
+    if monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+class RagicCall:
+    """
+    One call to Ragic, made in attempts that the circuit breaker lets
+      through, and retried with backoff until the deadline if it is safe to
+      repeat, by the sync and the async sessions alike
+    """
+
+    def __init__(self, method: str, retries: bool, transient: tuple[type, ...]):
+        """
+        :param method: the HTTP method of the call
+        :param retries: whether the call is safe to repeat
+        :param transient: the errors of an attempt that did not reach Ragic
+        """
+        self.__method = method
+        self.__retries = retries
+        self.__transient = transient
+        self.__deadline = monotonic() + Config.ragic_deadline()
+        self.__attempts = 0
+        self.__breaker = CircuitBreaker()
+
+    def __attempt(self) -> tuple[float, float]:
+        """
+        Start an attempt if the circuit lets it through
+        :return: the connect and read timeouts of the attempt
+        """
+        self.__breaker.check()
+        self.__attempts += 1
+        return call_timeout(self.__deadline)
+
+    def __retry(self) -> Optional[float]:
+        """
+        Get how long to wait before the next attempt
+        :return: the delay in seconds, or None if there is no next attempt
+        """
+        if not self.__retries:
+            return None
+        delay = retry_delay(self.__attempts, self.__deadline)
+        if delay is not None:
+            Metrics().ragic_retries.inc(method=self.__method)
+        return delay
+
+    def __failed(self, error: Exception) -> float:
+        """
+        Count an attempt that did not reach Ragic
+        :param error: the error of the attempt
+        :raises error: if the call is not retried
+        :return: the delay before the next attempt
+        """
+        self.__breaker.failure()
+        delay = self.__retry()
+        if delay is None:
+            raise error
+        return delay
+
+    def __abandoned(self) -> None:
+        """
+        Count an attempt that ended in any other error, or was cancelled, as
+          a failure, so that a trial call of a half open circuit always ends
+        :return: None
+        """
+        self.__breaker.failure()
+
+    def __responded(self, status: int) -> Optional[float]:
+        """
+        Count an attempt that Ragic responded to, retrying overloaded
+          responses
+        :param status: the status of the response
+        :return: the delay before the next attempt, or None if the response
+          should be returned
+        """
+        if status not in RETRY_STATUSES:
+            self.__breaker.success()
+            return None
+        self.__breaker.failure()
+        return self.__retry()
+
+    def send(self, request: Callable[[tuple[float, float]], Any]) -> Any:
+        """
+        Make the call with a blocking client
+        :param request: sends an attempt with the given connect and read
+          timeouts and returns the response
+        :return: the response
+        """
+        while True:
+            timeout = self.__attempt()
+            try:
+                response = request(timeout)
+            except self.__transient as error:
+                delay = self.__failed(error)
+            except BaseException:
+                self.__abandoned()
+                raise
+            else:
+                delay = self.__responded(response.status_code)
+                if delay is None:
+                    return response
+            sleep(delay)
+
+    async def send_async(
+        self, request: Callable[[tuple[float, float]], Awaitable]
+    ) -> Any:
+        """
+        Make the call with an asyncio client
+        :param request: sends an attempt with the given connect and read
+          timeouts and returns an awaitable of the response
+        :return: the response
+        """
+        while True:
+            timeout = self.__attempt()
+            try:
+                response = await request(timeout)
+            except self.__transient as error:
+                delay = self.__failed(error)
+            except BaseException:
+                self.__abandoned()
+                raise
+            else:
+                delay = self.__responded(response.status_code)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
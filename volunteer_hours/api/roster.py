@@ -0,0 +1,44 @@
+"""
+Keep the attendance roster fresh in the background
+"""
+from threading import Thread, Event
+from typing import Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.api.ragic import Ragic
+
+
+class RosterRefresher(metaclass=ThreadSafeMeta):
+    """
+    A global background thread that reloads the roster periodically
+    """
+
+    def __init__(self):
+        self.__thread: Optional[Thread] = None
+        self.__stop = Event()
+
+    def start(self) -> None:
+        """
+        Start the refresher thread if it is not running
+        :return: None
+        """
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__stop.clear()
+            self.__thread = Thread(target=self.__run, name="roster", daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Ask the refresher thread to exit
+        :return: None
+        """
+        self.__stop.set()
+
+    def __run(self) -> None:
+        """
+        Reload the roster until stopped
+        :return: None
+        """
+        while not self.__stop.is_set():
+            Ragic().load_roster()
+            self.__stop.wait(Config.roster_refresh())
@@ -0,0 +1,173 @@
+"""
+Replay the clock event journal to Ragic in the background
+"""
+# pylint: disable=W0212
+import sqlite3
+from datetime import timedelta
+from threading import Thread
+from time import monotonic
+from typing import Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.common.journal import Journal
+from volunteer_hours.common.metrics import Metrics
+from volunteer_hours.common.timenow import Clock
+from volunteer_hours.logger.pkg_logger import Logger
+
+
+class FlushError(Exception):
+    """
+    Raised when a journal entry cannot be written to Ragic yet
+    """
+
+
+class JournalFlusher(metaclass=ThreadSafeMeta):
+    """
+    A global background thread that writes journaled clock events to Ragic
+      in the order they were recorded, retrying with exponential backoff
+    """
+
+    _idle_seconds = 5.0
+    _lease_seconds = 120.0
+    _max_backoff = 300.0
+    _prune_seconds = 3600.0
+
+    def __init__(self):
+        self.__journal = Journal()
+        self.__thread: Optional[Thread] = None
+        self.__pruned_at: Optional[float] = None
+
+    def start(self) -> None:
+        """
+        Start the flusher thread if it is not running
+        :return: None
+        """
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__thread = Thread(target=self.__run, name="journal", daemon=True)
+            self.__thread.start()
+
+    def __run(self) -> None:
+        """
+        Flush batches until the journal is drained, then wait to be woken
+        :return: None
+        """
+        while True:
+            self.__journal.wake.clear()
+            try:
+                flushed = self.flush()
+                self.__tidy()
+            except sqlite3.Error as error:
+                Logger.error("Unable to read the journal: %s", error)
+                flushed = 0
+            if not flushed:
+                self.__journal.wake.wait(self._idle_seconds)
+
+    def __tidy(self) -> None:
+        """
+        Report the entries left in the journal, and delete the entries
+          written to Ragic more than a day ago about once an hour
+        :return: None
+        """
+        for state, entries in self.__journal.counts().items():
+            Metrics().journal_entries.set(entries, state=state)
+        if (
+            self.__pruned_at is not None
+            and monotonic() - self.__pruned_at < self._prune_seconds
+        ):
+            return
+        self.__pruned_at = monotonic()
+        yesterday = Clock().moment().local - timedelta(days=1)
+        pruned = self.__journal.prune(yesterday.strftime(Config.date_format()))
+        if pruned:
+            Logger.info("Pruned %d flushed entries from the journal", pruned)
+
+    def flush(self) -> int:
+        """
+        Write one batch of journal entries to Ragic
+        :return: the number of entries claimed
+        """
+        rows = self.__journal.claim(Config.journal_batch_size(), self._lease_seconds)
+        ragic = Ragic()
+        for row in rows:
+            try:
+                record_id = self.__flush_entry(ragic, row)
+            except Exception as error:  # pylint: disable=broad-except
+                self.__retry(row, error)
+                continue
+            self.__journal.complete(row["id"], record_id)
+            Logger.info("Flushed %s to Ragic", row["key"])
+        return len(rows)
+
+    def __flush_entry(self, ragic: Ragic, row: sqlite3.Row) -> Optional[str]:
+        """
+        Write a single journal entry to Ragic
+        :param ragic: the Ragic client to write with
+        :param row: the journal entry
+        :raises FlushError: if the entry cannot be written yet
+        :return: the ID of the hours detail record that was written
+        """
+        member_id, event_id, date = row["member_id"], row["event_id"], row["date"]
+        if row["action"] == Journal.CLOCK_IN:
+            # A clock in may have reached Ragic already, from an attempt that
+            # failed or from a worker whose lease on the entry ran out
+            hours_info = ragic._get_hours_detail(member_id, event_id, date)
+            if hours_info:
+                return list(hours_info.keys())[0]
+            eid = ragic._attendance_eid(ragic.roster_events(member_id), event_id)
+            if eid is None:
+                raise FlushError(f"No attendance info for {member_id}")
+            response = ragic._clock_in(eid, member_id, event_id, date, row["time"])
+            self.__check(response)
+            record_id = response.get("ragicId")
+            ragic._index_clock(
+                Journal.CLOCK_IN, member_id, event_id, date, record_id, row["time"]
+            )
+            return record_id
+        record_id = row["record_id"] or self.__journal.clock_in_record(
+            member_id, event_id, date
+        )
+        if not record_id:
+            hours_info = ragic._get_hours_detail(member_id, event_id, date)
+            if not hours_info:
+                raise FlushError(f"No hours record to clock out of for {member_id}")
+            record_id = list(hours_info.keys())[0]
+        self.__check(ragic._clock_out(record_id, row["time"]))
+        ragic._index_clock(
+            Journal.CLOCK_OUT, member_id, event_id, date, record_id, row["time"]
+        )
+        return record_id
+
+    @staticmethod
+    def __check(response: dict) -> None:
+        """
+        Make sure Ragic accepted a write
+        :param response: response data from Ragic
+        :raises FlushError: if Ragic reported an error
+        :return: None
+        """
+        if response.get("status", "SUCCESS") != "SUCCESS":
+            raise FlushError(f"Ragic rejected the write: {response.get('msg')}")
+
+    def __retry(self, row: sqlite3.Row, error: Exception) -> None:
+        """
+        Schedule a failed entry for another attempt or give up on it
+        :param row: the journal entry
+        :param error: the reason the entry failed
+        :return: None
+        """
+        attempts = row["attempts"] + 1
+        if attempts >= Config.journal_max_attempts():
+            Logger.error(
+                "Giving up on %s after %d tries, it is listed at /admin/journal: %s",
+                row["key"],
+                attempts,
+                error,
+            )
+            self.__journal.abandon(row["id"])
+            return
+        backoff = min(2.0**attempts, self._max_backoff)
+        Logger.warn(
+            "Unable to flush %s, retrying in %ss: %s", row["key"], backoff, error
+        )
+        self.__journal.fail(row["id"], backoff)
@@ -1,50 +1,386 @@
 """
 A Flask application for logging volunteer hours
 """
-from flask import Flask, request, render_template
+import secrets
+from threading import Thread, Lock
+from time import perf_counter
+from typing import Optional
+from uuid import uuid4
 
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    current_app,
+    g,
+    jsonify,
+    request,
+    render_template,
+    session,
+)
+
+from volunteer_hours import Config
 from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.api.write_behind import JournalFlusher
+from volunteer_hours.assets import assets, asset_url
+from volunteer_hours.api.roster import RosterRefresher
+from volunteer_hours.closeout import CloseOutError, close_event, closing_time
+from volunteer_hours.common.cache import TTLCache
 from volunteer_hours.common.member import Member
+from volunteer_hours.common.fanout import FanOutError
+from volunteer_hours.common.hours_table import ReportError
+from volunteer_hours.common.journal import Journal
+from volunteer_hours.common.metrics import Metrics
+from volunteer_hours.common.profiler import RequestProfiler
+from volunteer_hours.common.timenow import Clock
+from volunteer_hours.reports import hours_report
+
+kiosk = Blueprint("kiosk", __name__)
+workers_lock = Lock()
+workers_started = False  # pylint: disable=invalid-name
+
+
+def create_app() -> Flask:
+    """
+    Create the app, reading the config only now rather than on import, so
+      that importing the app stays cheap and writes nothing
+    :return: the Flask app
+    """
+    app = Flask(__name__)
+    app.secret_key = Config.secret_key()
+    app.register_blueprint(kiosk)
+    app.register_blueprint(assets)
+    app.jinja_env.globals["asset"] = asset_url
+    app.extensions["recent_scans"] = TTLCache(1024, Config.scan_debounce())
+    app.extensions["closeouts"] = TTLCache(64, 86400)
+    if Config.async_views():
+        app.view_functions["kiosk.action_screen"] = action_screen_async
+        app.view_functions["kiosk.sent_screen"] = sent_screen_async
+    return app
+
+
+def start_workers() -> None:
+    """
+    Start the background threads on the first request rather than on import,
+      so that importing the app stays cheap
+    :return: None
+    """
+    global workers_started  # pylint: disable=global-statement,invalid-name
+    with workers_lock:
+        if workers_started:
+            return
+        workers_started = True
+    if Config.write_behind():
+        JournalFlusher().start()
+    Thread(target=Ragic().load_hours_index, name="hours-index", daemon=True).start()
+    RosterRefresher().start()
+
 
-app = Flask(__name__)
-member = Member()
+def load_member() -> Member:
+    """
+    Restore the member scanned at this kiosk from the signed session cookie
+    :return: the kiosk's current member
+    """
+    return Member.from_dict(session.get("member", {}))
+
+
+def save_member(member: Member) -> None:
+    """
+    Store the member scanned at this kiosk in the signed session cookie
+    :param member: the kiosk's current member
+    :return: None
+    """
+    session["member"] = member.to_dict()
+
+
+def is_admin() -> bool:
+    """
+    Check the request for the admin bearer token
+    :return: True if the admin token is set and the request carries it
+    """
+    token = Config.admin_token()
+    if token is None:
+        return False
+    supplied = request.headers.get("Authorization", "")
+    return secrets.compare_digest(supplied.encode(), f"Bearer {token}".encode())
 
 
-@app.route("/")
+@kiosk.before_app_request
+def start_request() -> None:
+    """
+    Start timing and, when asked, profiling the request, and pin the time
+      every Ragic call will see
+    :return: None
+    """
+    # Admins can profile a single request with an X-Profile header
+    g.profile_requested = bool(request.headers.get("X-Profile")) and is_admin()
+    g.profile = RequestProfiler().start(g.profile_requested)
+    g.started = perf_counter()
+    g.clock = Clock().pin()
+    start_workers()
+    Metrics().http_in_flight.inc()
+
+
+@kiosk.after_app_request
+def record_status(response: Response) -> Response:
+    """
+    Remember the status code for the request metrics
+    :param response: the response to send
+    :return: the same response
+    """
+    g.status = response.status_code
+    return response
+
+
+@kiosk.teardown_app_request
+def finish_request(_error: Optional[BaseException]) -> None:
+    """
+    Record the latency and status code of the request, and write its
+      profile if it was profiled
+    :param _error: an unhandled exception, if any
+    :return: None
+    """
+    Clock().unpin(g.clock)
+    metrics = Metrics()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    elapsed = perf_counter() - g.started
+    metrics.http_in_flight.dec()
+    metrics.http_latency.observe(elapsed, route=route, method=request.method)
+    metrics.http_requests.inc(
+        route=route, method=request.method, status=g.get("status", 500)
+    )
+    if g.profile is not None:
+        RequestProfiler().finish(g.profile, route, elapsed, g.profile_requested)
+
+
+@kiosk.route("/metrics")
+def metrics_screen() -> Response:
+    """
+    Expose the application's metrics for Prometheus
+    :return: metrics in the Prometheus text format
+    """
+    return Response(Metrics().render(), mimetype="text/plain; version=0.0.4")
+
+
+@kiosk.route("/")
 def main_screen() -> str:
     """
     The main page for scanning QR code
     :return: content from index.html
     """
-    member.reset_member()
+    session.pop("member", None)
     content = render_template("index.html")
     return content
 
 
-@app.route("/action", methods=["GET", "POST"])
+@kiosk.route("/action", methods=["GET", "POST"])
 def action_screen() -> str:
     """
     The action page for selecting an event to sign in/out for
     :return: content from action.html with events from Ragic
     """
+    member = load_member()
     if request.method == "POST":
-        member_id = request.form.get("member_id")
+        member_id = request.form.get("member_id", "")
+        # The scanner can read the same card several times in a row
+        scan = (request.remote_addr, member_id)
+        recent_scans = current_app.extensions["recent_scans"]
+        if recent_scans.get(scan) and member.member_id == member_id:
+            return f"Received {member_id}"
+        recent_scans.put(scan, True)
         member.member_id = member_id
+        save_member(member)
         return f"Received {member_id}"
-    name = member.get_member_name()
-    events = member.get_event_names()
-    content = render_template("action.html", name=name, events=events)
+    try:
+        name, events = member.get_profile()
+    except FanOutError:
+        message = "Unable to retrieve member info. Please try again later."
+        return render_template("sent.html", message=message)
+    save_member(member)
+    content = render_template("action.html", name=name, events=events, key=uuid4().hex)
     return content
 
 
-@app.route("/sent")
+@kiosk.route("/sent")
 def sent_screen() -> str:
     """
     The sent screen to show that the hours have been logged
     :return: content from sent.html with a response from Ragic
     """
+    member = load_member()
+    event_name = request.args.get("event")
+    event_id = member.get_event_id(event_name)
+    request_key = request.args.get("key")
+    message = Ragic().log_hours(member.member_id, event_id, request_key)
+    content = render_template("sent.html", message=message)
+    return content
+
+
+@kiosk.route("/api/scan", methods=["POST"])
+def scan_api() -> Response:
+    """
+    Look up a scanned member's name and events in one round trip
+    :return: JSON with the member's name, events and an idempotency key for
+      clocking in or out
+    """
+    payload = request.get_json(silent=True) or request.form
+    member = Member()
+    member.member_id = str(payload.get("member_id", ""))
+    if not member.member_id:
+        return jsonify(error="Invalid membership card."), 400
+    try:
+        name, events = member.get_profile()
+    except FanOutError:
+        message = "Unable to retrieve member info. Please try again later."
+        return jsonify(error=message), 503
+    save_member(member)
+    return jsonify(
+        member_id=member.member_id, name=name, events=events, key=uuid4().hex
+    )
+
+
+@kiosk.route("/api/clock", methods=["POST"])
+def clock_api() -> Response:
+    """
+    Clock the scanned member in or out of an event
+    :return: JSON with a message to the member
+    """
+    payload = request.get_json(silent=True) or request.form
+    member = load_member()
+    if not member.member_id:
+        return jsonify(error="Please scan your membership card first."), 400
+    event_id = member.get_event_id(payload.get("event"))
+    message = Ragic().log_hours(member.member_id, event_id, payload.get("key"))
+    return jsonify(message=message)
+
+
+@kiosk.route("/reports")
+def reports_screen() -> Response:
+    """
+    Total volunteer hours per member, event, date or month over a date range
+    :return: a table of totals, or JSON with format=json
+    """
+    as_json = request.args.get("format") == "json"
+    if not is_admin():
+        if as_json:
+            return jsonify(error="Not authorized."), 403
+        return render_template("sent.html", message="Not authorized."), 403
+    try:
+        report = hours_report(
+            request.args.get("start"),
+            request.args.get("end"),
+            request.args.get("by", "member"),
+        )
+    except ReportError as error:
+        if as_json:
+            return jsonify(error=str(error)), 400
+        return render_template("sent.html", message=str(error)), 400
+    if as_json:
+        return jsonify(report)
+    return render_template("reports.html", report=report)
+
+
+@kiosk.route("/admin/events/<int:event_id>/close", methods=["POST"])
+def close_event_api(event_id: int) -> Response:
+    """
+    Start clocking everyone who is still clocked in out of an event in the
+      background, since a large event takes longer than a request should
+    :param event_id: the ID of the event
+    :return: JSON with the ID of the close-out, whose progress and result are
+      at the Location header
+    """
+    if not is_admin():
+        return jsonify(error="Not authorized."), 403
+    payload = request.get_json(silent=True) or request.form
+    try:
+        date, time = closing_time(payload.get("date"), payload.get("time"))
+    except CloseOutError as error:
+        return jsonify(error=str(error)), 400
+    job_id = uuid4().hex
+    job = {"job_id": job_id, "status": "running", "done": 0, "total": None}
+    current_app.extensions["closeouts"].put(job_id, job)
+
+    def progress(done: int, total: int) -> None:
+        job.update(done=done, total=total)
+
+    def run() -> None:
+        try:
+            job.update(result=close_event(event_id, date, time, progress))
+        except Exception as error:  # pylint: disable=broad-except
+            job.update(status="failed", error=str(error))
+        else:
+            job.update(status="done")
+
+    Thread(target=run, name=f"closeout-{event_id}", daemon=True).start()
+    location = f"/admin/closeouts/{job_id}"
+    return jsonify(job), 202, {"Location": location}
+
+
+@kiosk.route("/admin/closeouts/<job_id>")
+def closeout_api(job_id: str) -> Response:
+    """
+    Show the progress of a close-out started by this worker, and its result
+      once it is done, for a day after it started
+    :param job_id: the ID of the close-out
+    :return: JSON with the status and progress of the close-out
+    """
+    if not is_admin():
+        return jsonify(error="Not authorized."), 403
+    job = current_app.extensions["closeouts"].get(job_id)
+    if job is None:
+        return jsonify(error="No such close-out."), 404
+    return jsonify(job)
+
+
+@kiosk.route("/admin/journal")
+def journal_api() -> Response:
+    """
+    Show the clock events waiting to be written to Ragic and those given up
+      on, which need to be entered in Ragic by hand or scanned again
+    :return: JSON with the counts of entries and the abandoned entries
+    """
+    if not is_admin():
+        return jsonify(error="Not authorized."), 403
+    journal = Journal()
+    return jsonify(**journal.counts(), entries=journal.abandoned())
+
+
+async def action_screen_async() -> str:
+    """
+    An async version of the action page that keeps the thread free while
+      waiting on Ragic
+    :return: content from action.html with events from Ragic
+    """
+    # pylint: disable=import-outside-toplevel
+    from volunteer_hours.api.async_ragic import AsyncRagic
+
+    if request.method == "POST":
+        return action_screen()
+    member = load_member()
+    try:
+        name, events = await member.get_profile_async(AsyncRagic())
+    except FanOutError:
+        message = "Unable to retrieve member info. Please try again later."
+        return render_template("sent.html", message=message)
+    save_member(member)
+    content = render_template("action.html", name=name, events=events, key=uuid4().hex)
+    return content
+
+
+async def sent_screen_async() -> str:
+    """
+    An async version of the sent page that keeps the thread free while
+      waiting on Ragic
+    :return: content from sent.html with a response from Ragic
+    """
+    # pylint: disable=import-outside-toplevel
+    from volunteer_hours.api.async_ragic import AsyncRagic
+
+    member = load_member()
     event_name = request.args.get("event")
     event_id = member.get_event_id(event_name)
-    message = Ragic().log_hours(member.member_id, event_id)
+    message = await AsyncRagic().log_hours(
+        member.member_id, event_id, request.args.get("key")
+    )
     content = render_template("sent.html", message=message)
     return content
@@ -0,0 +1,187 @@
+"""
+Build and serve fingerprinted, precompressed static assets
+
+The build copies every stylesheet and script under static/ to static/dist/
+with a content hash in its file name, next to gzip and, with the assets
+extra, brotli copies, and writes a manifest from the original names to the
+hashed ones and their hashes. Only the files in the manifest are served, and
+since they never change, with immutable cache headers.
+
+    python -m volunteer_hours.assets
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import sys
+from argparse import ArgumentParser, Namespace
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from flask import Blueprint, Response, abort, request, send_file, url_for
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST = DIST_DIR / "manifest.json"
+EXTENSIONS = (".css", ".js", ".mjs", ".map", ".svg")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+ONE_YEAR = 365 * 24 * 60 * 60
+
+assets = Blueprint("assets", __name__)
+
+
+def fingerprint(path: Path) -> str:
+    """
+    Hash the content of a file
+    :param path: the file to hash
+    :return: the first 12 hex digits of its SHA-256
+    """
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+
+def compress(path: Path) -> None:
+    """
+    Write gzip and, if brotli is installed, brotli copies of a file
+    :param path: the file to compress
+    :return: None
+    """
+    data = path.read_bytes()
+    Path(f"{path}.gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return
+    Path(f"{path}.br").write_bytes(brotli.compress(data))
+
+
+def build(
+    source: Path = STATIC_DIR, target: Path = DIST_DIR
+) -> dict[str, dict[str, str]]:
+    """
+    Fingerprint and precompress every asset
+    :param source: the static directory
+    :param target: where to write the hashed files and the manifest
+    :return: the hashed file name and hash keyed by original file name
+    """
+    manifest: dict[str, dict[str, str]] = {}
+    for path in sorted(source.rglob("*")):
+        if target in path.parents or not path.is_file():
+            continue
+        if path.suffix not in EXTENSIONS or path.name.startswith("."):
+            continue
+        name = path.relative_to(source).as_posix()
+        digest = fingerprint(path)
+        hashed = f"{path.stem}.{digest}{path.suffix}"
+        hashed = (Path(name).parent / hashed).as_posix()
+        output = target / hashed
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(path.read_bytes())
+        compress(output)
+        manifest[name] = {"file": hashed, "digest": digest}
+    target.mkdir(parents=True, exist_ok=True)
+    (target / MANIFEST.name).write_text(
+        json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8"
+    )
+    load_manifest.cache_clear()
+    served.cache_clear()
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_manifest() -> dict[str, dict[str, str]]:
+    """
+    Read the manifest of the last build once
+    :return: the hashed file name and hash keyed by original file name,
+      empty before the first build
+    """
+    try:
+        manifest = json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    # Entries written by a build that did not list hashes are served unhashed
+    return {name: entry for name, entry in manifest.items() if isinstance(entry, dict)}
+
+
+@lru_cache(maxsize=None)
+def served() -> dict[str, str]:
+    """
+    List the files that are served, so that neither the manifest, nor the
+      compressed copies, nor a file left over from an earlier build is
+    :return: the hash of each hashed file keyed by its name
+    """
+    return {entry["file"]: entry["digest"] for entry in load_manifest().values()}
+
+
+def asset_url(filename: str) -> str:
+    """
+    Get the URL of a static file, its fingerprinted copy once built
+    :param filename: the file name relative to the static directory
+    :return: the URL to use in a page
+    """
+    entry = load_manifest().get(filename)
+    if entry is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.asset", filename=entry["file"])
+
+
+@assets.route("/assets/<path:filename>")
+def asset(filename: str) -> Response:
+    """
+    Serve a fingerprinted asset, precompressed when the client accepts it
+    :param filename: the hashed file name
+    :return: the file with immutable cache headers
+    """
+    digest = served().get(filename)
+    path = DIST_DIR / filename
+    if digest is None or not path.is_file():
+        abort(404)
+    mimetype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    accepted = request.accept_encodings
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if accepted[name] and Path(f"{path}{suffix}").is_file():
+            encoding, path = name, Path(f"{path}{suffix}")
+            break
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        etag=f"{digest}-{encoding or 'identity'}",
+        max_age=ONE_YEAR,
+        conditional=True,
+    )
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("--source", type=Path, default=STATIC_DIR)
+    args.add_argument("--target", type=Path, default=DIST_DIR)
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Build the assets from the command line
+    :param argv: the arguments, defaults to sys.argv
+    :return: the exit status
+    """
+    options = parse_args(argv)
+    manifest = build(options.source, options.target)
+    for name, entry in manifest.items():
+        print(f"{name} -> {entry['file']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Clock everyone who is still clocked in out of an event at once
+
+Finds the open hours detail records of an event with one query and closes
+them concurrently, at most CLOSEOUT_RATE writes per second. Closing a record
+only sets its end time, so a close-out that reports failures can be run
+again to retry them. With write-behind on, the journal is flushed first, and
+clock ins that still cannot be written are closed out in the journal.
+
+    python -m volunteer_hours.closeout 1234 --date 2022/06/18 --time 17:00
+"""
+import json
+import sqlite3
+import sys
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Optional
+
+import requests
+
+from volunteer_hours import Config
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.api.write_behind import JournalFlusher
+from volunteer_hours.common.enums import Hours
+from volunteer_hours.common.hours_index import HoursIndex
+from volunteer_hours.common.journal import Journal
+from volunteer_hours.common.rate_limit import RateLimiter
+from volunteer_hours.common.records import HoursDetail
+from volunteer_hours.common.timenow import Clock
+from volunteer_hours.logger.pkg_logger import Logger
+
+
+class CloseOutError(Exception):
+    """
+    Raised when the open records of an event cannot be closed out
+    """
+
+
+def closing_time(date: Optional[str], time: Optional[str]) -> tuple[str, str]:
+    """
+    Check the day and end time of a close-out, defaulting to now
+    :param date: the day of the event in the configured date format, if any
+    :param time: the end time in the configured time format, if any
+    :return: the day and the end time
+    """
+    moment = Clock().moment()
+    date = date or moment.today
+    time = time or moment.now
+    for value, value_format in (
+        (date, Config.date_format()),
+        (time, Config.time_format()),
+    ):
+        try:
+            datetime.strptime(value, value_format)
+        except ValueError as error:
+            raise CloseOutError(f"Invalid date or time {value}") from error
+    return date, time
+
+
+def log_progress(done: int, total: int) -> None:
+    """
+    Log the progress of a close-out every tenth of the way
+    :param done: the number of records written so far
+    :param total: the number of records to write
+    :return: None
+    """
+    step = max(total // 10, 1)
+    if done % step == 0 or done == total:
+        Logger.info("Closed out %d of %d records", done, total)
+
+
+def settle_journal(event_id: int, date: str, time: str) -> int:
+    """
+    Flush the journal so that clock ins recorded but not yet written to Ragic
+      are found open, then journal a clock out for each one that still cannot
+      be written, which the flusher writes after it
+    :param event_id: the ID of the event
+    :param date: the day of the event
+    :param time: the end time of the records
+    :return: the number of clock outs journaled
+    """
+    flusher, journal = JournalFlusher(), Journal()
+    # Entries that fail are held back before they are claimed again
+    while flusher.flush():
+        pass
+    journaled = 0
+    for member_id in journal.pending_clock_ins(event_id, date):
+        if journal.record(Journal.CLOCK_OUT, member_id, event_id, date, time):
+            journaled += 1
+            details = HoursDetail("Completed", None)
+            HoursIndex().update(member_id, event_id, date, None, details)
+    if journaled:
+        Logger.info("Journaled %d clock outs of event %s", journaled, event_id)
+    return journaled
+
+
+def close_event(
+    event_id: int,
+    date: Optional[str] = None,
+    time: Optional[str] = None,
+    progress: Callable[[int, int], None] = log_progress,
+) -> dict:
+    """
+    Clock out of every open record of an event
+    :param event_id: the ID of the event
+    :param date: the day of the event, defaults to today
+    :param time: the end time of the records, defaults to now
+    :param progress: called with the number of records written so far and
+      the number to write after each write
+    :return: the counts of open, closed and journaled records and the
+      failures
+    """
+    date, time = closing_time(date, time)
+    ragic = Ragic()
+    journaled = 0
+    try:
+        if Config.write_behind():
+            journaled = settle_journal(event_id, date, time)
+    except sqlite3.Error as error:
+        raise CloseOutError(f"Unable to read the journal: {error}") from error
+    try:
+        records = ragic.open_hours(event_id, date)
+    except (requests.RequestException, ValueError) as error:
+        raise CloseOutError(f"Unable to find the open records: {error}") from error
+    workers = Config.closeout_workers()
+    limiter = RateLimiter(Config.closeout_rate(), burst=workers)
+
+    def close(record_id: str) -> None:
+        limiter.acquire()
+        ragic.close_hours(record_id, time)
+
+    closed, failed = 0, []
+    with ThreadPoolExecutor(workers, thread_name_prefix="closeout") as pool:
+        futures = {pool.submit(close, record_id): record_id for record_id in records}
+        for done, future in enumerate(as_completed(futures), start=1):
+            record_id = futures[future]
+            member_id = str(records[record_id].get(str(Hours.NEW_MEMBERSHIP_ID), ""))
+            error = future.exception()
+            if error is None:
+                closed += 1
+                details = HoursDetail("Completed", None)
+                HoursIndex().update(member_id, event_id, date, record_id, details)
+            else:
+                Logger.error("Unable to close out %s: %s", record_id, error)
+                failed.append(
+                    {
+                        "record_id": record_id,
+                        "member_id": member_id,
+                        "error": str(error),
+                    }
+                )
+            progress(done, len(records))
+    Logger.info(
+        "Closed out %d of %d open records of event %s", closed, len(records), event_id
+    )
+    return {
+        "event_id": event_id,
+        "date": date,
+        "time": time,
+        "open": len(records),
+        "closed": closed,
+        "journaled": journaled,
+        "failed": sorted(failed, key=lambda failure: failure["record_id"]),
+    }
+
+
+def print_progress(done: int, total: int) -> None:
+    """
+    Show the progress of a close-out on one line of standard error
+    :param done: the number of records written so far
+    :param total: the number of records to write
+    :return: None
+    """
+    end = "\n" if done == total else ""
+    print(f"\rClosed out {done} of {total} records", end=end, file=sys.stderr)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("event_id", type=int)
+    args.add_argument("--date", help="the day of the event, defaults to today")
+    args.add_argument("--time", help="the end time, defaults to now")
+    args.add_argument("--format", choices=("table", "json"), default="table")
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Close out an event from the command line
+    :param argv: the arguments, defaults to sys.argv
+    :return: the exit status, 1 if any record could not be closed
+    """
+    options = parse_args(argv)
+    try:
+        result = close_event(
+            options.event_id, options.date, options.time, print_progress
+        )
+    except CloseOutError as error:
+        print(error, file=sys.stderr)
+        return 1
+    if options.format == "json":
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(
+            f"Closed out {result['closed']} of {result['open']} open records of "
+            f"event {result['event_id']} on {result['date']} at {result['time']}"
+        )
+        if result["journaled"]:
+            print(f"Journaled {result['journaled']} clock outs not yet in Ragic")
+        for failure in result["failed"]:
+            print(f"{failure['record_id']} {failure['member_id']} {failure['error']}")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
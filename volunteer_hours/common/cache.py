@@ -0,0 +1,163 @@
+"""
+A bounded in-process cache with time-to-live and LRU eviction
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Hashable, Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.common.records import MemberInfo
+from volunteer_hours.common.shared_cache import SharedCache
+
+
+class TTLCache:
+    """
+    A thread-safe mapping whose entries expire after a fixed number of
+      seconds, evicting the least recently used entry once full
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        """
+        Getter for the number of cache hits
+        :return: hits since creation
+        """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """
+        Getter for the number of cache misses
+        :return: misses since creation
+        """
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a value and mark it as recently used
+        :param key: the key to look up
+        :return: the cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when full
+        :param key: the key to store under
+        :param value: the value to store
+        :param ttl: how long the value stays valid, defaults to the cache's
+        :return: None
+        """
+        with self._lock:
+            self._data[key] = (monotonic() + (self._ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a single entry if present
+        :param key: the key to remove
+        :return: None
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove every entry
+        :return: None
+        """
+        with self._lock:
+            self._data.clear()
+
+
+class MemberCache(TTLCache, metaclass=ThreadSafeMeta):
+    """
+    A global cache of member info records keyed by membership ID, backed by
+      the shared cache so that a member looked up by one worker is cached in
+      every worker
+    """
+
+    def __init__(self):
+        super().__init__(Config.member_cache_size(), Config.member_cache_ttl())
+
+    def get(self, key: Hashable) -> Optional[MemberInfo]:
+        """
+        Look up a member in this worker, then in the shared cache
+        :param key: the membership ID
+        :return: the member's info, or None if missing or expired
+        """
+        info = super().get(key)
+        if info is not None or not Config.shared_cache():
+            return info
+        entry = SharedCache().get_with_age("member", str(key))
+        if entry is None:
+            return None
+        data, age = entry
+        info = MemberInfo.from_dict(data)
+        super().put(key, info, self._ttl - age)
+        return info
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Cache a member in this worker and in the shared cache
+        :param key: the membership ID
+        :param value: the member's info
+        :param ttl: how long the info stays valid, defaults to the cache's
+        :return: None
+        """
+        super().put(key, value, ttl)
+        if Config.shared_cache():
+            ttl = self._ttl if ttl is None else ttl
+            SharedCache().put("member", str(key), value.to_dict(), ttl)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a member from this worker and from the shared cache
+        :param key: the membership ID
+        :return: None
+        """
+        super().invalidate(key)
+        if Config.shared_cache():
+            SharedCache().invalidate("member", str(key))
+
+    def clear(self) -> None:
+        """
+        Remove every member from this worker and from the shared cache
+        :return: None
+        """
+        super().clear()
+        if Config.shared_cache():
+            SharedCache().clear("member")
+
+
+class OutcomeCache(TTLCache, metaclass=ThreadSafeMeta):
+    """
+    A global cache of the messages returned for clock in and out requests,
+      keyed by member ID and the idempotency key sent by the kiosk
+    """
+
+    def __init__(self):
+        super().__init__(4096, Config.idempotency_ttl())
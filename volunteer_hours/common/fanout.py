@@ -0,0 +1,47 @@
+"""
+Run independent lookups concurrently on a bounded thread pool
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.logger.pkg_logger import Logger
+
+
+class FanOutError(Exception):
+    """
+    Raised when a concurrent lookup fails or does not finish in time
+    """
+
+
+class FanOut(metaclass=ThreadSafeMeta):
+    """
+    A global pool of worker threads for concurrent lookups
+    """
+
+    def __init__(self):
+        self.__executor = ThreadPoolExecutor(
+            max_workers=Config.lookup_workers(), thread_name_prefix="lookup"
+        )
+
+    def run(self, *calls: Callable[[], Any]) -> list[Any]:
+        """
+        Run the calls concurrently and wait for the slowest one
+        :param calls: callables that take no arguments
+        :return: results in the same order as the calls
+        """
+        futures = [self.__executor.submit(call) for call in calls]
+        _, pending = wait(futures, timeout=Config.lookup_timeout())
+        for future in pending:
+            future.cancel()
+        if pending:
+            Logger.error("%d of %d lookups timed out", len(pending), len(futures))
+            raise FanOutError("Lookup timed out")
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                Logger.error("Lookup failed: %r", error)
+                raise FanOutError("Lookup failed") from error
+            results.append(future.result())
+        return results
@@ -0,0 +1,93 @@
+"""
+An in-memory index of the day's hours detail records
+"""
+from threading import Lock
+from typing import Optional
+
+from volunteer_hours import ThreadSafeMeta
+from volunteer_hours.common.records import HoursDetail
+
+
+class HoursIndex(metaclass=ThreadSafeMeta):
+    """
+    A global index of one day's hours detail records keyed by member ID and
+      event ID, so deciding between clocking in and out needs no Ragic query
+    """
+
+    def __init__(self):
+        self.__date: Optional[str] = None
+        self.__records: dict[tuple[str, str], tuple[str, HoursDetail]] = {}
+        self.__lock = Lock()
+        self.loading = Lock()
+
+    @staticmethod
+    def _key(member_id: str, event_id) -> tuple[str, str]:
+        return member_id, str(event_id)
+
+    def is_current(self, date: str) -> bool:
+        """
+        Check whether the index holds the records of a day
+        :param date: the day to check
+        :return: True if the index was loaded for that day
+        """
+        return self.__date == date
+
+    def load(
+        self, date: str, records: dict[tuple[str, str], tuple[str, HoursDetail]]
+    ) -> None:
+        """
+        Replace the index with a day's records
+        :param date: the day the records belong to
+        :param records: (record ID, details) keyed by member ID and event ID
+        :return: None
+        """
+        with self.__lock:
+            self.__date = date
+            self.__records = records
+
+    def lookup(
+        self, member_id: str, event_id, date: str
+    ) -> Optional[dict[str, HoursDetail]]:
+        """
+        Find a member's record for an event in the same shape as Ragic, a
+          miss cannot be trusted, since another worker may have clocked the
+          member in since the index was loaded, nor can an open record, which
+          another worker may have clocked out of
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the day to look up
+        :return: hours detail keyed by record ID, or None if the day is not
+          loaded or holds no record of the member
+        """
+        with self.__lock:
+            if self.__date != date:
+                return None
+            entry = self.__records.get(self._key(member_id, event_id))
+        if entry is None:
+            return None
+        record_id, details = entry
+        return {record_id: details}
+
+    def update(
+        self,
+        member_id: str,
+        event_id,
+        date: str,
+        record_id: Optional[str],
+        details: HoursDetail,
+    ) -> None:
+        """
+        Merge a change to a record into the index
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the day of the record
+        :param record_id: the ID of the record, or None to keep the known one
+        :param details: the record with only the fields that changed known
+        :return: None
+        """
+        key = self._key(member_id, event_id)
+        with self.__lock:
+            if self.__date != date:
+                return
+            known_id, known = self.__records.get(key, (None, HoursDetail()))
+            self.__records[key] = (record_id or known_id, known.merge(details))
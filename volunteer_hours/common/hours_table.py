@@ -0,0 +1,210 @@
+"""
+Columnar hours detail records with vectorized durations and totals
+"""
+# pylint: disable=import-outside-toplevel
+from typing import Any, Iterable
+
+from volunteer_hours.common.enums import Hours
+
+GROUPS = ("member", "event", "date", "month")
+MINUTES_PER_DAY = 24 * 60
+
+
+class ReportError(Exception):
+    """
+    Raised when a report cannot be built
+    """
+
+
+def load_numpy() -> Any:
+    """
+    Import numpy, which is only needed for reports
+    :return: the numpy module
+    """
+    try:
+        import numpy
+    except ImportError as error:
+        raise ReportError(
+            "Reports need numpy, install volunteer_hours with the reports extra"
+        ) from error
+    return numpy
+
+
+def _digits(numpy: Any, values: list[str], width: int) -> Any:
+    """
+    Split fixed width strings into a matrix of digit values
+    :param numpy: the numpy module
+    :param values: zero padded strings such as "09:30" or "2022/04/01"
+    :param width: the number of characters to keep
+    :return: an array of shape (len(values), width), where separators and
+      anything that is not a digit fall outside of 0 to 9
+    """
+    if not values:
+        return numpy.zeros((0, width), dtype=numpy.int64)
+    text = numpy.char.zfill(numpy.array(values, dtype=f"U{width}"), width)
+    # Unicode arrays hold one 32 bit code point per character
+    codes = text.view(numpy.uint32).reshape(-1, width).astype(numpy.int64)
+    return codes - ord("0")
+
+
+def parse_times(numpy: Any, values: list[str]) -> tuple[Any, Any]:
+    """
+    Parse "HH:MM" strings
+    :param numpy: the numpy module
+    :param values: times in the configured time format
+    :return: minutes after midnight and whether each time was valid
+    """
+    digits = _digits(numpy, values, 5)
+    numbers = digits[:, [0, 1, 3, 4]]
+    valid = ((numbers >= 0) & (numbers <= 9)).all(axis=1)
+    valid &= digits[:, 2] == ord(":") - ord("0")
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 3] * 10 + digits[:, 4]
+    valid &= (hours < 24) & (minutes < 60)
+    return numpy.where(valid, hours * 60 + minutes, 0), valid
+
+
+def parse_dates(numpy: Any, values: list[str]) -> tuple[Any, Any]:
+    """
+    Parse "YYYY/MM/DD" strings
+    :param numpy: the numpy module
+    :param values: dates in the configured date format
+    :return: the dates as datetime64 days and whether each date was valid
+    """
+    digits = _digits(numpy, values, 10)
+    numbers = digits[:, [0, 1, 2, 3, 5, 6, 8, 9]]
+    valid = ((numbers >= 0) & (numbers <= 9)).all(axis=1)
+    valid &= (digits[:, 4] == ord("/") - ord("0")) & (digits[:, 7] == digits[:, 4])
+    scale = numpy.array([1000, 100, 10, 1])
+    year = numbers[:, :4] @ scale
+    month = numbers[:, 4] * 10 + numbers[:, 5]
+    day = numbers[:, 6] * 10 + numbers[:, 7]
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    year, month, day = (numpy.where(valid, part, 1) for part in (year, month, day))
+    dates = (year - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+    dates = dates + (month - 1).astype("timedelta64[M]")
+    dates = dates.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+    return dates, valid
+
+
+class HoursTable:
+    """
+    Hours detail records held as one array per field
+    """
+
+    def __init__(
+        self, member_ids: Any, events: Any, dates: Any, minutes: Any, done: Any
+    ):
+        self.member_ids = member_ids
+        self.events = events
+        self.dates = dates
+        self.minutes = minutes
+        self.done = done
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[dict]) -> "HoursTable":
+        """
+        Load pages of hours detail records with fields named by ID
+        :param pages: pages of records keyed by record ID
+        :return: a table of the records with a valid date
+        """
+        numpy = load_numpy()
+        columns: dict[int, list[str]] = {
+            field: []
+            for field in (
+                Hours.NEW_MEMBERSHIP_ID,
+                Hours.EVENT_NAME,
+                Hours.DATE,
+                Hours.START_TIME,
+                Hours.END_TIME,
+            )
+        }
+        for page in pages:
+            rows = list(page.values())
+            for field, column in columns.items():
+                key = str(field)
+                column.extend([str(row.get(key) or "") for row in rows])
+        dates, dated = parse_dates(numpy, columns[Hours.DATE])
+        start, started = parse_times(numpy, columns[Hours.START_TIME])
+        end, ended = parse_times(numpy, columns[Hours.END_TIME])
+        done = started & ended
+        # A shift that ends before it starts ran past midnight
+        minutes = numpy.where(done, (end - start) % MINUTES_PER_DAY, 0)
+        return cls(
+            numpy.array(columns[Hours.NEW_MEMBERSHIP_ID], dtype=str)[dated],
+            numpy.array(columns[Hours.EVENT_NAME], dtype=str)[dated],
+            dates[dated],
+            minutes[dated],
+            done[dated],
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def keys(self, group: str) -> Any:
+        """
+        Get the column to group records by
+        :param group: one of "member", "event", "date" or "month"
+        :return: an array with one key per record
+        """
+        if group == "member":
+            return self.member_ids
+        if group == "event":
+            return self.events
+        if group == "date":
+            return self.dates
+        if group == "month":
+            return self.dates.astype("datetime64[M]")
+        raise ReportError(f"Cannot group by {group}, use one of {', '.join(GROUPS)}")
+
+    @staticmethod
+    def labels(numpy: Any, groups: Any) -> list[str]:
+        """
+        Format the distinct keys of a grouping
+        :param numpy: the numpy module
+        :param groups: the distinct keys
+        :return: the keys as strings, with dates in the configured format
+        """
+        if groups.dtype.kind == "M":
+            groups = numpy.datetime_as_string(groups)
+            return [group.replace("-", "/") for group in groups.tolist()]
+        return groups.tolist()
+
+    def totals(self, group: str) -> list[dict]:
+        """
+        Add up the hours of every group, largest first
+        :param group: one of "member", "event", "date" or "month"
+        :return: the hours, completed shifts and open shifts of each group
+        """
+        numpy = load_numpy()
+        keys = self.keys(group)
+        if not len(keys):  # pylint: disable=C1802
+            return []
+        groups, inverse = numpy.unique(keys, return_inverse=True)
+        size = len(groups)
+        minutes = numpy.bincount(inverse, weights=self.minutes, minlength=size)
+        shifts = numpy.bincount(inverse, weights=self.done, minlength=size)
+        records = numpy.bincount(inverse, minlength=size)
+        order = numpy.lexsort((groups, -minutes))
+        labels = self.labels(numpy, groups)
+        return [
+            {
+                group: labels[index],
+                "hours": round(float(minutes[index]) / 60, 2),
+                "shifts": int(shifts[index]),
+                "open": int(records[index] - shifts[index]),
+            }
+            for index in order
+        ]
+
+    def summary(self) -> dict:
+        """
+        Add up the hours of every record
+        :return: the hours, completed shifts and open shifts of the table
+        """
+        shifts = int(self.done.sum())
+        return {
+            "hours": round(float(self.minutes.sum()) / 60, 2),
+            "shifts": shifts,
+            "open": len(self) - shifts,
+        }
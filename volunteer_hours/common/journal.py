@@ -0,0 +1,263 @@
+"""
+A durable local journal of clock events waiting to be written to Ragic
+"""
+import sqlite3
+from threading import Event, Lock
+from time import time
+from typing import Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.common.records import HoursDetail
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    action TEXT NOT NULL,
+    member_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    record_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0
+)
+"""
+INDEX = (
+    "CREATE INDEX IF NOT EXISTS journal_member_event_date "
+    "ON journal (member_id, event_id, date)"
+)
+
+
+class Journal(metaclass=ThreadSafeMeta):
+    """
+    A global SQLite journal in WAL mode, shared by every worker on the host,
+      each entry is keyed so that replaying it twice has no extra effect
+    """
+
+    CLOCK_IN = "in"
+    CLOCK_OUT = "out"
+
+    def __init__(self):
+        path = Config.config_dir() / Config.journal_name()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__lock = Lock()
+        self.__conn = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self.__conn.row_factory = sqlite3.Row
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute("PRAGMA synchronous=NORMAL")
+        self.__conn.execute(SCHEMA)
+        self.__conn.execute(INDEX)
+        self.wake = Event()
+
+    @staticmethod
+    def entry_key(action: str, member_id: str, event_id: int, date: str) -> str:
+        """
+        Build the idempotency key of a clock event
+        :param action: either CLOCK_IN or CLOCK_OUT
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the clock event
+        :return: a key that is unique per member, event, date and action
+        """
+        return f"{action}:{member_id}:{event_id}:{date}"
+
+    def record(
+        self,
+        action: str,
+        member_id: str,
+        event_id: int,
+        date: str,
+        clock_time: str,
+        record_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Durably record a clock event and wake the flusher
+        :param action: either CLOCK_IN or CLOCK_OUT
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the clock event
+        :param clock_time: the time of the clock event
+        :param record_id: the hours detail record to clock out of, if known
+        :return: False if the same event was already recorded, entries that
+          were abandoned are recorded afresh
+        """
+        key = self.entry_key(action, member_id, event_id, date)
+        with self.__lock:
+            cursor = self.__conn.execute(
+                "INSERT INTO journal "
+                "(key, action, member_id, event_id, date, time, record_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET time = excluded.time, "
+                "record_id = excluded.record_id, attempts = 0, lease_until = 0, "
+                "done = 0 WHERE journal.done = -1",
+                (key, action, member_id, str(event_id), date, clock_time, record_id),
+            )
+        self.wake.set()
+        return cursor.rowcount == 1
+
+    def recorded(
+        self, member_id: str, event_id: int, date: str
+    ) -> Optional[HoursDetail]:
+        """
+        Describe the clock events recorded by any worker on the host in the
+          same shape as an hours detail record
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the clock events
+        :return: the status and start time, or None if nothing was recorded
+        """
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT action, time FROM journal "
+                "WHERE member_id = ? AND event_id = ? AND date = ? AND done >= 0",
+                (member_id, str(event_id), date),
+            ).fetchall()
+        actions = {row["action"]: row["time"] for row in rows}
+        if self.CLOCK_OUT in actions:
+            return HoursDetail("Completed", None)
+        if self.CLOCK_IN in actions:
+            return HoursDetail("", actions[self.CLOCK_IN])
+        return None
+
+    def pending_clock_ins(self, event_id: int, date: str) -> list[str]:
+        """
+        Find the members of an event whose clock in is not written to Ragic
+          yet and who have no clock out recorded
+        :param event_id: the ID of the event
+        :param date: the date of the clock ins
+        :return: the member IDs in the order they were recorded
+        """
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT member_id FROM journal AS entry "
+                "WHERE event_id = ? AND date = ? AND action = ? AND done = 0 "
+                "AND NOT EXISTS (SELECT 1 FROM journal WHERE "
+                "member_id = entry.member_id AND event_id = entry.event_id AND "
+                "date = entry.date AND action = ? AND done >= 0) ORDER BY id",
+                (str(event_id), date, self.CLOCK_IN, self.CLOCK_OUT),
+            ).fetchall()
+        return [row["member_id"] for row in rows]
+
+    def claim(self, limit: int, lease: float) -> list[sqlite3.Row]:
+        """
+        Lease the oldest unfinished entries so no other worker replays them
+        :param limit: the maximum number of entries to claim
+        :param lease: how long the claim lasts in seconds
+        :return: the claimed entries in the order they were recorded
+        """
+        now = time()
+        with self.__lock:
+            self.__conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.__conn.execute(
+                    "SELECT * FROM journal WHERE done = 0 AND lease_until < ? "
+                    "ORDER BY id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                self.__conn.executemany(
+                    "UPDATE journal SET lease_until = ? WHERE id = ?",
+                    [(now + lease, row["id"]) for row in rows],
+                )
+                self.__conn.execute("COMMIT")
+            except sqlite3.Error:
+                self.__conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def clock_in_record(
+        self, member_id: str, event_id: str, date: str
+    ) -> Optional[str]:
+        """
+        Find the Ragic record created by a flushed clock in
+        :param member_id: the associated member ID
+        :param event_id: the ID of the selected event
+        :param date: the date of the clock in
+        :return: the record ID, or None if the clock in is not flushed yet
+        """
+        key = self.entry_key(self.CLOCK_IN, member_id, event_id, date)
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT record_id FROM journal WHERE key = ? AND done = 1", (key,)
+            ).fetchone()
+        return row["record_id"] if row else None
+
+    def complete(self, entry_id: int, record_id: Optional[str]) -> None:
+        """
+        Mark an entry as written to Ragic
+        :param entry_id: the journal entry
+        :param record_id: the Ragic record the entry was written to
+        :return: None
+        """
+        with self.__lock:
+            self.__conn.execute(
+                "UPDATE journal SET done = 1, record_id = ? WHERE id = ?",
+                (record_id, entry_id),
+            )
+
+    def fail(self, entry_id: int, retry_after: float) -> None:
+        """
+        Count a failed attempt and hold the entry back before the next one
+        :param entry_id: the journal entry
+        :param retry_after: how long to wait before retrying in seconds
+        :return: None
+        """
+        with self.__lock:
+            self.__conn.execute(
+                "UPDATE journal SET attempts = attempts + 1, lease_until = ? "
+                "WHERE id = ?",
+                (time() + retry_after, entry_id),
+            )
+
+    def abandon(self, entry_id: int) -> None:
+        """
+        Stop retrying an entry that cannot be written to Ragic
+        :param entry_id: the journal entry
+        :return: None
+        """
+        with self.__lock:
+            self.__conn.execute(
+                "UPDATE journal SET done = -1 WHERE id = ?", (entry_id,)
+            )
+
+    def prune(self, before: str) -> int:
+        """
+        Delete the entries written to Ragic before a day, abandoned entries
+          are kept so that they can be looked into
+        :param before: the first date to keep
+        :return: the number of entries deleted
+        """
+        with self.__lock:
+            cursor = self.__conn.execute(
+                "DELETE FROM journal WHERE done = 1 AND date < ?", (before,)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        """
+        Count the entries waiting to be written to Ragic and those abandoned
+        :return: the number of entries keyed by "pending" and "abandoned"
+        """
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT done, COUNT(*) AS entries FROM journal "
+                "WHERE done <= 0 GROUP BY done"
+            ).fetchall()
+        counts = {row["done"]: row["entries"] for row in rows}
+        return {"pending": counts.get(0, 0), "abandoned": counts.get(-1, 0)}
+
+    def abandoned(self) -> list[dict]:
+        """
+        List the entries that were given up on, which need to be entered in
+          Ragic by hand or scanned again
+        :return: the entries in the order they were recorded
+        """
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT key, action, member_id, event_id, date, time, record_id, "
+                "attempts FROM journal WHERE done = -1 ORDER BY id"
+            ).fetchall()
+        return [dict(row) for row in rows]
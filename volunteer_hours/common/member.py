@@ -1,10 +1,19 @@
 """
 Define class for member
 """
+import asyncio
+from typing import TYPE_CHECKING
+
 from volunteer_hours import Config
 from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.common.cache import MemberCache
+from volunteer_hours.common.fanout import FanOut, FanOutError
+from volunteer_hours.common.records import EventInfo
 from volunteer_hours.logger.pkg_logger import Logger
 
+if TYPE_CHECKING:
+    from volunteer_hours.api.async_ragic import AsyncRagic
+
 
 class Member:
     """
@@ -15,6 +24,25 @@ class Member:
         self._member_id: str = ""
         self._events: dict[str, int] = {}
 
+    @classmethod
+    def from_dict(cls, state: dict) -> "Member":
+        """
+        Restore a member from its serialized state
+        :param state: a dictionary produced by `to_dict`
+        :return: a member with the same ID and events
+        """
+        member = cls()
+        member._member_id = state.get("member_id", "")
+        member._events = dict(state.get("events", {}))
+        return member
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the member so it can be kept in a session
+        :return: the member ID and events
+        """
+        return {"member_id": self._member_id, "events": self._events}
+
     @property
     def member_id(self) -> str:
         """
@@ -32,7 +60,7 @@ class Member:
         """
         valid_prefix = Config.member_prefix()
         if member_id.startswith(valid_prefix):
-            Logger.info(f"Setting member ID to {member_id}")
+            Logger.info("Setting member ID to %s", member_id)
             self._member_id = member_id
 
     def reset_member(self) -> None:
@@ -48,9 +76,13 @@ class Member:
         Get the first and last name of the member
         :return: the member's first and last name
         """
-        result = Ragic().get_member_info(self._member_id)
-        info = list(result.values())[0]
-        return info["Full Name"]
+        cache = MemberCache()
+        info = cache.get(self._member_id)
+        if info is None:
+            result = Ragic().get_member_info(self._member_id)
+            info = list(result.values())[0]
+            cache.put(self._member_id, info)
+        return info.name
 
     def get_event_names(self) -> list[str]:
         """
@@ -60,11 +92,55 @@ class Member:
         if not self._member_id:
             return []
 
-        events = Ragic().fetch_events(self._member_id)
+        events = Ragic().roster_events(self._member_id)
+        return self._store_events(events)
+
+    def _store_events(self, events: dict[str, EventInfo]) -> list[str]:
+        """
+        Remember the event IDs of the member's events
+        :param events: events keyed by record ID
+        :return: a list of events
+        """
         for event in events.values():
-            self._events[event["Opportunity"]] = event["Event ID"]
+            self._events[event.name] = event.event_id
         return list(self._events.keys())
 
+    def get_profile(self) -> tuple[str, list[str]]:
+        """
+        Look up the member's name and events concurrently
+        :raises FanOutError: if either lookup fails or times out
+        :return: the member's name and a list of events
+        """
+        name, events = FanOut().run(self.get_member_name, self.get_event_names)
+        return name, events
+
+    async def get_profile_async(self, ragic: "AsyncRagic") -> tuple[str, list[str]]:
+        """
+        Look up the member's name and events concurrently on the event loop
+        :param ragic: an async Ragic client
+        :raises FanOutError: if either lookup fails or times out
+        :return: the member's name and a list of events
+        """
+        cache = MemberCache()
+        info = cache.get(self._member_id)
+        lookups = [ragic.roster_events(self._member_id)]
+        if info is None:
+            lookups.append(ragic.get_member_info(self._member_id))
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*lookups), timeout=Config.lookup_timeout()
+            )
+        except asyncio.TimeoutError as error:
+            Logger.error("Member lookups timed out")
+            raise FanOutError("Lookup timed out") from error
+        except Exception as error:  # pylint: disable=broad-except
+            Logger.error("Lookup failed: %r", error)
+            raise FanOutError("Lookup failed") from error
+        if info is None:
+            info = list(results[1].values())[0]
+            cache.put(self._member_id, info)
+        return info.name, self._store_events(results[0])
+
     def get_event_id(self, event_name: str) -> int:
         """
         Find the event ID corresponding to the event name
@@ -0,0 +1,279 @@
+"""
+In-process metrics exposed in the Prometheus text format
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Iterator
+
+from volunteer_hours import ThreadSafeMeta
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    """
+    Escape a label value for the text format
+    :param value: the label value
+    :return: the escaped value
+    """
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return text.replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    """
+    Format label pairs for an exposition line
+    :param names: the label names
+    :param values: the label values in the same order
+    :param extra: an already formatted label to append
+    :return: the labels in braces, or an empty string without labels
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    A named family of time series split by label values
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series: dict[tuple, object] = {}
+        self._lock = Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def header(self) -> list[str]:
+        """
+        Build the HELP and TYPE lines of the metric
+        :return: exposition lines
+        """
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def render(self) -> list[str]:
+        """
+        Build the exposition lines of every series
+        :return: exposition lines
+        """
+        with self._lock:
+            series = dict(self._series)
+        lines = self.header()
+        for key, value in sorted(series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    A value that only goes up
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increase the counter
+        :param amount: how much to add
+        :param labels: label values of the series
+        :return: None
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down
+    """
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increase the gauge
+        :param amount: how much to add
+        :param labels: label values of the series
+        :return: None
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        """
+        Decrease the gauge
+        :param amount: how much to subtract
+        :param labels: label values of the series
+        :return: None
+        """
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        """
+        Set the gauge
+        :param value: the new value
+        :param labels: label values of the series
+        :return: None
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(Metric):
+    """
+    A distribution of observed values in cumulative buckets
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record an observation
+        :param value: the observed value
+        :param labels: label values of the series
+        :return: None
+        """
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observe how long the body of a with statement takes in seconds
+        :param labels: label values of the series
+        """
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = {
+                key: (list(value[0]), value[1], value[2])
+                for key, value in self._series.items()
+            }
+        lines = self.header()
+        for key, (counts, total, number) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                labels = _format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {number}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {number}")
+        return lines
+
+
+class Metrics(metaclass=ThreadSafeMeta):
+    """
+    The global registry of the application's metrics
+    """
+
+    def __init__(self):
+        self.http_latency = Histogram(
+            "http_request_duration_seconds",
+            "Latency of Flask requests",
+            ("route", "method"),
+        )
+        self.http_requests = Counter(
+            "http_requests_total",
+            "Flask requests by status code",
+            ("route", "method", "status"),
+        )
+        self.http_in_flight = Gauge(
+            "http_requests_in_flight", "Flask requests being served"
+        )
+        self.ragic_latency = Histogram(
+            "ragic_request_duration_seconds",
+            "Latency of calls to the Ragic API",
+            ("route", "method"),
+        )
+        self.ragic_requests = Counter(
+            "ragic_requests_total",
+            "Calls to the Ragic API by status code",
+            ("route", "method", "status"),
+        )
+        self.ragic_in_flight = Gauge(
+            "ragic_requests_in_flight",
+            "Calls to the Ragic API in progress",
+            ("method",),
+        )
+        self.ragic_coalesced = Counter(
+            "ragic_coalesced_total",
+            "Calls to the Ragic API answered by an identical call in flight",
+            ("method",),
+        )
+        self.ragic_retries = Counter(
+            "ragic_retries_total", "Retried calls to the Ragic API", ("method",)
+        )
+        self.ragic_breaker_state = Gauge(
+            "ragic_circuit_breaker_state",
+            "State of the circuit to Ragic, 0 closed, 1 half open and 2 open",
+        )
+        self.ragic_breaker_rejections = Counter(
+            "ragic_circuit_breaker_rejections_total",
+            "Calls to the Ragic API refused while the circuit is open",
+        )
+        self.journal_entries = Gauge(
+            "journal_entries",
+            "Clock events in the journal by state, pending or abandoned",
+            ("state",),
+        )
+        self.log_records_dropped = Counter(
+            "log_records_dropped_total",
+            "Log records dropped because the logging queue was full",
+        )
+        self.log_hours_phase = Histogram(
+            "log_hours_phase_duration_seconds",
+            "Time spent in each phase of logging hours",
+            ("phase",),
+        )
+
+    def render(self) -> str:
+        """
+        Build the Prometheus text exposition of every metric
+        :return: the exposition text
+        """
+        lines: list[str] = []
+        for metric in vars(self).values():
+            if isinstance(metric, Metric):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
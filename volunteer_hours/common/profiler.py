@@ -0,0 +1,89 @@
+"""
+Profile requests on demand and keep the profiles of slow ones
+"""
+import cProfile
+import re
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.common.rate_limit import RateLimiter
+from volunteer_hours.logger.pkg_logger import Logger
+
+UNSAFE = re.compile(r"[^A-Za-z0-9]+")
+
+
+class RequestProfiler(metaclass=ThreadSafeMeta):
+    """
+    A global profiler that samples requests when PROFILE is on, at most
+      PROFILE_RATE per second and one at a time, and keeps the profiles of
+      those slower than PROFILE_THRESHOLD, requests can also ask to be
+      profiled, in which case the profile is always kept
+    """
+
+    def __init__(self):
+        self.__sampling = RateLimiter(Config.profile_rate())
+        self.__active = Lock()
+
+    def start(self, requested: bool = False) -> Optional[cProfile.Profile]:
+        """
+        Start profiling the current request if it is sampled or requested
+        :param requested: whether the request asked to be profiled
+        :return: the running profiler, or None if the request is not profiled
+        """
+        if not requested and not (Config.profile() and self.__sampling.try_acquire()):
+            return None
+        # Only one profiler can run at a time, skip requests that overlap it
+        if not self.__active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            self.__active.release()
+            return None
+        return profile
+
+    def finish(
+        self, profile: cProfile.Profile, route: str, elapsed: float, requested: bool
+    ) -> Optional[Path]:
+        """
+        Stop profiling a request and write its profile if it was slow enough
+        :param profile: the profiler returned by `start`
+        :param route: the route of the request
+        :param elapsed: the latency of the request in seconds
+        :param requested: whether the request asked to be profiled
+        :return: the profile file, or None if the profile was dropped
+        """
+        profile.disable()
+        self.__active.release()
+        milliseconds = elapsed * 1000
+        if not requested and milliseconds < Config.profile_threshold():
+            return None
+        if Config.profile_keep() <= 0:
+            Logger.info("Not keeping the profile of %s, PROFILE_KEEP is 0", route)
+            return None
+        directory = Config.profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        name = UNSAFE.sub("-", route).strip("-") or "root"
+        path = directory / f"{stamp}-{name}-{milliseconds:.0f}ms.prof"
+        profile.dump_stats(str(path))
+        Logger.info("Profiled %s in %.0f ms to %s", route, milliseconds, path)
+        self.__prune(directory)
+        return path
+
+    @staticmethod
+    def __prune(directory: Path) -> None:
+        """
+        Delete all but the most recent profiles
+        :param directory: the profile directory
+        :return: None
+        """
+        profiles = sorted(directory.glob("*.prof"))
+        # A negative slice end would keep everything with PROFILE_KEEP=0
+        stale = max(len(profiles) - Config.profile_keep(), 0)
+        for path in profiles[:stale]:
+            path.unlink(missing_ok=True)
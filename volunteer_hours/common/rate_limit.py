@@ -0,0 +1,60 @@
+"""
+Space out calls to stay under a rate limit
+"""
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket that lets through at most `rate` calls per
+      second on average, and bursts of up to `burst` calls at once
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def __refill(self) -> None:
+        """
+        Add the tokens earned since the last call, the caller holds the lock
+        :return: None
+        """
+        now = monotonic()
+        elapsed = now - self._updated
+        self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """
+        Take a call if one is allowed right now, without waiting
+        :return: True if the call is allowed
+        """
+        if self._rate <= 0:
+            return True
+        with self._lock:
+            self.__refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self) -> float:
+        """
+        Wait until a call is allowed, callers are let through in the order
+          they arrive
+        :return: the number of seconds waited
+        """
+        if self._rate <= 0:
+            return 0.0
+        with self._lock:
+            self.__refill()
+            # Take a token now and wait for it to be earned if there was none
+            self._tokens -= 1
+            delay = max(0.0, -self._tokens / self._rate)
+        if delay:
+            sleep(delay)
+        return delay
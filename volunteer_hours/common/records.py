@@ -0,0 +1,140 @@
+"""
+Compact records decoded from Ragic responses
+"""
+from abc import ABC, abstractmethod
+from typing import Optional, TypeVar
+
+from volunteer_hours.common.enums import Hours
+
+RecordT = TypeVar("RecordT", bound="Record")
+
+
+class Record(ABC):
+    """
+    A Ragic record reduced to the fields the app reads, with `__slots__` so
+      that the caches and indexes holding many of them stay small
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    @abstractmethod
+    def from_row(cls: type[RecordT], row: dict) -> RecordT:
+        """
+        Decode a record from a row in a Ragic response
+        :param row: the fields of the record
+        :return: the record
+        """
+
+    @classmethod
+    def from_page(cls: type[RecordT], page: dict) -> dict[str, RecordT]:
+        """
+        Decode a Ragic response
+        :param page: rows keyed by record ID
+        :return: records keyed by record ID
+        """
+        return {record_id: cls.from_row(row) for record_id, row in page.items()}
+
+    @classmethod
+    def from_dict(cls: type[RecordT], data: dict) -> RecordT:
+        """
+        Restore a record from its serialized state
+        :param data: a dictionary produced by `to_dict`
+        :return: the record
+        """
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the record so it can be stored outside the process
+        :return: the fields of the record keyed by name
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class MemberInfo(Record):
+    """
+    A member from the members sheet, with fields named by name
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @classmethod
+    def from_row(cls, row: dict) -> "MemberInfo":
+        return cls(str(row.get("Full Name", "")))
+
+
+class EventInfo(Record):
+    """
+    An open attendance record of a member, with fields named by name
+    """
+
+    __slots__ = ("eid", "name", "event_id")
+
+    def __init__(self, eid: str, name: str, event_id: str):
+        self.eid = eid
+        self.name = name
+        self.event_id = event_id
+
+    @classmethod
+    def from_row(cls, row: dict) -> "EventInfo":
+        return cls(
+            str(row.get("EID", "")),
+            str(row.get("Opportunity", "")),
+            str(row.get("Event ID", "")),
+        )
+
+
+class HoursDetail(Record):
+    """
+    The state of an hours detail record, with fields named by ID, a field
+      that is None is not known
+    """
+
+    __slots__ = ("status", "start_time")
+
+    def __init__(self, status: Optional[str] = "", start_time: Optional[str] = ""):
+        self.status = status
+        self.start_time = start_time
+
+    @classmethod
+    def from_row(cls, row: dict) -> "HoursDetail":
+        return cls(
+            str(row.get(str(Hours.STATUS)) or ""),
+            str(row.get(str(Hours.START_TIME)) or ""),
+        )
+
+    @property
+    def completed(self) -> bool:
+        """
+        Check whether the member has clocked out of the record
+        :return: True if the record is completed
+        """
+        return self.status == "Completed"
+
+    def merge(self, changes: Optional["HoursDetail"]) -> "HoursDetail":
+        """
+        Apply the known fields of a change to the record
+        :param changes: the change, if any
+        :return: a new record with the changed fields replaced
+        """
+        if changes is None:
+            return self
+        return HoursDetail(
+            self.status if changes.status is None else changes.status,
+            self.start_time if changes.start_time is None else changes.start_time,
+        )
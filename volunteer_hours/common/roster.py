@@ -0,0 +1,100 @@
+"""
+An in-memory roster of the open attendance records of every member
+"""
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.common.records import EventInfo
+from volunteer_hours.common.shared_cache import SharedCache
+
+
+class Roster(metaclass=ThreadSafeMeta):
+    """
+    A global index of open attendance records keyed by membership ID, loaded
+      in bulk so that looking up a member's events needs no Ragic query
+    """
+
+    def __init__(self):
+        self.__events: dict[str, dict[str, EventInfo]] = {}
+        self.__loaded_at: Optional[float] = None
+        self.__lock = Lock()
+
+    def age(self) -> Optional[float]:
+        """
+        Get the time since the roster was loaded
+        :return: the age of the roster in seconds, or None if never loaded
+        """
+        if self.__loaded_at is None:
+            return None
+        return monotonic() - self.__loaded_at
+
+    def load(self, events: dict[str, dict[str, EventInfo]], age: float = 0.0) -> None:
+        """
+        Replace the roster
+        :param events: attendance records keyed by membership ID and record ID
+        :param age: how long ago the records were read from Ragic in seconds
+        :return: None
+        """
+        with self.__lock:
+            self.__events = events
+            self.__loaded_at = monotonic() - age
+
+    def share(self) -> None:
+        """
+        Store the roster in the shared cache for the other workers
+        :return: None
+        """
+        if not Config.shared_cache():
+            return
+        with self.__lock:
+            events = {
+                member_id: {
+                    record_id: event.to_dict() for record_id, event in records.items()
+                }
+                for member_id, records in self.__events.items()
+            }
+        SharedCache().put("roster", "open", events, Config.roster_max_age())
+
+    def restore(self, max_age: float) -> bool:
+        """
+        Load the roster from the shared cache if another worker loaded it
+          more recently than this one
+        :param max_age: the oldest roster to take in seconds
+        :return: True if the roster was restored
+        """
+        if not Config.shared_cache():
+            return False
+        entry = SharedCache().get_with_age("roster", "open")
+        if entry is None:
+            return False
+        data, shared_age = entry
+        age = self.age()
+        if shared_age >= max_age or (age is not None and age <= shared_age):
+            return False
+        events = {
+            member_id: {
+                record_id: EventInfo.from_dict(event)
+                for record_id, event in records.items()
+            }
+            for member_id, records in data.items()
+        }
+        self.load(events, shared_age)
+        return True
+
+    def lookup(self, member_id: str, max_age: float) -> Optional[dict[str, EventInfo]]:
+        """
+        Find a member's open attendance records in the same shape as Ragic
+        :param member_id: the associated member ID
+        :param max_age: the oldest roster to trust in seconds
+        :return: attendance records keyed by record ID, or None if the roster
+          is missing or stale or the member is not in it, since the member
+          may have signed up since it was loaded
+        """
+        age = self.age()
+        if age is None or age > max_age:
+            return None
+        with self.__lock:
+            events = self.__events.get(member_id)
+        return None if events is None else dict(events)
@@ -0,0 +1,169 @@
+"""
+A cache shared by every worker process on the host
+"""
+import json
+import sqlite3
+from threading import Lock
+from time import time
+from typing import Any, Optional
+
+from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.logger.pkg_logger import Logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+INDEX = "CREATE INDEX IF NOT EXISTS cache_used_at ON cache (used_at)"
+
+# Reads refresh the last use of an entry at most this often in seconds, so
+# that hot entries do not turn every read into a write
+TOUCH_INTERVAL = 60.0
+# Expired and least recently used entries are evicted every this many writes
+EVICT_EVERY = 100
+
+
+class SharedCache(metaclass=ThreadSafeMeta):
+    """
+    A global SQLite cache in WAL mode under the config directory, so that a
+      lookup by one worker warms every worker on the host and a restarted
+      worker starts warm, values are stored as JSON and any error reading or
+      writing it is treated as a miss
+    """
+
+    def __init__(self):
+        path = Config.config_dir() / Config.shared_cache_name()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__lock = Lock()
+        self.__writes = 0
+        self.__conn = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False, timeout=5
+        )
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute("PRAGMA synchronous=NORMAL")
+        self.__conn.execute(SCHEMA)
+        self.__conn.execute(INDEX)
+
+    def get_with_age(self, namespace: str, key: str) -> Optional[tuple[Any, float]]:
+        """
+        Look up a value and how long ago it was stored
+        :param namespace: the kind of value, such as "member"
+        :param key: the key to look up
+        :return: the value and its age in seconds, or None if missing or expired
+        """
+        now = time()
+        try:
+            with self.__lock:
+                row = self.__conn.execute(
+                    "SELECT value, stored_at, used_at FROM cache "
+                    "WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, key, now),
+                ).fetchone()
+                if row is not None and now - row[2] > TOUCH_INTERVAL:
+                    self.__conn.execute(
+                        "UPDATE cache SET used_at = ? WHERE namespace = ? AND key = ?",
+                        (now, namespace, key),
+                    )
+        except sqlite3.Error as error:
+            Logger.warn("Unable to read the shared cache: %s", error)
+            return None
+        if row is None:
+            return None
+        try:
+            value = json.loads(row[0])
+        except ValueError as error:
+            # A value cut short or garbled on disk is dropped and missed
+            Logger.warn(
+                "Dropping a corrupt %s/%s from the shared cache: %s",
+                namespace,
+                key,
+                error,
+            )
+            self.invalidate(namespace, key)
+            return None
+        return value, max(now - row[1], 0.0)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a value
+        :param namespace: the kind of value, such as "member"
+        :param key: the key to look up
+        :return: the value, or None if missing or expired
+        """
+        entry = self.get_with_age(namespace, key)
+        return None if entry is None else entry[0]
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """
+        Store a value for every worker, evicting expired and least recently
+          used entries now and then to stay within the configured size
+        :param namespace: the kind of value, such as "member"
+        :param key: the key to store under
+        :param value: a value that can be serialized to JSON
+        :param ttl: how long the value stays valid in seconds
+        :return: None
+        """
+        now = time()
+        data = json.dumps(value, separators=(",", ":"))
+        try:
+            with self.__lock:
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, data, now, now + ttl, now),
+                )
+                self.__writes += 1
+                if self.__writes % EVICT_EVERY == 0:
+                    self.__evict(now)
+        except sqlite3.Error as error:
+            Logger.warn("Unable to write to the shared cache: %s", error)
+
+    def __evict(self, now: float) -> None:
+        """
+        Remove expired entries, then the least recently used ones beyond the
+          configured size, the caller holds the lock
+        :param now: the current time
+        :return: None
+        """
+        self.__conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        self.__conn.execute(
+            "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache "
+            "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (Config.shared_cache_size(),),
+        )
+
+    def invalidate(self, namespace: str, key: str) -> None:
+        """
+        Remove a single entry if present
+        :param namespace: the kind of value, such as "member"
+        :param key: the key to remove
+        :return: None
+        """
+        try:
+            with self.__lock:
+                self.__conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                )
+        except sqlite3.Error as error:
+            Logger.warn("Unable to write to the shared cache: %s", error)
+
+    def clear(self, namespace: str) -> None:
+        """
+        Remove every entry of a kind
+        :param namespace: the kind of value, such as "member"
+        :return: None
+        """
+        try:
+            with self.__lock:
+                self.__conn.execute(
+                    "DELETE FROM cache WHERE namespace = ?", (namespace,)
+                )
+        except sqlite3.Error as error:
+            Logger.warn("Unable to write to the shared cache: %s", error)
@@ -0,0 +1,74 @@
+"""
+Coalesce identical calls that are in flight at the same time
+"""
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+
+from volunteer_hours import ThreadSafeMeta
+
+
+class SingleFlight(metaclass=ThreadSafeMeta):
+    """
+    A global table of calls in progress, callers asking for a key that is
+      already being fetched wait for that call and share its result instead
+      of making the same call again
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__calls: dict[Hashable, Future] = {}
+
+    def claim(self, key: Hashable) -> tuple[Future, bool]:
+        """
+        Join the call in flight for a key, or become the one making it
+        :param key: identifies the call
+        :return: the future of the call, and True if the caller must make the
+          call and then pass its outcome to `settle`
+        """
+        with self.__lock:
+            future = self.__calls.get(key)
+            if future is not None:
+                return future, False
+            future = self.__calls[key] = Future()
+            return future, True
+
+    def settle(
+        self,
+        key: Hashable,
+        future: Future,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Hand the outcome of a call to everyone waiting on it
+        :param key: identifies the call
+        :param future: the future returned by `claim`
+        :param result: the result of the call
+        :param error: the exception raised by the call, if any
+        :return: None
+        """
+        with self.__lock:
+            self.__calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run(self, key: Hashable, call: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Make a call unless an identical one is in flight
+        :param key: identifies the call
+        :param call: a callable that takes no arguments
+        :return: the result, and True if it came from another caller's call
+        """
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = call()
+        except BaseException as error:
+            self.settle(key, future, error=error)
+            raise
+        self.settle(key, future, result)
+        return result, False
@@ -0,0 +1,46 @@
+"""
+A fixed set of locks shared out by key
+"""
+from contextlib import contextmanager
+from threading import Lock
+from typing import Hashable, Iterator
+from zlib import crc32
+
+from volunteer_hours import ThreadSafeMeta, Config
+
+
+class StripedLock:
+    """
+    Serialize work on the same key without one global lock, keys are hashed
+      onto a fixed number of locks so unrelated keys rarely wait on each other
+    """
+
+    def __init__(self, stripes: int):
+        self._locks = tuple(Lock() for _ in range(max(stripes, 1)))
+
+    def lock_for(self, key: Hashable) -> Lock:
+        """
+        Get the lock that guards a key
+        :param key: the key to guard
+        :return: the same lock every time for the same key
+        """
+        return self._locks[crc32(str(key).encode()) % len(self._locks)]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        """
+        Hold the lock of a key for the body of a with statement
+        :param key: the key to guard
+        """
+        with self.lock_for(key):
+            yield
+
+
+class MemberLocks(StripedLock, metaclass=ThreadSafeMeta):
+    """
+    The global locks that keep concurrent clock ins and outs of the same
+      member from racing each other
+    """
+
+    def __init__(self):
+        super().__init__(Config.member_lock_stripes())
@@ -1,51 +1,181 @@
 """
 A helper file for retrieving current date and time in the configured timezone.
 """
-from datetime import datetime, date, time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime, time, timezone, tzinfo
+from threading import Lock
+from typing import Callable, Iterator, Optional
 
-from pytz import timezone, tzinfo
+from volunteer_hours import Config, ThreadSafeMeta
 
-from volunteer_hours import Config
 
+def utc_now() -> datetime:
+    """
+    Read the wall clock
+    :return: the time now in UTC
+    """
+    return datetime.now(timezone.utc)
+
+
+class Moment:
+    """
+    A snapshot of the time in the configured timezone, its date and time are
+      formatted the first time they are read
+    """
+
+    __slots__ = ("local", "__today", "__now")
+
+    def __init__(self, local: datetime):
+        self.local = local
+        self.__today: Optional[str] = None
+        self.__now: Optional[str] = None
+
+    @property
+    def today(self) -> str:
+        """
+        Getter for the date of the snapshot in string format
+        :return: the date in the configured date format
+        """
+        if self.__today is None:
+            self.__today = self.local.strftime(Config.date_format())
+        return self.__today
+
+    @property
+    def now(self) -> str:
+        """
+        Getter for the time of the snapshot in string format
+        :return: the time in the configured time format
+        """
+        if self.__now is None:
+            self.__now = self.local.strftime(Config.time_format())
+        return self.__now
 
-class LocalTime:
+
+class PinnedMoment:
     """
-    A wrapper for the datetime module
+    A snapshot pinned to a context, taken the first time it is read so that
+      requests that never read the time do not pay for it
+    """
+
+    __slots__ = ("__take", "__moment", "__lock")
+
+    def __init__(self, take: Callable[[], Moment]):
+        self.__take = take
+        self.__moment: Optional[Moment] = None
+        self.__lock = Lock()
+
+    def get(self) -> Moment:
+        """
+        Get the snapshot, taking it on first use, threads that share the
+          context all see the same one
+        :return: the pinned snapshot
+        """
+        if self.__moment is None:
+            with self.__lock:
+                if self.__moment is None:
+                    self.__moment = self.__take()
+        return self.__moment
+
+
+class Clock(metaclass=ThreadSafeMeta):
+    """
+    The global source of the current date and time, a request can pin one
+      snapshot so that every call made while serving it sees the same time
     """
 
     def __init__(self):
-        self.__timezone = timezone(Config.timezone_name())
+        self.__timezone: Optional[tzinfo] = None
+        self.__source: Callable[[], datetime] = utc_now
+        self.__pinned: ContextVar[Optional[PinnedMoment]] = ContextVar(
+            "moment", default=None
+        )
 
     @property
     def timezone(self) -> tzinfo:
         """
-        Getter for timezone object
+        Getter for timezone object, built once per process
         :return: a timezone object with the configured timezone
         """
+        if self.__timezone is None:
+            # pylint: disable=import-outside-toplevel
+            from pytz import timezone as load_timezone
+
+            self.__timezone = load_timezone(Config.timezone_name())
         return self.__timezone
 
+    def set_source(self, source: Optional[Callable[[], datetime]]) -> None:
+        """
+        Replace the wall clock, e.g. with a fixed time in tests and benchmarks
+        :param source: a function returning an aware datetime, or None to
+          go back to the wall clock
+        :return: None
+        """
+        self.__source = source or utc_now
+
+    def snapshot(self) -> Moment:
+        """
+        Take a new snapshot of the time, ignoring any pinned snapshot
+        :return: the time now in the configured timezone
+        """
+        return Moment(self.__source().astimezone(self.timezone))
+
+    def moment(self) -> Moment:
+        """
+        Get the pinned snapshot, or a new one when nothing is pinned
+        :return: the current time in the configured timezone
+        """
+        pinned = self.__pinned.get()
+        return self.snapshot() if pinned is None else pinned.get()
+
+    def pin(self) -> Token:
+        """
+        Pin a snapshot to the current context, taken when first read
+        :return: a token to pass to unpin
+        """
+        return self.__pinned.set(PinnedMoment(self.snapshot))
+
+    def unpin(self, token: Token) -> None:
+        """
+        Restore the snapshot that was pinned before pin was called
+        :param token: the token returned by pin
+        :return: None
+        """
+        self.__pinned.reset(token)
+
+    @contextmanager
+    def frozen(self) -> Iterator[Moment]:
+        """
+        Pin a snapshot for the body of a with statement
+        :return: the pinned snapshot
+        """
+        token = self.pin()
+        try:
+            yield self.moment()
+        finally:
+            self.unpin(token)
+
     def today(self) -> str:
         """
         Get today's date in string format
         :return: today's date in the configured timezone
         """
-        local_datetime = datetime.today().astimezone(self.timezone)
-        return local_datetime.strftime(Config.date_format())
+        return self.moment().today
 
     def now(self) -> str:
         """
         Get the time now in string format
         :return: time now in the configured timezone
         """
-        local_time = datetime.today().astimezone(self.timezone)
-        return local_time.strftime(Config.time_format())
+        return self.moment().now
 
     def delta_minutes(self, before: str) -> int:
         """
-        Get the time difference from before to now
+        Get the time difference from before today to now
         :param before: a time string in ISO format
-        :return: time difference in minutes
+        :return: time difference in minutes, negative if before is later
         """
-        start_time = datetime.combine(date.today(), time.fromisoformat(before))
-        end_time = datetime.today().astimezone(self.timezone)
-        return (end_time.replace(tzinfo=None) - start_time).seconds // 60
+        moment = self.moment()
+        start_time = datetime.combine(moment.local.date(), time.fromisoformat(before))
+        start_time = self.timezone.localize(start_time)
+        return int((moment.local - start_time).total_seconds() // 60)
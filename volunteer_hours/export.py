@@ -0,0 +1,244 @@
+"""
+Stream the records of a Ragic sheet to a CSV or columnar file
+
+Pages through the sheet with limit/offset and writes each page as it
+arrives, so memory use does not grow with the sheet. Progress is saved next
+to the output after every page, and --resume picks an interrupted export up
+from the last page that was written.
+
+    python -m volunteer_hours.export hours hours.csv \
+        --where 1003908,gte,2022/01/01 --where 1003908,lte,2022/12/31
+    python -m volunteer_hours.export attendance attendance.jsonl \
+        --format columns --resume
+"""
+import csv
+import json
+import os
+import sys
+from argparse import ArgumentParser, Namespace
+from io import TextIOWrapper
+from pathlib import Path
+from typing import Any, Callable, Optional, TextIO
+
+import requests
+
+from volunteer_hours import Config
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.logger.pkg_logger import Logger
+
+SHEETS: dict[str, Callable[[], str]] = {
+    "hours": Config.ragic_hours_detail,
+    "attendance": Config.ragic_attendance_route,
+    "members": Config.ragic_members_route,
+}
+FORMATS = ("csv", "columns")
+
+
+class ExportError(Exception):
+    """
+    Raised when an export cannot continue
+    """
+
+
+def fields_of(page: dict) -> list[str]:
+    """
+    Get the field names of a page of records in the order they first appear,
+      leaving out Ragic's own fields such as _ragicId and subtables
+    :param page: records keyed by record ID
+    :return: the field names
+    """
+    fields: dict[str, None] = {}
+    for row in page.values():
+        fields.update(dict.fromkeys(key for key in row if not key.startswith("_")))
+    return list(fields)
+
+
+def cell(value: Any) -> str:
+    """
+    Format a value for a CSV cell
+    :param value: a field value from Ragic
+    :return: the value as text, with lists in JSON
+    """
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else str(value)
+
+
+def write_csv(output: TextIO, page: dict, state: dict) -> None:
+    """
+    Append a page of records to a CSV file, the columns are fixed by the
+      first page and written once as the header
+    :param output: the open output file
+    :param page: records keyed by record ID
+    :param state: the export state, holding the columns
+    :return: None
+    """
+    writer = csv.writer(output)
+    if state["fields"] is None:
+        state["fields"] = fields_of(page)
+        writer.writerow(["record_id"] + state["fields"])
+    fields = state["fields"]
+    writer.writerows(
+        [record_id] + [cell(row.get(field)) for field in fields]
+        for record_id, row in page.items()
+    )
+
+
+def write_columns(output: TextIO, page: dict, state: dict) -> None:
+    """
+    Append a page of records to a columnar file, one JSON line per page with
+      a list of values for each field, so field names are not repeated
+    :param output: the open output file
+    :param page: records keyed by record ID
+    :param state: the export state, holding the offset of the page
+    :return: None
+    """
+    fields = fields_of(page)
+    rows = list(page.values())
+    chunk = {
+        "offset": state["offset"],
+        "ids": list(page),
+        "columns": {field: [row.get(field) for row in rows] for field in fields},
+    }
+    output.write(json.dumps(chunk, ensure_ascii=False, separators=(",", ":")))
+    output.write("\n")
+
+
+WRITERS: dict[str, Callable[[TextIO, dict, dict], None]] = {
+    "csv": write_csv,
+    "columns": write_columns,
+}
+
+
+def load_state(path: Path, output: Path, job: dict, resume: bool) -> dict:
+    """
+    Get the progress of an export
+    :param path: the state file of the export
+    :param output: the output file of the export
+    :param job: the route, conditions and format of the export
+    :param resume: whether to continue from the saved progress
+    :return: the saved progress, or a fresh start
+    """
+    fresh = {**job, "offset": 0, "bytes": 0, "rows": 0, "fields": None}
+    if not resume:
+        return fresh
+    if not path.exists():
+        Logger.warn("Nothing to resume at %s, starting over", path)
+        return fresh
+    state = json.loads(path.read_text(encoding="utf-8"))
+    if any(state.get(key) != value for key, value in job.items()):
+        raise ExportError(f"{path} is for a different sheet, filter or format")
+    # The pages saved so far must still be in the output to append to it
+    if not output.exists() or output.stat().st_size < state["bytes"]:
+        Logger.warn("%s is missing or cut short, starting over", output)
+        return fresh
+    return state
+
+
+def save_state(path: Path, state: dict) -> None:
+    """
+    Save the progress of an export, replacing the state file atomically
+    :param path: the state file of the export
+    :param state: the progress to save
+    :return: None
+    """
+    temporary = path.with_name(f"{path.name}.tmp")
+    temporary.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def export_sheet(  # pylint: disable=too-many-arguments
+    route: str,
+    where: list[str],
+    path: Path,
+    output_format: str = "csv",
+    page_size: int = 1000,
+    resume: bool = False,
+) -> int:
+    """
+    Stream the records of a sheet to a file
+    :param route: the API route of the sheet
+    :param where: conditions in the "field ID,operator,value" format
+    :param path: the output file
+    :param output_format: either "csv" or "columns"
+    :param page_size: the number of records to request at a time
+    :param resume: whether to continue an interrupted export
+    :return: the number of records in the file
+    """
+    state_path = path.with_name(f"{path.name}.state")
+    job = {"route": route, "where": where, "format": output_format}
+    state = load_state(state_path, path, job, resume)
+    write = WRITERS[output_format]
+    with open(path, "r+b" if state["bytes"] else "wb") as raw:
+        # Drop whatever was written after the last saved page
+        raw.truncate(state["bytes"])
+        raw.seek(state["bytes"])
+        output = TextIOWrapper(raw, encoding="utf-8", newline="")
+        pages = Ragic().export_pages(route, where, state["offset"], page_size)
+        try:
+            for page in pages:
+                write(output, page, state)
+                output.flush()
+                os.fsync(raw.fileno())
+                state["offset"] += len(page)
+                state["rows"] += len(page)
+                state["bytes"] = raw.tell()
+                save_state(state_path, state)
+        except (requests.RequestException, ValueError) as error:
+            raise ExportError(
+                f"Export stopped after {state['rows']} records: {error}, "
+                "run it again with --resume to continue"
+            ) from error
+        finally:
+            output.detach()
+    state_path.unlink(missing_ok=True)
+    return state["rows"]
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("sheet", help=f"one of {', '.join(SHEETS)} or an API route")
+    args.add_argument("output", type=Path)
+    args.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        help='a condition such as "1003908,gte,2022/01/01", may be repeated',
+    )
+    args.add_argument("--format", choices=FORMATS, default="csv")
+    args.add_argument("--page-size", type=int, default=1000)
+    args.add_argument("--resume", action="store_true")
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Export a sheet from the command line
+    :param argv: the arguments, defaults to sys.argv
+    :return: the exit status
+    """
+    options = parse_args(argv)
+    route = SHEETS[options.sheet]() if options.sheet in SHEETS else options.sheet
+    try:
+        rows = export_sheet(
+            route,
+            options.where,
+            options.output,
+            options.format,
+            options.page_size,
+            options.resume,
+        )
+    except ExportError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"Exported {rows} records to {options.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,6 @@ Set up a thread safe singleton meta class
 Adapted from https://github.com/mattcoding4days/kickstart
 """
 from typing import Any
-from volunteer_hours import Config
 
 LOGGING_CONFIG: dict[str, Any] = {
     "version": 1,
@@ -31,7 +30,8 @@ LOGGING_CONFIG: dict[str, Any] = {
         "file_handler": {
             "class": "logging.handlers.RotatingFileHandler",
             "level": "DEBUG",
-            "filename": str(Config.config_dir() / Config.logfile_name()),
+            # filled in by LoggerLoader once the config directory is known
+            "filename": None,
             "formatter": "pedantic",
         },
     },
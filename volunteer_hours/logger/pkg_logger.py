@@ -4,17 +4,102 @@ Adapted from https://github.com/mattcoding4days/kickstart
 """
 # pylint: disable=R0903
 import sys
+import atexit
 import logging
+from copy import deepcopy
 from logging.config import dictConfig
+from logging.handlers import QueueHandler
 from pathlib import Path
+from queue import Full, Queue
+from threading import Thread
+from typing import Optional
 
 from colorama import init, Back, Fore
 
 from volunteer_hours import ThreadSafeMeta, Config
+from volunteer_hours.common.metrics import Metrics
 from volunteer_hours.logger import LOGGING_CONFIG
 
 
-init(autoreset=True)
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hand records to the background listener along with the handlers of the
+      logger they came from, dropping them when the queue is full and
+      counting them on /metrics
+    """
+
+    def __init__(self, queue: Queue, handlers: tuple[logging.Handler, ...]):
+        super().__init__(queue)
+        self.handlers = handlers
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Leave formatting to the listener thread
+        :param record: the record to enqueue
+        :returns: the same record
+        """
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Enqueue a record without blocking unless the overflow policy is block
+        :param record: the record to enqueue
+        :returns: none
+        """
+        if Config.log_overflow() == "block":
+            self.queue.put((self.handlers, record))
+            return
+        try:
+            self.queue.put_nowait((self.handlers, record))
+        except Full:
+            Metrics().log_records_dropped.inc()
+
+
+class LogListener:
+    """
+    A single background thread that formats records and writes them out
+    """
+
+    def __init__(self, queue: Queue):
+        self.__queue = queue
+        self.__thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """
+        Start the listener thread
+        :returns: none
+        """
+        self.__thread = Thread(target=self.__run, name="logging", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Write out every queued record and stop the listener thread
+        :returns: none
+        """
+        if self.__thread is None:
+            return
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def __run(self) -> None:
+        """
+        Handle records until stopped
+        :returns: none
+        """
+        flushed = set()
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            handlers, record = item
+            for handler in handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+                    flushed.add(handler)
+        for handler in flushed:
+            handler.flush()
 
 
 class LoggerLoader(metaclass=ThreadSafeMeta):
@@ -23,7 +108,9 @@ class LoggerLoader(metaclass=ThreadSafeMeta):
     """
 
     def __init__(self):
+        init(autoreset=True)
         self.__log_dump: Path = Config.config_dir()
+        self.__listener: Optional[LogListener] = None
         self.__load_config()
 
     def __load_config(self):
@@ -39,7 +126,11 @@ class LoggerLoader(metaclass=ThreadSafeMeta):
         try:
             # if syntax is wrong, logging module will raise ValueError,
             # catch, and exit execution
-            dictConfig(LOGGING_CONFIG)
+            config = deepcopy(LOGGING_CONFIG)
+            config["handlers"]["file_handler"]["filename"] = str(
+                self.__log_dump / Config.logfile_name()
+            )
+            dictConfig(config)
         except ValueError as error:
             sys.stderr.write(
                 f"{Fore.RED}Loading default logging config failed, "
@@ -51,6 +142,24 @@ class LoggerLoader(metaclass=ThreadSafeMeta):
                 f"{Fore.RED}Loading logging config failed, " f"syntax error\n\n{error}"
             )
             sys.exit(1)
+        self.__start_listener()
+
+    def __start_listener(self):
+        """
+        Move the configured handlers behind a bounded queue that is drained
+          by a single background thread, so logging never blocks on I/O
+        :returns: none
+        """
+        queue: Queue = Queue(maxsize=Config.log_queue_size())
+        names = [*LOGGING_CONFIG["loggers"], None]
+        for logger in [logging.getLogger(name) for name in names]:
+            handlers = tuple(logger.handlers)
+            for handler in handlers:
+                logger.removeHandler(handler)
+            logger.addHandler(BoundedQueueHandler(queue, handlers))
+        self.__listener = LogListener(queue)
+        self.__listener.start()
+        atexit.register(self.__listener.stop)
 
     @staticmethod
     def load() -> logging.Logger:
@@ -88,36 +197,50 @@ class Logger(metaclass=ThreadSafeMeta):
     The actual logger class to use
     """
 
-    __logger = LoggerLoader().load()
+    __logger: Optional[logging.Logger] = None
+
+    @classmethod
+    def __get(cls) -> logging.Logger:
+        """
+        Load the logger on first use
+        :return: the configured logger
+        """
+        if cls.__logger is None:
+            cls.__logger = LoggerLoader().load()
+        return cls.__logger
 
     @classmethod
-    def debug(cls, msg: str):
+    def debug(cls, msg: str, *args):
         """
         Wrapper around the logging object
-        :param msg: the message to log
+        :param msg: the message to log, with %-style placeholders
+        :param args: values formatted into the message only if it is logged
         """
-        cls.__logger.debug(msg)
+        cls.__get().debug(msg, *args)
 
     @classmethod
-    def info(cls, msg: str):
+    def info(cls, msg: str, *args):
         """
         Wrapper around the logging object
-        :param msg: the message to log
+        :param msg: the message to log, with %-style placeholders
+        :param args: values formatted into the message only if it is logged
         """
-        cls.__logger.info(msg)
+        cls.__get().info(msg, *args)
 
     @classmethod
-    def warn(cls, msg: str):
+    def warn(cls, msg: str, *args):
         """
         Wrapper around the logging object
-        :param msg: the message to log
+        :param msg: the message to log, with %-style placeholders
+        :param args: values formatted into the message only if it is logged
         """
-        cls.__logger.warning(msg)
+        cls.__get().warning(msg, *args)
 
     @classmethod
-    def error(cls, msg: str):
+    def error(cls, msg: str, *args):
         """
         Wrapper around the logging object
-        :param msg: the message to log
+        :param msg: the message to log, with %-style placeholders
+        :param args: values formatted into the message only if it is logged
         """
-        cls.__logger.error(msg)
+        cls.__get().error(msg, *args)
@@ -0,0 +1,127 @@
+"""
+Total volunteer hours per member, event, date or month over a date range
+
+    python -m volunteer_hours.reports --start 2022/01/01 --end 2022/12/31 \
+        --by member --format csv
+"""
+import csv
+import json
+import sys
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from typing import Optional
+
+import requests
+
+from volunteer_hours import Config
+from volunteer_hours.api.ragic import Ragic
+from volunteer_hours.common.hours_table import GROUPS, HoursTable, ReportError
+from volunteer_hours.common.timenow import Clock
+
+
+def report_range(start: Optional[str], end: Optional[str]) -> tuple[str, str]:
+    """
+    Check a date range, defaulting to the year so far
+    :param start: the first date in the configured date format, if any
+    :param end: the last date in the configured date format, if any
+    :return: the first and last dates
+    """
+    today = Clock().today()
+    start = start or f"{today[:4]}/01/01"
+    end = end or today
+    for date in (start, end):
+        try:
+            datetime.strptime(date, Config.date_format())
+        except ValueError as error:
+            raise ReportError(f"Invalid date {date}, use YYYY/MM/DD") from error
+    if start > end:
+        raise ReportError(f"The range starts on {start}, after it ends on {end}")
+    return start, end
+
+
+def hours_report(start: Optional[str], end: Optional[str], group: str) -> dict:
+    """
+    Build a report of the hours logged over a date range
+    :param start: the first date in the configured date format, if any
+    :param end: the last date in the configured date format, if any
+    :param group: one of "member", "event", "date" or "month"
+    :return: the range, the overall summary and the totals of each group
+    """
+    if group not in GROUPS:
+        raise ReportError(f"Cannot group by {group}, use one of {', '.join(GROUPS)}")
+    start, end = report_range(start, end)
+    try:
+        table = HoursTable.from_pages(Ragic().hours_between(start, end))
+    except (requests.RequestException, ValueError) as error:
+        raise ReportError(f"Unable to retrieve hours from Ragic: {error}") from error
+    return {
+        "start": start,
+        "end": end,
+        "by": group,
+        "records": len(table),
+        "summary": table.summary(),
+        "totals": table.totals(group),
+    }
+
+
+def write_report(report: dict, output_format: str) -> None:
+    """
+    Print a report to standard output
+    :param report: a report from hours_report
+    :param output_format: one of "table", "csv" or "json"
+    :return: None
+    """
+    if output_format == "json":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    columns = [report["by"], "hours", "shifts", "open"]
+    if output_format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(report["totals"])
+        return
+    width = max(
+        [len(report["by"])] + [len(row[columns[0]]) for row in report["totals"]]
+    )
+    print(f"Hours from {report['start']} to {report['end']}")
+    print(f"{columns[0]:<{width}} {'hours':>10} {'shifts':>7} {'open':>5}")
+    for row in report["totals"] + [{columns[0]: "total", **report["summary"]}]:
+        print(
+            f"{row[columns[0]]:<{width}} {row['hours']:>10.2f} "
+            f"{row['shifts']:>7} {row['open']:>5}"
+        )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> Namespace:
+    """
+    Parse the command line options
+    :param argv: the arguments, defaults to sys.argv
+    :return: parsed options
+    """
+    args = ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    args.add_argument("--start", help="the first date, defaults to January 1")
+    args.add_argument("--end", help="the last date, defaults to today")
+    args.add_argument("--by", choices=GROUPS, default="member")
+    args.add_argument("--format", choices=("table", "csv", "json"), default="table")
+    return args.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Print a report of the hours logged over a date range
+    :param argv: the arguments, defaults to sys.argv
+    :return: the exit status
+    """
+    options = parse_args(argv)
+    try:
+        report = hours_report(options.start, options.end, options.by)
+    except ReportError as error:
+        print(error, file=sys.stderr)
+        return 1
+    write_report(report, options.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())